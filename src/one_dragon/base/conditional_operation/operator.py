@@ -1,8 +1,9 @@
+import heapq
 import time
 from abc import abstractmethod
 from concurrent.futures import Future, ThreadPoolExecutor
 from functools import cached_property
-from threading import Lock
+from threading import Event, Lock
 from typing import Optional
 
 from one_dragon.base.conditional_operation.atomic_op import AtomicOp
@@ -22,6 +23,9 @@ from one_dragon.utils.log_utils import log
 # 当前运行的场景一个 打断的新场景一个 处理事件更新状态一个
 _od_conditional_op_executor = ThreadPoolExecutor(thread_name_prefix='od_conditional_op', max_workers=4)
 
+# 主循环没有任何定时唤醒时 最长的等待时间 兜底未经过 StateRecordService 的状态修改
+_NORMAL_SCENE_MAX_WAIT_SECONDS: float = 1
+
 
 class ConditionalOperator(ConditionalOperatorLoader):
 
@@ -56,6 +60,12 @@ class ConditionalOperator(ConditionalOperatorLoader):
         self._inited: bool = False
         self._task_lock: Lock = Lock()
 
+        # 主循环由事件驱动 状态变化、任务结束、时间区间边界到达时才重新判断
+        self._normal_scene_wakeup: Event = Event()  # 唤醒主循环
+        self._normal_scene_dirty: bool = True  # 主循环用到的状态是否有变化
+        self._normal_scene_next_change_time: float = 0  # 主循环判断结果下一次可能随时间变化的时间
+        self._normal_scene_timer_heap: list[float] = []  # 主循环的定时唤醒时间
+
     def init(self) -> None:
         """
         完整的初始化流程 可重复调用
@@ -127,18 +137,24 @@ class ConditionalOperator(ConditionalOperatorLoader):
     def _normal_scene_loop(self) -> None:
         """
         主循环
+        不再固定间隔轮询 只在以下情况被唤醒后重新判断
+        1. 用到的状态有更新 (batch_update_states)
+        2. 正在运行的任务结束或被打断
+        3. 定时唤醒 包括触发间隔结束、状态时间区间的边界
         :return:
         """
         normal_scene_id = id(self.normal_scene)
+        self._normal_scene_dirty = True
+        self._normal_scene_next_change_time = 0
+        self._normal_scene_timer_heap = []
         while self.is_running:
+            # 先清除唤醒标记 之后的任何唤醒都不会丢失
+            self._normal_scene_wakeup.clear()
             if self.running_executor_cnt.get() > 0:
-                # 有其它场景在运行 等待
-                time.sleep(0.02)
+                # 有其它场景在运行 等待任务结束的唤醒
+                self._normal_scene_wakeup.wait(_NORMAL_SCENE_MAX_WAIT_SECONDS)
                 continue
 
-            # log.debug('开始等待新的主循环')
-            to_sleep: Optional[float] = None
-
             # 上锁后确保运行状态不会被篡改
             with self._task_lock:
                 if not self.is_running:
@@ -149,10 +165,21 @@ class ConditionalOperator(ConditionalOperatorLoader):
                 last_trigger_time = self.last_trigger_time.get(normal_scene_id, 0)
                 past_time = trigger_time - last_trigger_time
                 if past_time < self.normal_scene.interval_seconds:
-                    to_sleep = self.normal_scene.interval_seconds - past_time
-                else:
+                    heapq.heappush(self._normal_scene_timer_heap, last_trigger_time + self.normal_scene.interval_seconds)
+                elif self._normal_scene_dirty or trigger_time >= self._normal_scene_next_change_time:
+                    # 判断前先清除变化标记 判断期间到达的状态更新会重新标记 不会被覆盖
+                    self._normal_scene_dirty = False
                     new_execution_info = self.normal_scene.match_execution(trigger_time)
-                    if new_execution_info is not None:
+                    if new_execution_info is None:
+                        # 状态不变的话 判断结果在下一个时间区间边界前都不会变化
+                        next_change_time = self.normal_scene.next_change_time(trigger_time)
+                        if next_change_time is None:
+                            next_change_time = trigger_time + _NORMAL_SCENE_MAX_WAIT_SECONDS
+                        else:
+                            next_change_time = min(next_change_time, trigger_time + _NORMAL_SCENE_MAX_WAIT_SECONDS)
+                        self._normal_scene_next_change_time = next_change_time
+                        heapq.heappush(self._normal_scene_timer_heap, next_change_time)
+                    else:
                         log.debug(f'当前场景 主循环 当前条件 {new_execution_info.expr_display}')
                         new_execution_info.priority = self.normal_scene.priority
                         self._emit_overlay_decision(
@@ -168,15 +195,51 @@ class ConditionalOperator(ConditionalOperatorLoader):
                             trigger_time=trigger_time,
                         )
                         self.last_trigger_time[normal_scene_id] = trigger_time
+                        # 任务结束后需要马上重新判断
+                        self._normal_scene_dirty = True
                         self.running_executor_cnt.inc()
                         future = self.running_executor.run_async()
                         future.add_done_callback(self._on_task_done)
 
-            if to_sleep is not None:
-                # 等待时间不能写在锁里 要尽快释放锁
-                time.sleep(to_sleep)
-            else:  # 没有命中的状态 或者 提交执行了 那就自旋等待
-                time.sleep(0.02)
+            # 等待不能写在锁里 要尽快释放锁
+            self._normal_scene_wakeup.wait(self._pop_normal_scene_timeout())
+
+    def _pop_normal_scene_timeout(self) -> float:
+        """
+        弹出已经过期的定时唤醒 返回距离最近一次定时唤醒的等待时间
+
+        Returns:
+            float: 等待时间(秒)
+        """
+        now = time.time()
+        timer_heap = self._normal_scene_timer_heap
+        while len(timer_heap) > 0 and timer_heap[0] <= now:
+            heapq.heappop(timer_heap)
+        if len(timer_heap) == 0:
+            return _NORMAL_SCENE_MAX_WAIT_SECONDS
+        return min(timer_heap[0] - now, _NORMAL_SCENE_MAX_WAIT_SECONDS)
+
+    def _on_normal_scene_states_updated(self, state_records: list[StateRecord]) -> None:
+        """
+        状态更新后 如果主循环用到了相关状态 则唤醒主循环重新判断
+        互斥清除的状态也算在内
+
+        Args:
+            state_records: 状态记录列表
+        """
+        if self.normal_scene is None:
+            return
+        usage_states = self.normal_scene.usage_states
+        for state_record in state_records:
+            changed = state_record.state_name in usage_states
+            if not changed and not state_record.is_clear:
+                recorder = self.state_record_service.get_state_recorder(state_record.state_name)
+                if recorder is not None and recorder.mutex_list is not None:
+                    changed = any(mutex_state in usage_states for mutex_state in recorder.mutex_list)
+            if changed:
+                self._normal_scene_dirty = True
+                self._normal_scene_wakeup.set()
+                return
 
     def _trigger_scene(self, state_name: str) -> None:
         """
@@ -249,6 +312,7 @@ class ConditionalOperator(ConditionalOperatorLoader):
         with self._task_lock:
             self.is_running = False
             self._stop_running_task()
+        self._normal_scene_wakeup.set()
 
     def _stop_running_task(self) -> None:
         """
@@ -263,6 +327,7 @@ class ConditionalOperator(ConditionalOperatorLoader):
                 # 如果 finish=False 则代表还有操作在继续。在这里要减少计数器而不是等_on_task_done 让无触发器场景尽早运行
                 self.running_executor_cnt.dec()
             self.running_executor = None
+            self._normal_scene_wakeup.set()
 
     def _on_task_done(self, future: Future) -> None:
         """
@@ -273,6 +338,7 @@ class ConditionalOperator(ConditionalOperatorLoader):
                 result = future.result()
                 if result:  # 顺利执行完毕
                     self.running_executor_cnt.dec()
+                    self._normal_scene_wakeup.set()
             except Exception:  # run_async里有callback打印日志
                 pass
 
@@ -305,6 +371,8 @@ class ConditionalOperator(ConditionalOperatorLoader):
         if not self.is_running:
             return
 
+        self._on_normal_scene_states_updated(state_records)
+
         top_priority_scene: Optional[Scene] = None
         top_priority_state: Optional[str] = None
 
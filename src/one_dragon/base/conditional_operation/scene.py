@@ -4,6 +4,10 @@ from typing import Any, Callable
 from one_dragon.base.conditional_operation.atomic_op import AtomicOp
 from one_dragon.base.conditional_operation.execution_info import ExecutionInfo
 from one_dragon.base.conditional_operation.operation_def import OperationDef
+from one_dragon.base.conditional_operation.state_cal_tree import (
+    StateCalNode,
+    StateCalProgram,
+)
 from one_dragon.base.conditional_operation.state_handler import StateHandler
 from one_dragon.base.conditional_operation.state_recorder import StateRecorder
 
@@ -22,6 +26,7 @@ class Scene:
             StateHandler(i)
             for i in data.get("handlers", [])
         ]
+        self.state_cal_program: StateCalProgram | None = None  # 所有处理器的状态判断树编译后的程序
 
         # TODO 调试代码 后续删除
         for k in data.keys():
@@ -37,6 +42,7 @@ class Scene:
         """
         self.handlers = handlers
         self.original_data["handlers"] = [i.original_data for i in handlers]
+        self.state_cal_program = None  # 需要重新构建
 
     def build(
         self,
@@ -52,6 +58,11 @@ class Scene:
                 op_getter=op_getter,
             )
 
+        tree_list: list[StateCalNode] = []
+        for handler in self.handlers:
+            handler.collect_state_cal_tree(tree_list)
+        self.state_cal_program = StateCalProgram(tree_list)
+
     @cached_property
     def usage_states(self) -> set[str]:
         """
@@ -76,7 +87,29 @@ class Scene:
         Returns:
             符合条件的场景下的执行信息
         """
+        # 一次计算出所有处理器的判断结果 再按顺序选出第一个符合的处理器
+        state_cal_result = None
+        if self.state_cal_program is not None:
+            state_cal_result = self.state_cal_program.evaluate(trigger_time)
         for handler in self.handlers:
-            info = handler.match_execution(trigger_time)
+            info = handler.match_execution(trigger_time, state_cal_result)
             if info is not None:
-                return info
\ No newline at end of file
+                return info
+
+    def next_change_time(self, now: float) -> float | None:
+        """
+        在状态记录不变的前提下 计算匹配结果下一次可能变化的时间
+
+        Args:
+            now: 当前时间
+
+        Returns:
+            下一次可能变化的时间 不会再随时间变化时返回None
+        """
+        change_time: float | None = None
+        for handler in self.handlers:
+            handler_change_time = handler.next_change_time(now)
+            if handler_change_time is not None and (change_time is None or handler_change_time < change_time):
+                change_time = handler_change_time
+
+        return change_time
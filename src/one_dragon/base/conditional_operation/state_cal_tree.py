@@ -4,9 +4,13 @@ from enum import IntEnum
 from functools import cached_property
 from typing import Callable, Optional
 
+import numpy as np
+
 from one_dragon.base.conditional_operation.state_recorder import StateRecorder
 from one_dragon.utils.log_utils import log
 
+_TIME_RANGE_MAX_EPSILON: float = 0.001  # 时间区间最大值边界的偏移 用于计算判断结果的变化时间
+
 
 class StateCalNodeType(IntEnum):
 
@@ -102,6 +106,39 @@ class StateCalNode:
 
         return False
 
+    def next_change_time(self, now: float) -> float | None:
+        """
+        在状态记录不变的前提下 计算判断结果下一次可能变化的时间
+        即所有状态节点时间区间边界中 晚于当前时间的最早一个
+
+        Args:
+            now: 当前时间
+
+        Returns:
+            float | None: 下一次可能变化的时间 不会再随时间变化时返回None
+        """
+        if self.node_type == StateCalNodeType.OP:
+            left_time = self.left_child.next_change_time(now)
+            if self.right_child is None:
+                return left_time
+            right_time = self.right_child.next_change_time(now)
+            if left_time is None:
+                return right_time
+            if right_time is None:
+                return left_time
+            return min(left_time, right_time)
+        elif self.node_type == StateCalNodeType.STATE:
+            last_record_time = self.state_recorder.last_record_time
+            # 区间是闭区间 超过最大值之后才会失效 因此最大值边界稍微往后取
+            for boundary in (
+                last_record_time + self.state_time_range_min,
+                last_record_time + self.state_time_range_max + _TIME_RANGE_MAX_EPSILON,
+            ):
+                if boundary > now:
+                    return boundary
+
+        return None
+
     @cached_property
     def usage_states(self) -> set[str]:
         """
@@ -131,6 +168,130 @@ class StateCalNode:
             self.state_recorder.dispose()
 
 
+class StateCalProgram:
+
+    def __init__(self, root_list: list[StateCalNode]):
+        """
+        将多棵状态判断树编译成扁平的程序 一次向量化计算出所有树的结果
+        - 所有状态节点的时间、值区间判断合并为数组运算
+        - 运算符节点按高度分层 同一层同一种运算符合并为一次数组运算
+        :param root_list: 需要计算的状态判断树根节点
+        """
+        self.recorder_list: list[StateRecorder] = []  # 用到的状态记录器 去重
+        recorder_idx_map: dict[int, int] = {}
+
+        node_idx_map: dict[int, int] = {}  # 节点id -> 节点下标
+        node_height_list: list[int] = []
+
+        leaf_idx_list: list[int] = []
+        leaf_recorder_idx_list: list[int] = []
+        leaf_time_min_list: list[float] = []
+        leaf_time_max_list: list[float] = []
+        leaf_value_min_list: list[float] = []
+        leaf_value_max_list: list[float] = []
+        leaf_has_value_range_list: list[bool] = []
+        true_idx_list: list[int] = []
+        # 按高度分层的运算符节点 (高度, 运算符) -> [(节点下标, 左子节点下标, 右子节点下标)]
+        op_group: dict[tuple[int, StateCalOpType], list[tuple[int, int, int]]] = {}
+
+        def _compile(node: StateCalNode) -> int:
+            node_id = id(node)
+            if node_id in node_idx_map:  # 同一个节点只计算一次
+                return node_idx_map[node_id]
+
+            height = 0
+            left_idx: int = -1
+            right_idx: int = -1
+            if node.node_type == StateCalNodeType.OP:
+                left_idx = _compile(node.left_child)
+                height = node_height_list[left_idx] + 1
+                if node.op_type != StateCalOpType.NOT:
+                    right_idx = _compile(node.right_child)
+                    height = max(height, node_height_list[right_idx] + 1)
+                else:
+                    right_idx = left_idx
+
+            idx = len(node_height_list)
+            node_height_list.append(height)
+            node_idx_map[node_id] = idx
+
+            if node.node_type == StateCalNodeType.OP:
+                op_group.setdefault((height, node.op_type), []).append((idx, left_idx, right_idx))
+            elif node.node_type == StateCalNodeType.STATE:
+                recorder_id = id(node.state_recorder)
+                if recorder_id not in recorder_idx_map:
+                    recorder_idx_map[recorder_id] = len(self.recorder_list)
+                    self.recorder_list.append(node.state_recorder)
+                has_value_range = node.state_value_range_min is not None and node.state_value_range_max is not None
+                leaf_idx_list.append(idx)
+                leaf_recorder_idx_list.append(recorder_idx_map[recorder_id])
+                leaf_time_min_list.append(node.state_time_range_min)
+                leaf_time_max_list.append(node.state_time_range_max)
+                leaf_value_min_list.append(node.state_value_range_min if has_value_range else 0)
+                leaf_value_max_list.append(node.state_value_range_max if has_value_range else 0)
+                leaf_has_value_range_list.append(has_value_range)
+            elif node.node_type == StateCalNodeType.TRUE:
+                true_idx_list.append(idx)
+
+            return idx
+
+        self.root_idx: np.ndarray = np.array([_compile(i) for i in root_list], dtype=np.int32)
+        self.node_cnt: int = len(node_height_list)
+
+        self.leaf_idx: np.ndarray = np.array(leaf_idx_list, dtype=np.int32)
+        self.leaf_recorder_idx: np.ndarray = np.array(leaf_recorder_idx_list, dtype=np.int32)
+        self.leaf_time_min: np.ndarray = np.array(leaf_time_min_list, dtype=np.float64)
+        self.leaf_time_max: np.ndarray = np.array(leaf_time_max_list, dtype=np.float64)
+        self.leaf_value_min: np.ndarray = np.array(leaf_value_min_list, dtype=np.float64)
+        self.leaf_value_max: np.ndarray = np.array(leaf_value_max_list, dtype=np.float64)
+        self.leaf_no_value_range: np.ndarray = ~np.array(leaf_has_value_range_list, dtype=bool)
+        self.true_idx: np.ndarray = np.array(true_idx_list, dtype=np.int32)
+
+        # 按高度从低到高执行 保证计算时子节点已有结果
+        self.op_step_list: list[tuple[StateCalOpType, np.ndarray, np.ndarray, np.ndarray]] = []
+        for height, op_type in sorted(op_group.keys()):
+            step = np.array(op_group[(height, op_type)], dtype=np.int32)
+            self.op_step_list.append((op_type, step[:, 0], step[:, 1], step[:, 2]))
+
+    def evaluate(self, now: float) -> np.ndarray:
+        """
+        根据当前时间 计算所有状态判断树的结果
+        结果与逐个调用 StateCalNode.in_time_range 一致
+        :param now: 当前时间
+        :return: 各棵树的结果 顺序与构造时传入的根节点一致
+        """
+        recorder_cnt = len(self.recorder_list)
+        record_time = np.fromiter(
+            (i.last_record_time for i in self.recorder_list),
+            dtype=np.float64, count=recorder_cnt,
+        )
+        # 没有值时使用nan 任何比较都不成立
+        record_value = np.fromiter(
+            (np.nan if i.last_value is None else i.last_value for i in self.recorder_list),
+            dtype=np.float64, count=recorder_cnt,
+        )
+
+        result = np.zeros(self.node_cnt, dtype=bool)
+
+        diff = now - record_time[self.leaf_recorder_idx]
+        value = record_value[self.leaf_recorder_idx]
+        result[self.leaf_idx] = (
+            (self.leaf_time_min <= diff) & (diff <= self.leaf_time_max)
+            & (self.leaf_no_value_range | ((self.leaf_value_min <= value) & (value <= self.leaf_value_max)))
+        )
+        result[self.true_idx] = True
+
+        for op_type, out_idx, left_idx, right_idx in self.op_step_list:
+            if op_type == StateCalOpType.AND:
+                result[out_idx] = result[left_idx] & result[right_idx]
+            elif op_type == StateCalOpType.OR:
+                result[out_idx] = result[left_idx] | result[right_idx]
+            elif op_type == StateCalOpType.NOT:
+                result[out_idx] = ~result[left_idx]
+
+        return result[self.root_idx]
+
+
 def construct_state_cal_tree(
     expr_str: str,
     state_getter: Callable[[str], StateRecorder],
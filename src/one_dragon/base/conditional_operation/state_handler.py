@@ -3,6 +3,8 @@ from __future__ import annotations
 from functools import cached_property
 from typing import Any, Callable
 
+import numpy as np
+
 from one_dragon.base.conditional_operation.atomic_op import AtomicOp
 from one_dragon.base.conditional_operation.execution_info import ExecutionInfo
 from one_dragon.base.conditional_operation.operation_def import OperationDef
@@ -34,6 +36,7 @@ class StateHandler:
         self.op_list: list[AtomicOp] = []  # 操作列表
         self.state_cal_tree: StateCalNode | None = None  # 状态判断树
         self.interrupt_states_cal_tree: StateCalNode | None = None  # 可被打断的状态判断树
+        self.state_cal_idx: int = -1  # 在场景编译后的状态判断程序中的下标
 
         # TODO 调试代码 后续删除
         for k in data.keys():
@@ -142,20 +145,41 @@ class StateHandler:
 
         return states
 
-    def match_execution(self, trigger_time: float) -> ExecutionInfo | None:
+    def collect_state_cal_tree(self, tree_list: list[StateCalNode]) -> None:
+        """
+        按匹配顺序收集自身及子处理器的状态判断树 并记录各自的下标
+
+        Args:
+            tree_list: 收集的状态判断树列表
+        """
+        self.state_cal_idx = len(tree_list)
+        tree_list.append(self.state_cal_tree)
+        for sub_handler in self.sub_handlers:
+            sub_handler.collect_state_cal_tree(tree_list)
+
+    def match_execution(
+        self,
+        trigger_time: float,
+        state_cal_result: np.ndarray | None = None,
+    ) -> ExecutionInfo | None:
         """
         根据触发时间和优先级 获取符合条件的场景下的执行信息
 
         Args:
             trigger_time: 触发时间
+            state_cal_result: 场景编译后的状态判断程序的计算结果 不传入时逐个计算状态判断树
 
         Returns:
             符合条件的场景下的执行信息
         """
-        if self.state_cal_tree.in_time_range(trigger_time):
+        if state_cal_result is not None:
+            matched = bool(state_cal_result[self.state_cal_idx])
+        else:
+            matched = self.state_cal_tree.in_time_range(trigger_time)
+        if matched:
             if self.sub_handlers is not None and len(self.sub_handlers) > 0:
                 for sub_handler in self.sub_handlers:
-                    info = sub_handler.match_execution(trigger_time)
+                    info = sub_handler.match_execution(trigger_time, state_cal_result)
                     if info is not None:
                         info.add_state(self.states, self.display_name)
                         return info
@@ -165,3 +189,23 @@ class StateHandler:
                 return info
 
         return None
+
+    def next_change_time(self, now: float) -> float | None:
+        """
+        在状态记录不变的前提下 计算匹配结果下一次可能变化的时间
+
+        Args:
+            now: 当前时间
+
+        Returns:
+            下一次可能变化的时间 不会再随时间变化时返回None
+        """
+        change_time: float | None = None
+        if self.state_cal_tree is not None:
+            change_time = self.state_cal_tree.next_change_time(now)
+        for sub_handler in self.sub_handlers:
+            sub_change_time = sub_handler.next_change_time(now)
+            if sub_change_time is not None and (change_time is None or sub_change_time < change_time):
+                change_time = sub_change_time
+
+        return change_time
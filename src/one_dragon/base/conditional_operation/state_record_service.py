@@ -1,8 +1,10 @@
 from __future__ import annotations
 
+import threading
 from abc import ABC, abstractmethod
+from collections.abc import Callable
 from concurrent.futures import ThreadPoolExecutor, Future
-from typing import TYPE_CHECKING
+from typing import TYPE_CHECKING, Any
 
 from one_dragon.base.conditional_operation.state_recorder import StateRecorder, StateRecord
 from one_dragon.utils import thread_utils
@@ -13,6 +15,105 @@ if TYPE_CHECKING:
 
 _state_record_service_executor = ThreadPoolExecutor(thread_name_prefix='od_state_record_service', max_workers=16)
 
+# 当前线程正在执行的检测任务所属的帧
+_state_frame_local = threading.local()
+
+
+class StateRecordFrame:
+
+    def __init__(self, service: StateRecordService, frame_time: float):
+        """
+        同一帧画面的状态更新事务
+        这一帧的各个检测任务提交的状态先合并起来 所有任务完成后统一更新状态 并只通知操作器一次
+
+        Args:
+            service: 状态记录服务
+            frame_time: 截图时间
+        """
+        self.service: StateRecordService = service
+        self.frame_time: float = frame_time
+
+        self._lock = threading.Lock()
+        self._record_list: list[StateRecord] = []
+        self._hold_cnt: int = 1  # 未完成的任务数量 初始的1在 close 时释放
+        self._committed: bool = False
+
+    def add_records(self, state_records: list[StateRecord]) -> bool:
+        """
+        加入这一帧的状态记录
+
+        Args:
+            state_records: 状态记录列表
+
+        Returns:
+            bool: 是否加入成功 已经提交的帧无法再加入
+        """
+        with self._lock:
+            if self._committed:
+                return False
+            self._record_list.extend(state_records)
+            return True
+
+    def wrap(self, fn: Callable[..., Any]) -> Callable[..., Any]:
+        """
+        包装一个检测任务 任务中调用 batch_update_states 的状态会加入这一帧
+
+        Args:
+            fn: 检测任务
+
+        Returns:
+            Callable: 包装后的任务
+        """
+        with self._lock:
+            self._hold_cnt += 1
+
+        def _run(*args, **kwargs):
+            prev_frame = getattr(_state_frame_local, 'frame', None)
+            _state_frame_local.frame = self
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                _state_frame_local.frame = prev_frame
+                self._release()
+
+        return _run
+
+    def submit(self, executor: ThreadPoolExecutor, fn: Callable[..., Any], *args, **kwargs) -> Future:
+        """
+        包装一个检测任务并提交到线程池 提交失败时释放这个任务 不会让这一帧无法提交
+
+        Args:
+            executor: 线程池
+            fn: 检测任务
+
+        Returns:
+            Future: 任务的结果
+        """
+        task = self.wrap(fn)
+        try:
+            return executor.submit(task, *args, **kwargs)
+        except Exception:
+            self._release()
+            raise
+
+    def close(self) -> None:
+        """
+        不再添加新的任务 已添加的任务都完成后提交
+        """
+        self._release()
+
+    def _release(self) -> None:
+        with self._lock:
+            self._hold_cnt -= 1
+            if self._hold_cnt > 0 or self._committed:
+                return
+            self._committed = True
+            record_list = self._record_list
+            self._record_list = []
+
+        if len(record_list) > 0:
+            self.service.apply_state_records(record_list)
+
 
 class StateRecordService(ABC):
 
@@ -58,24 +159,58 @@ class StateRecordService(ABC):
         """
         self.batch_update_states([state_record])
 
+    def begin_frame(self, frame_time: float) -> StateRecordFrame:
+        """
+        开始一帧画面的状态更新事务
+        使用 frame.submit 或 frame.wrap 提交这一帧的检测任务 全部提交后调用 frame.close
+        中途出现异常时 也需要调用 frame.close 否则这一帧不会提交
+
+        Args:
+            frame_time: 截图时间
+
+        Returns:
+            StateRecordFrame: 状态更新事务
+        """
+        return StateRecordFrame(self, frame_time)
+
     def batch_update_states(self, state_records: list[StateRecord]) -> None:
         """
         批量更新多个状态
         更新后触发 操作器相应的动作
+        在某一帧的检测任务中调用时 等这一帧的所有任务完成后再统一更新
+        """
+        frame: StateRecordFrame | None = getattr(_state_frame_local, 'frame', None)
+        if frame is not None and frame.service is self and frame.add_records(state_records):
+            return
+
+        self.apply_state_records(state_records)
+
+    def apply_state_records(self, state_records: list[StateRecord]) -> None:
+        """
+        按顺序更新状态 再通知所有操作器
+
+        Args:
+            state_records: 状态记录列表
         """
+        cleared_state_set: set[str] = set()  # 已经被清除 之后没有再更新的状态
         for state_record in state_records:
-            self._update_state_recorder(state_record)
+            self._update_state_recorder(state_record, cleared_state_set)
 
         for op in self.op_list:
             f: Future = _state_record_service_executor.submit(op.batch_update_states, state_records)
             f.add_done_callback(thread_utils.handle_future_result)
 
-    def _update_state_recorder(self, new_record: StateRecord) -> StateRecorder | None:
+    def _update_state_recorder(
+            self,
+            new_record: StateRecord,
+            cleared_state_set: set[str] | None = None,
+    ) -> StateRecorder | None:
         """
         更新一个状态记录
 
         Args:
             new_record: 新的状态记录
+            cleared_state_set: 同一批更新中已经被清除的状态 重复的互斥清除会跳过
 
         Returns:
             更新后的状态记录器
@@ -84,16 +219,24 @@ class StateRecordService(ABC):
         if recorder is None:
             return None
 
+        if cleared_state_set is None:
+            cleared_state_set = set()
+
         if new_record.is_clear:
             recorder.clear_state_record()
+            cleared_state_set.add(new_record.state_name)
         else:
             recorder.update_state_record(new_record)
+            cleared_state_set.discard(new_record.state_name)
             if recorder.mutex_list is not None:
                 for mutex_state in recorder.mutex_list:
+                    if mutex_state in cleared_state_set:
+                        continue
                     mutex_recorder = self.get_state_recorder(mutex_state)
                     if mutex_recorder is None:
                         continue
                     mutex_recorder.clear_state_record()
+                    cleared_state_set.add(mutex_state)
 
         return recorder
 
@@ -32,6 +32,14 @@ class BasicModelConfig(YamlConfig):
     def ocr_use_gpu(self, new_value: bool) -> None:
         self.update('ocr_use_gpu', new_value)
 
+    @property
+    def ocr_use_rec_batcher(self) -> bool:
+        return self.get('ocr_use_rec_batcher', False)
+
+    @ocr_use_rec_batcher.setter
+    def ocr_use_rec_batcher(self, new_value: bool) -> None:
+        self.update('ocr_use_rec_batcher', new_value)
+
     def using_old_model(self) -> bool:
         """
         是否在使用旧模型
@@ -1,36 +1,214 @@
-import copy
+"""yml文件的读取和写入。
+
+同一个文件只解析一次 解析结果作为只读快照缓存 不会交给调用方修改。
+YamlOperator 读取时只浅复制根节点 嵌套的字典和列表在第一次被访问时才复制 (写时复制)
+只读取少量字段的配置 不需要再深复制整个文件。
+
+文件是否变化通过按目录批量扫描判断 同一目录在 STAT_CACHE_SECONDS 内只扫描一次
+不再每次读取都获取修改时间。通过 YamlOperator 写入或删除的文件会立刻失效。
+"""
 import os
 import shutil
+import threading
+import time
+from dataclasses import dataclass, field
 
 import yaml
 
 from one_dragon.utils import yaml_utils
 from one_dragon.utils.log_utils import log
 
-cached_yaml_data: dict[str, tuple[float, dict | list]] = {}
-
-
-def read_cache_or_load(file_path: str) -> dict | list:
-    cached = cached_yaml_data.get(file_path)
-    last_modify = os.path.getmtime(file_path)
-    if cached is not None and cached[0] == last_modify:
-        return copy.deepcopy(cached[1])
-
+STAT_CACHE_SECONDS: float = 1.0  # 同一目录的文件信息缓存时间
+_YAML_EXT_TUPLE: tuple[str, ...] = ('.yml', '.yaml')
+
+FileStat = tuple[int, int]  # 修改时间(纳秒), 文件大小
+
+
+@dataclass
+class YamlLoadStats:
+    """yml读取的统计"""
+
+    load_cnt: int = 0  # 实际解析文件的次数
+    load_seconds: float = 0  # 解析文件的总耗时
+    hit_cnt: int = 0  # 使用缓存的次数
+    scan_cnt: int = 0  # 扫描目录的次数
+
+
+@dataclass
+class _DirStat:
+    """一个目录下yml文件的信息"""
+
+    scan_time: float  # 扫描时间
+    file_stat_map: dict[str, FileStat] = field(default_factory=dict)  # 文件名 -> 文件信息
+
+
+_cache_lock = threading.Lock()
+_cached_yaml_data: dict[str, tuple[FileStat, dict | list]] = {}
+_dir_stat_map: dict[str, _DirStat] = {}
+_load_stats: YamlLoadStats = YamlLoadStats()
+
+
+def _scan_dir(dir_path: str, now: float) -> _DirStat:
+    """
+    扫描目录下所有yml文件的信息 Windows下 scandir 的结果自带文件信息 不需要逐个获取
+    :param dir_path: 目录
+    :param now: 当前时间
+    :return:
+    """
+    dir_stat = _DirStat(scan_time=now)
+    try:
+        with os.scandir(dir_path) as it:
+            for entry in it:
+                if not entry.name.endswith(_YAML_EXT_TUPLE):
+                    continue
+                try:
+                    stat = entry.stat()
+                except OSError:
+                    continue
+                dir_stat.file_stat_map[entry.name] = (stat.st_mtime_ns, stat.st_size)
+    except OSError:
+        pass
+    return dir_stat
+
+
+def get_file_stat(file_path: str) -> FileStat | None:
+    """
+    获取文件信息 使用目录扫描的缓存
+    :param file_path: 文件路径
+    :return: 文件信息 文件不存在时返回None
+    """
+    dir_path, file_name = os.path.split(os.path.abspath(file_path))
+    now = time.monotonic()
+    with _cache_lock:
+        dir_stat = _dir_stat_map.get(dir_path)
+        if dir_stat is None or now - dir_stat.scan_time > STAT_CACHE_SECONDS:
+            dir_stat = _scan_dir(dir_path, now)
+            _dir_stat_map[dir_path] = dir_stat
+            _load_stats.scan_cnt += 1
+        file_stat = dir_stat.file_stat_map.get(file_name)
+
+    if file_stat is None:
+        # 扫描后才新建的文件 或者不是yml后缀的文件 直接获取
+        try:
+            stat = os.stat(file_path)
+        except OSError:
+            return None
+        file_stat = (stat.st_mtime_ns, stat.st_size)
+        if file_name.endswith(_YAML_EXT_TUPLE):
+            with _cache_lock:
+                dir_stat.file_stat_map[file_name] = file_stat
+
+    return file_stat
+
+
+def copy_yaml_data(data):
+    """
+    复制yml解析出来的数据 只有字典和列表是可变的 比 copy.deepcopy 快
+    :param data: 数据
+    :return:
+    """
+    if isinstance(data, dict):
+        return {k: copy_yaml_data(v) if isinstance(v, dict | list) else v for k, v in data.items()}
+    elif isinstance(data, list):
+        return [copy_yaml_data(i) if isinstance(i, dict | list) else i for i in data]
+    else:
+        return data
+
+
+def get_snapshot(file_path: str) -> dict | list:
+    """
+    获取文件内容的只读快照 调用方不能修改返回值
+    :param file_path: 文件路径
+    :return:
+    """
+    file_stat = get_file_stat(file_path)
+    if file_stat is None:
+        raise FileNotFoundError(file_path)
+
+    with _cache_lock:
+        cached = _cached_yaml_data.get(file_path)
+        if cached is not None and cached[0] == file_stat:
+            _load_stats.hit_cnt += 1
+            return cached[1]
+
+    start_time = time.perf_counter()
     with open(file_path, encoding="utf-8") as file:
         log.debug(f"加载yaml: {file_path}")
         data = yaml_utils.safe_load(file)
-        if data is None:
-            data = {}
-        if not isinstance(data, dict | list):
-            raise TypeError(f"YAML root must be a dict or list: {file_path}")
-        cached_yaml_data[file_path] = (last_modify, data)
-        return copy.deepcopy(data)
+    if data is None:
+        data = {}
+    if not isinstance(data, dict | list):
+        raise TypeError(f"YAML root must be a dict or list: {file_path}")
+
+    with _cache_lock:
+        _cached_yaml_data[file_path] = (file_stat, data)
+        _load_stats.load_cnt += 1
+        _load_stats.load_seconds += time.perf_counter() - start_time
+    return data
+
+
+def read_cache_or_load(file_path: str) -> dict | list:
+    """
+    读取文件内容 返回可以修改的副本
+    :param file_path: 文件路径
+    :return:
+    """
+    return copy_yaml_data(get_snapshot(file_path))
+
+
+def put_cache(file_path: str, data: dict | list) -> None:
+    """
+    预先放入已经解析好的文件内容 放入后不能再修改data
+    :param file_path: 文件路径
+    :param data: 文件内容
+    """
+    file_stat = get_file_stat(file_path)
+    if file_stat is None:
+        return
+    with _cache_lock:
+        _cached_yaml_data[file_path] = (file_stat, data)
 
 
 def invalidate_cache(file_path: str | None) -> None:
     if file_path is None:
         return
-    cached_yaml_data.pop(file_path, None)
+    dir_path = os.path.dirname(os.path.abspath(file_path))
+    with _cache_lock:
+        _cached_yaml_data.pop(file_path, None)
+        # 下次读取时重新扫描目录
+        _dir_stat_map.pop(dir_path, None)
+
+
+def refresh_cache() -> None:
+    """
+    丢弃所有目录扫描的结果 下次读取时重新检查文件是否有变化
+    用于外部程序修改了配置文件后 需要马上读取的情况
+    """
+    with _cache_lock:
+        _dir_stat_map.clear()
+
+
+def get_load_stats() -> YamlLoadStats:
+    """
+    获取yml读取的统计
+    :return:
+    """
+    with _cache_lock:
+        return YamlLoadStats(
+            load_cnt=_load_stats.load_cnt,
+            load_seconds=_load_stats.load_seconds,
+            hit_cnt=_load_stats.hit_cnt,
+            scan_cnt=_load_stats.scan_cnt,
+        )
+
+
+def reset_load_stats() -> None:
+    """
+    重置yml读取的统计
+    """
+    global _load_stats
+    with _cache_lock:
+        _load_stats = YamlLoadStats()
 
 
 class YamlOperator:
@@ -50,11 +228,30 @@ class YamlOperator:
         self._copy_on_write_source_path: str | None = None
         """首次写入前需要复制到写入路径的来源文件"""
 
-        self.data: dict | list = {}
+        self._data: dict | list = {}
         """存放数据的地方"""
 
+        self._shared_key_set: set | None = None
+        """仍与缓存快照共享 还没有复制的字段"""
+
         self.__read_from_file()
 
+    @property
+    def data(self) -> dict | list:
+        """
+        存放数据的地方 访问时复制所有仍与缓存共享的字段
+        """
+        if self._shared_key_set:
+            for key in self._shared_key_set:
+                self._data[key] = copy_yaml_data(self._data[key])
+        self._shared_key_set = None
+        return self._data
+
+    @data.setter
+    def data(self, value: dict | list) -> None:
+        self._data = value
+        self._shared_key_set = None
+
     def __read_from_file(self) -> None:
         """
         从yml文件中读取数据
@@ -66,13 +263,17 @@ class YamlOperator:
             return
 
         try:
-            self.data = read_cache_or_load(self.file_path)
+            snapshot = get_snapshot(self.file_path)
         except Exception:
             log.error(f'文件读取失败 将使用默认值 {self.file_path}', exc_info=True)
             return
 
-        if self.data is None:
-            self.data = {}
+        if isinstance(snapshot, dict):
+            # 只复制根节点 嵌套的字典和列表在访问时再复制
+            self._data = dict(snapshot)
+            self._shared_key_set = {k for k, v in snapshot.items() if isinstance(v, dict | list)}
+        else:
+            self.data = copy_yaml_data(snapshot)
 
     def _ensure_write_path_ready(self) -> bool:
         write_path = self._get_write_path()
@@ -107,8 +308,8 @@ class YamlOperator:
         if write_path is None:
             return
 
-        # 把要写入的内容转成字符串
-        new_content = yaml.dump(self.data, allow_unicode=True, sort_keys=False)
+        # 把要写入的内容转成字符串 只读取数据 不需要复制共享的字段
+        new_content = yaml.dump(self._data, allow_unicode=True, sort_keys=False)
         # 尝试读取旧文件内容
         old_content = None
         try:
@@ -152,17 +353,23 @@ class YamlOperator:
                 self.old_file_path = write_path
 
     def get(self, prop: str, value=None):
-        if not isinstance(self.data, dict):
+        if not isinstance(self._data, dict):
             return value
-        return self.data.get(prop, value)
+        if self._shared_key_set and prop in self._shared_key_set:
+            # 调用方可能修改返回的字典或列表 第一次访问时复制
+            self._data[prop] = copy_yaml_data(self._data[prop])
+            self._shared_key_set.discard(prop)
+        return self._data.get(prop, value)
 
     def update(self, key: str, value, save: bool = True):
-        if not isinstance(self.data, dict):
+        if not isinstance(self._data, dict):
             # 根节点为 list 是合法 YAML；keyed update 只适用于 dict。
             return
-        if key in self.data and not isinstance(value, list) and self.data[key] == value:
+        if key in self._data and not isinstance(value, list) and self._data[key] == value:
             return
-        self.data[key] = value
+        self._data[key] = value
+        if self._shared_key_set:
+            self._shared_key_set.discard(key)
         if save:
             self.save()
 
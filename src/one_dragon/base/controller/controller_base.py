@@ -2,6 +2,11 @@ import time
 
 from cv2.typing import MatLike
 
+from one_dragon.base.controller.frame_producer import (
+    ControllerFrameCapturer,
+    FrameCapturer,
+    FrameProducer,
+)
 from one_dragon.base.geometry.point import Point
 
 
@@ -16,14 +21,21 @@ class ControllerBase:
 
     def __init__(self,
                  screenshot_alive_seconds: float = 5,
-                 max_screenshot_cnt: int = 0):
+                 max_screenshot_cnt: int = 0,
+                 background_screenshot: bool = False):
         """
         基础控制器的定义
+        :param background_screenshot: 运行时是否开启后台截图
         """
         self.screenshot_history: list[ScreenshotWithTime] = []
         self.screenshot_alive_seconds: float = screenshot_alive_seconds  # 截图在内存的存活时间
         self.max_screenshot_cnt: int = max_screenshot_cnt  # 内存中最多保持的截图数量
 
+        self.background_screenshot: bool = background_screenshot  # 运行时是否开启后台截图
+        self.frame_producer: FrameProducer | None = None  # 后台截图服务 开启后截图优先使用最新的一帧
+        self.frame_max_age: float = 0  # 后台截图允许的最长帧龄 秒
+        self.last_action_time: float = 0  # 最后一次输入操作 (点击、按键等) 完成的时间 后台截图只使用之后的帧
+
     def init_before_context_run(self) -> bool:
         """
         运行前初始化
@@ -31,11 +43,17 @@ class ControllerBase:
         """
         return False
 
+    def after_context_run(self) -> None:
+        """
+        运行结束后的清理 停止后台截图
+        """
+        self.stop_frame_producer()
+
     def cleanup_after_app_shutdown(self) -> None:
         """
         清理资源
         """
-        pass
+        self.stop_frame_producer()
 
     @property
     def is_game_window_ready(self) -> bool:
@@ -59,13 +77,24 @@ class ControllerBase:
     def screenshot(self, independent: bool = False) -> tuple[float, MatLike | None]:
         """
         截图并保存在内存中
+        开启了后台截图时 优先使用足够新 并且在最后一次输入操作之后的一帧 返回的是截图线程中的截图时间
         """
         self.before_screenshot()
-        screenshot_time = time.time()
-        screen = self.get_screenshot(independent)
-        if screen is None:
-            return screenshot_time, None
-        fix_screen = self.fill_uid_black(screen)
+        screenshot_time, fix_screen = None, None
+        producer = self.frame_producer
+        if not independent and producer is not None and producer.is_running:
+            screenshot_time, fix_screen = producer.get_latest_frame(
+                max_age=self.frame_max_age,
+                timeout=producer.frame_interval * 2,
+                after_time=self.last_action_time,
+            )
+
+        if fix_screen is None:
+            screenshot_time = time.time()
+            screen = self.get_screenshot(independent)
+            if screen is None:
+                return screenshot_time, None
+            fix_screen = self.fill_uid_black(screen)
 
         if self.max_screenshot_cnt > 0:
             self.screenshot_history.append(ScreenshotWithTime(fix_screen, screenshot_time))
@@ -78,6 +107,44 @@ class ControllerBase:
 
         return screenshot_time, fix_screen
 
+    def start_frame_producer(self, fps: float = 30, ring_size: int = 4,
+                             max_age: float | None = None,
+                             capturer: FrameCapturer | None = None) -> FrameProducer:
+        """
+        开启后台截图 已经开启时会先停止
+        :param fps: 目标帧率
+        :param ring_size: 保留的帧数
+        :param max_age: 允许的最长帧龄 秒 为空时使用一个截图间隔 超过时等待新的一帧 等不到则同步截图
+        :param capturer: 截图来源 为空时使用当前控制器截图
+        :return: 后台截图服务
+        """
+        self.stop_frame_producer()
+        producer = FrameProducer(
+            capturer if capturer is not None else ControllerFrameCapturer(self),
+            fps=fps,
+            ring_size=ring_size,
+        )
+        self.frame_max_age = producer.frame_interval if max_age is None else max_age
+        self.frame_producer = producer
+        producer.start()
+        return producer
+
+    def stop_frame_producer(self) -> None:
+        """
+        停止后台截图 之后恢复同步截图
+        """
+        producer = self.frame_producer
+        self.frame_producer = None
+        if producer is not None:
+            producer.stop()
+
+    def record_action_time(self) -> None:
+        """
+        记录一次输入操作完成的时间 之后的截图不会使用在这之前截取的后台帧
+        由子类在点击、按键等操作后调用
+        """
+        self.last_action_time = time.time()
+
     def before_screenshot(self) -> None:
         """
         截图前的操作 由子类实现
@@ -0,0 +1,386 @@
+"""后台截图服务。
+
+``FrameProducer`` 在独立线程中按目标帧率持续截图 放入固定大小的环形缓冲区;
+使用方获取最新的一帧和截图时间 不需要在自己的线程中等待截图和缩放。
+
+- 截图来源 ``FrameCapturer`` 可以替换 例如使用图片文件或视频代替游戏画面进行测试;
+- 每次截图得到的都是新的图片对象 发布后不会再被修改 因此获取时直接返回引用 不复制;
+- 使用方不应该原地修改获取到的图片。
+"""
+from __future__ import annotations
+
+import os
+import threading
+import time
+from collections.abc import Callable
+from dataclasses import dataclass
+from typing import TYPE_CHECKING
+
+import cv2
+from cv2.typing import MatLike
+
+from one_dragon.utils.log_utils import log
+
+if TYPE_CHECKING:
+    from one_dragon.base.controller.controller_base import ControllerBase
+
+
+class FrameCapturer:
+    """截图来源"""
+
+    def capture(self) -> MatLike | None:
+        """
+        截取一帧画面 每次都需要返回新的图片对象
+        :return: RGB图片 失败时返回None
+        """
+        pass
+
+    def close(self) -> None:
+        """
+        释放资源
+        """
+        pass
+
+
+class ControllerFrameCapturer(FrameCapturer):
+
+    def __init__(self, controller: ControllerBase):
+        """
+        使用控制器截图 和同步截图的处理一致 包括遮挡UID
+        :param controller: 控制器
+        """
+        self.controller: ControllerBase = controller
+
+    def capture(self) -> MatLike | None:
+        screen = self.controller.get_screenshot(False)
+        if screen is None:
+            return None
+        return self.controller.fill_uid_black(screen)
+
+
+class ImageListFrameCapturer(FrameCapturer):
+
+    def __init__(self, image_list: list[MatLike], loop: bool = True):
+        """
+        按顺序返回给定的图片 用于测试
+        图片会在截图时复制 保证每次返回的都是新的对象
+        :param image_list: RGB图片列表
+        :param loop: 结束后是否从头开始 不循环时结束后返回None
+        """
+        self.image_list: list[MatLike] = image_list
+        self.loop: bool = loop
+        self._idx: int = 0
+
+    def capture(self) -> MatLike | None:
+        if len(self.image_list) == 0:
+            return None
+        if self._idx >= len(self.image_list):
+            if not self.loop:
+                return None
+            self._idx = 0
+        image = self.image_list[self._idx]
+        self._idx += 1
+        return image.copy()
+
+    @staticmethod
+    def from_dir(dir_path: str, loop: bool = True) -> ImageListFrameCapturer:
+        """
+        读取文件夹中的所有图片 按文件名排序
+        :param dir_path: 文件夹路径
+        :param loop: 结束后是否从头开始
+        :return:
+        """
+        from one_dragon.utils import cv2_utils
+
+        image_list: list[MatLike] = []
+        for file_name in sorted(os.listdir(dir_path)):
+            if not file_name.lower().endswith(('.png', '.jpg', '.jpeg', '.webp', '.bmp')):
+                continue
+            image = cv2_utils.read_image(os.path.join(dir_path, file_name))
+            if image is not None:
+                image_list.append(image)
+        return ImageListFrameCapturer(image_list, loop=loop)
+
+
+class VideoFrameCapturer(FrameCapturer):
+
+    def __init__(self, video_path: str, loop: bool = True,
+                 size: tuple[int, int] | None = None):
+        """
+        按顺序返回视频中的每一帧 用于测试
+        :param video_path: 视频路径
+        :param loop: 结束后是否从头开始
+        :param size: 缩放后的大小 (宽, 高) 为空时不缩放
+        """
+        self.video_path: str = video_path
+        self.loop: bool = loop
+        self.size: tuple[int, int] | None = size
+        self._video = cv2.VideoCapture(video_path)
+
+    def capture(self) -> MatLike | None:
+        if self._video is None or not self._video.isOpened():
+            return None
+        ret, frame = self._video.read()
+        if not ret and self.loop:
+            self._video.set(cv2.CAP_PROP_POS_FRAMES, 0)
+            ret, frame = self._video.read()
+        if not ret:
+            return None
+        if self.size is not None:
+            frame = cv2.resize(frame, self.size)
+        return cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+
+    def close(self) -> None:
+        if self._video is not None:
+            self._video.release()
+            self._video = None
+
+
+class _FrameSlot:
+
+    __slots__ = ('image', 'capture_time', 'seq')
+
+    def __init__(self):
+        """
+        环形缓冲区的一个位置 创建后一直复用
+        """
+        self.image: MatLike | None = None
+        self.capture_time: float = 0
+        self.seq: int = 0  # 帧序号 从1开始 0表示未使用
+
+
+@dataclass
+class FrameProducerStats:
+    """后台截图的统计"""
+
+    running: bool = False
+    target_fps: float = 0
+    capture_fps: float = 0  # 最近一段时间的实际截图帧率
+    capture_ms: float = 0  # 最近一次截图的耗时
+    avg_capture_ms: float = 0  # 平均截图耗时
+    frame_age_ms: float = 0  # 最新一帧距离现在的时间
+    frame_cnt: int = 0  # 成功截图的次数
+    fail_cnt: int = 0  # 截图失败的次数
+    hit_cnt: int = 0  # 获取最新帧成功的次数
+    miss_cnt: int = 0  # 没有足够新的帧 需要使用方自己截图的次数
+
+
+class FrameProducer:
+
+    def __init__(self, capturer: FrameCapturer,
+                 fps: float = 30,
+                 ring_size: int = 4,
+                 on_frame: Callable[[float, MatLike], None] | None = None):
+        """
+        后台截图服务
+        :param capturer: 截图来源
+        :param fps: 目标帧率
+        :param ring_size: 环形缓冲区保留的帧数
+        :param on_frame: 每次截图后的回调 在截图线程中调用 参数为 (截图时间, 图片)
+        """
+        self.capturer: FrameCapturer = capturer
+        self.fps: float = max(1.0, fps)
+        self.ring_size: int = max(1, ring_size)
+        self.on_frame: Callable[[float, MatLike], None] | None = on_frame
+
+        self._slot_list: list[_FrameSlot] = [_FrameSlot() for _ in range(self.ring_size)]
+        self._latest_seq: int = 0
+        self._cond = threading.Condition()
+
+        self._thread: threading.Thread | None = None
+        self._stop_event = threading.Event()
+
+        # 统计
+        self._capture_ms: float = 0
+        self._total_capture_ms: float = 0
+        self._fail_cnt: int = 0
+        self._hit_cnt: int = 0
+        self._miss_cnt: int = 0
+        self._fps_window: list[float] = []  # 最近的截图时间 用于计算帧率
+
+    @property
+    def frame_interval(self) -> float:
+        """目标的截图间隔 秒"""
+        return 1.0 / self.fps
+
+    @property
+    def is_running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self) -> None:
+        """
+        开始后台截图 已经开始时不做任何事
+        """
+        if self.is_running:
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name='FrameProducer', daemon=True)
+        self._thread.start()
+        log.info(f'后台截图开始 目标帧率 {self.fps:.1f}')
+
+    def stop(self, timeout: float = 1) -> None:
+        """
+        停止后台截图 并释放截图来源的资源
+        :param timeout: 等待截图线程结束的时间
+        """
+        self._stop_event.set()
+        with self._cond:
+            self._cond.notify_all()
+        thread = self._thread
+        if thread is not None and thread is not threading.current_thread():
+            thread.join(timeout)
+        self._thread = None
+        self.capturer.close()
+        log.info('后台截图停止')
+
+    def _run(self) -> None:
+        """
+        截图线程 按目标帧率截图 截图耗时超过间隔时马上开始下一次
+        """
+        next_time = time.perf_counter()
+        while not self._stop_event.is_set():
+            start = time.perf_counter()
+            capture_time = time.time()
+            try:
+                image = self.capturer.capture()
+            except Exception:
+                log.debug('后台截图失败', exc_info=True)
+                image = None
+            cost = time.perf_counter() - start
+
+            if image is None:
+                self._fail_cnt += 1
+            else:
+                self._publish(image, capture_time, cost)
+                if self.on_frame is not None:
+                    try:
+                        self.on_frame(capture_time, image)
+                    except Exception:
+                        log.error('后台截图回调出错', exc_info=True)
+
+            next_time += self.frame_interval
+            now = time.perf_counter()
+            if next_time < now:
+                # 落后时不追赶 从现在开始重新计时
+                next_time = now
+            else:
+                self._stop_event.wait(next_time - now)
+
+    def _publish(self, image: MatLike, capture_time: float, cost: float) -> None:
+        """
+        放入环形缓冲区 覆盖最旧的一帧
+        """
+        with self._cond:
+            seq = self._latest_seq + 1
+            slot = self._slot_list[seq % self.ring_size]
+            slot.image = image
+            slot.capture_time = capture_time
+            slot.seq = seq
+            self._latest_seq = seq
+
+            self._capture_ms = cost * 1000
+            self._total_capture_ms += self._capture_ms
+            self._fps_window.append(capture_time)
+            if len(self._fps_window) > max(2, int(self.fps)):
+                self._fps_window.pop(0)
+
+            self._cond.notify_all()
+
+    def get_latest_frame(self, max_age: float | None = None,
+                         timeout: float = 0,
+                         after_time: float | None = None) -> tuple[float, MatLike] | tuple[None, None]:
+        """
+        获取最新的一帧 不复制图片
+        :param max_age: 允许的最长帧龄 秒 为空时不限制
+        :param timeout: 没有满足条件的帧时 最多等待多久
+        :param after_time: 截图时间需要晚于这个时间 例如最后一次操作的时间 为空时不限制
+        :return: (截图时间, 图片) 没有满足条件的帧时返回 (None, None)
+        """
+        min_time = None if max_age is None else time.time() - max_age
+        deadline = time.perf_counter() + timeout
+        with self._cond:
+            while True:
+                slot = self._get_latest_slot()
+                if (slot is not None
+                        and (min_time is None or slot.capture_time >= min_time)
+                        and (after_time is None or slot.capture_time > after_time)):
+                    self._hit_cnt += 1
+                    return slot.capture_time, slot.image
+
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0 or self._stop_event.is_set() or not self.is_running:
+                    self._miss_cnt += 1
+                    return None, None
+                self._cond.wait(remaining)
+
+    def wait_frame_after(self, after_time: float,
+                         timeout: float) -> tuple[float, MatLike] | tuple[None, None]:
+        """
+        等待截图时间晚于指定时间的一帧 不复制图片 不计入获取最新帧的统计
+        :param after_time: 截图时间需要晚于这个时间
+        :param timeout: 最多等待多久
+        :return: (截图时间, 图片) 超时或已停止时返回 (None, None)
+        """
+        deadline = time.perf_counter() + timeout
+        with self._cond:
+            while True:
+                slot = self._get_latest_slot()
+                if slot is not None and slot.capture_time > after_time:
+                    return slot.capture_time, slot.image
+
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0 or self._stop_event.is_set() or not self.is_running:
+                    return None, None
+                self._cond.wait(remaining)
+
+    def get_frame_list(self, cnt: int | None = None) -> list[tuple[float, MatLike]]:
+        """
+        获取缓冲区中最近的若干帧 不复制图片
+        :param cnt: 帧数 为空时返回全部
+        :return: [(截图时间, 图片)] 按时间从旧到新
+        """
+        with self._cond:
+            result: list[tuple[float, MatLike]] = []
+            seq = self._latest_seq
+            cnt = self.ring_size if cnt is None else min(cnt, self.ring_size)
+            while seq > 0 and len(result) < cnt:
+                slot = self._slot_list[seq % self.ring_size]
+                if slot.seq != seq:
+                    break
+                result.append((slot.capture_time, slot.image))
+                seq -= 1
+            result.reverse()
+            return result
+
+    def _get_latest_slot(self) -> _FrameSlot | None:
+        """
+        最新一帧所在的位置 需要在持有锁时调用
+        """
+        if self._latest_seq == 0:
+            return None
+        return self._slot_list[self._latest_seq % self.ring_size]
+
+    def get_stats(self) -> FrameProducerStats:
+        """
+        当前的统计信息
+        """
+        with self._cond:
+            slot = self._get_latest_slot()
+            frame_cnt = self._latest_seq
+            capture_fps = 0
+            if len(self._fps_window) > 1:
+                duration = self._fps_window[-1] - self._fps_window[0]
+                if duration > 0:
+                    capture_fps = (len(self._fps_window) - 1) / duration
+            return FrameProducerStats(
+                running=self.is_running,
+                target_fps=self.fps,
+                capture_fps=capture_fps,
+                capture_ms=self._capture_ms,
+                avg_capture_ms=self._total_capture_ms / frame_cnt if frame_cnt > 0 else 0,
+                frame_age_ms=(time.time() - slot.capture_time) * 1000 if slot is not None else 0,
+                frame_cnt=frame_cnt,
+                fail_cnt=self._fail_cnt,
+                hit_cnt=self._hit_cnt,
+                miss_cnt=self._miss_cnt,
+            )
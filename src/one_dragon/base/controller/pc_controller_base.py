@@ -44,8 +44,9 @@ class PcControllerBase(ControllerBase):
     def __init__(self,
                  screenshot_method: str,
                  standard_width: int = 1920,
-                 standard_height: int = 1080):
-        ControllerBase.__init__(self)
+                 standard_height: int = 1080,
+                 background_screenshot: bool = False):
+        ControllerBase.__init__(self, background_screenshot=background_screenshot)
         self.standard_width: int = standard_width
         self.standard_height: int = standard_height
         self.game_win: PcGameWindow = PcGameWindow(standard_width, standard_height)
@@ -81,12 +82,15 @@ class PcControllerBase(ControllerBase):
         self.init_game_win()
         if not self.background_mode:
             self.game_win.active()
+        if self.background_screenshot and (self.frame_producer is None or not self.frame_producer.is_running):
+            self.start_frame_producer()
         return True
 
     def cleanup_after_app_shutdown(self) -> None:
         """
         清理资源
         """
+        self.stop_frame_producer()
         self.btn_controller.reset()
         self.screenshot_controller.cleanup()
 
@@ -129,6 +133,7 @@ class PcControllerBase(ControllerBase):
             self._send_activate()
             self._ensure_gamepad_mode()
         self.btn_controller.tap(key)
+        self.record_action_time()
 
     def btn_press(self, key: str, press_time: float | None = None) -> None:
         """按住键。后台模式下先发 WM_ACTIVATE 再确保手柄输入模式。"""
@@ -136,10 +141,12 @@ class PcControllerBase(ControllerBase):
             self._send_activate()
             self._ensure_gamepad_mode()
         self.btn_controller.press(key, press_time)
+        self.record_action_time()
 
     def btn_release(self, key: str) -> None:
         """释放键。"""
         self.btn_controller.release(key)
+        self.record_action_time()
 
     @property
     def is_game_window_ready(self) -> bool:
@@ -296,10 +303,15 @@ class PcControllerBase(ControllerBase):
         """
         if self.background_mode:
             if gamepad_key:
-                return self._gamepad_click(gamepad_key)
-            return self._background_click(pos, press_time)
+                result = self._gamepad_click(gamepad_key)
+            else:
+                result = self._background_click(pos, press_time)
+        else:
+            result = self._foreground_click(pos, press_time, pc_alt)
 
-        return self._foreground_click(pos, press_time, pc_alt)
+        if result:
+            self.record_action_time()
+        return result
 
     def _foreground_click(self, pos: Point | None, press_time: float = 0.1, pc_alt: bool = False) -> bool:
         """前台点击：通过 pyautogui 点击，可选 ALT 解锁光标。
@@ -418,9 +430,10 @@ class PcControllerBase(ControllerBase):
             start = get_current_mouse_pos()
 
         if self.background_mode:
-            return self._background_drag(start, end, duration)
-
-        return self._foreground_drag(start, end, duration)
+            self._background_drag(start, end, duration)
+        else:
+            self._foreground_drag(start, end, duration)
+        self.record_action_time()
 
     def _foreground_drag(self, start: Point, end: Point, duration: float = 0.5) -> None:
         """前台拖拽：通过 pyautogui 按住拖动。
@@ -518,6 +531,7 @@ class PcControllerBase(ControllerBase):
             log.error('滚动位置不在游戏窗口区域 (%s)', pos)
             return
         win_scroll(down, win_pos)
+        self.record_action_time()
 
     def input_str(self, to_input: str, interval: float = 0.1) -> None:
         """输入文本 需要自己先选择好输入框。
@@ -526,6 +540,7 @@ class PcControllerBase(ControllerBase):
             to_input: 文本
         """
         self.keyboard_controller.keyboard.type(to_input)
+        self.record_action_time()
 
     def mouse_move(self, game_pos: Point) -> None:
         """
@@ -534,6 +549,7 @@ class PcControllerBase(ControllerBase):
         win_pos = self.game_win.game2win_pos(game_pos)
         if win_pos is not None:
             pyautogui.moveTo(win_pos.x, win_pos.y)
+            self.record_action_time()
             time.sleep(0.1)  # 原本 pyautogui 的操作会有0.1s延迟, 现在去掉了, 故在这里加上延迟
 
     @property
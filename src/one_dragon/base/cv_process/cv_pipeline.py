@@ -3,6 +3,7 @@ from typing import List, TYPE_CHECKING
 import numpy as np
 import time
 from one_dragon.base.cv_process.cv_step import CvStep, CvPipelineContext
+from one_dragon.base.cv_process.cv_step_cache import CvStepResultCache
 
 if TYPE_CHECKING:
     from one_dragon.base.cv_process.cv_service import CvService
@@ -15,8 +16,21 @@ class CvPipeline:
 
     def __init__(self):
         self.steps: List[CvStep] = []
+        self._step_key_list: list[tuple] | None = None  # 编译后各个步骤的键
 
-    def execute(self, source_image: np.ndarray, service: 'CvService | None' = None, debug_mode: bool = True, start_time: float | None = None, timeout: float | None = None) -> CvPipelineContext:
+    def compile(self) -> None:
+        """
+        预先计算各个步骤的键 之后步骤和参数不应该再修改
+        常驻的流水线在加载后编译 执行时可以复用同一帧画面上的步骤结果
+        """
+        self._step_key_list = [step.get_cache_key() for step in self.steps]
+
+    @property
+    def compiled(self) -> bool:
+        return self._step_key_list is not None and len(self._step_key_list) == len(self.steps)
+
+    def execute(self, source_image: np.ndarray, service: 'CvService | None' = None, debug_mode: bool = True, start_time: float | None = None, timeout: float | None = None,
+                step_cache: CvStepResultCache | None = None) -> CvPipelineContext:
         """
         按顺序执行流水线中的所有步骤，并记录时间
         :param source_image: 原始输入图像
@@ -24,12 +38,16 @@ class CvPipeline:
         :param debug_mode: 是否为调试模式
         :param start_time: 流水线开始执行的时间
         :param timeout: 允许的执行时间（秒），None表示无限制
+        :param step_cache: 步骤结果缓存 只在编译后的流水线上使用
         :return: 包含所有结果的上下文
         """
-        context = CvPipelineContext(source_image, service=service, debug_mode=debug_mode, start_time=start_time, timeout=timeout)
+        if not self.compiled:
+            step_cache = None
+        context = CvPipelineContext(source_image, service=service, debug_mode=debug_mode, start_time=start_time, timeout=timeout,
+                                    step_cache=step_cache)
         pipeline_start_time = context.start_time  # 使用context的开始时间
 
-        for _, step in enumerate(self.steps):
+        for idx, step in enumerate(self.steps):
             # 在每一步开始前检查超时
             if context.check_timeout():
                 context.error_str = f"流水线执行超时 (限制 {context.timeout} 秒)"
@@ -37,11 +55,24 @@ class CvPipeline:
                 break  # 超时则中断后续步骤
 
             step_start_time = time.time()
-            step.execute(context)
+            state_key = None
+            if step.memoizable and context.state_key is not None and context.is_success:
+                state_key = (context.state_key, self._step_key_list[idx])
+
+            snapshot = None if state_key is None else step_cache.get(source_image, state_key)
+            if snapshot is not None:
+                context.restore_snapshot(snapshot, state_key)
+            else:
+                analysis_begin = len(context.analysis_results)
+                step.execute(context)
+                if state_key is not None and context.is_success:
+                    step_cache.put(source_image, state_key, context.take_snapshot(analysis_begin))
+                    context.state_key = state_key
+
             step_end_time = time.time()
             execution_time_ms = (step_end_time - step_start_time) * 1000
             context.step_execution_times.append((step.name, execution_time_ms))
 
         pipeline_end_time = time.time()
         context.total_execution_time = (pipeline_end_time - pipeline_start_time) * 1000
-        return context
\ No newline at end of file
+        return context
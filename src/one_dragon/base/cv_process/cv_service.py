@@ -1,5 +1,6 @@
 # coding: utf-8
 import os
+import threading
 from typing import List, Dict, Type
 
 import cv2
@@ -8,6 +9,7 @@ import yaml
 
 from one_dragon.base.cv_process.cv_pipeline import CvPipeline, CvPipelineContext
 from one_dragon.base.cv_process.cv_step import CvStep
+from one_dragon.base.cv_process.cv_step_cache import CvStepResultCache
 from one_dragon.base.cv_process.steps import (
     CvStepFilterByRGB, CvStepFilterByHSV, CvErodeStep, CvDilateStep,
     CvMorphologyExStep, CvFindContoursStep, CvStepFilterByArea, CvStepFilterByArcLength,
@@ -61,6 +63,12 @@ class CvService:
             'OCR识别': CvStepOcr,
         }
 
+        # 常驻的流水线 流水线名称 -> (文件签名, 编译后的流水线)
+        self._pipeline_lock = threading.Lock()
+        self._resident_pipeline_map: dict[str, tuple[tuple[int, int], CvPipeline]] = {}
+        # 同一帧画面上 复用多个流水线相同前缀步骤的结果
+        self.step_cache: CvStepResultCache = CvStepResultCache()
+
         if not os.path.exists(self.PIPELINE_DIR):
             os.makedirs(self.PIPELINE_DIR)
         if not os.path.exists(self.TEMPLATE_DIR):
@@ -76,16 +84,60 @@ class CvService:
         :param timeout: 允许的执行时间（秒），None表示无限制
         :return: 包含所有结果的上下文
         """
-        pipeline = self.load_pipeline(pipeline_name)
+        pipeline = self.get_resident_pipeline(pipeline_name)
         if pipeline is None:
             ctx = CvPipelineContext(image, service=self, debug_mode=debug_mode, start_time=start_time, timeout=timeout)
             ctx.error_str = f"流水线 {pipeline_name} 加载失败"
             return ctx
 
-        result = pipeline.execute(image, service=self, debug_mode=debug_mode, start_time=start_time, timeout=timeout)
+        # 调试模式需要每个步骤真实执行
+        step_cache = None if debug_mode else self.step_cache
+        result = pipeline.execute(image, service=self, debug_mode=debug_mode, start_time=start_time, timeout=timeout,
+                                  step_cache=step_cache)
         self._emit_overlay_vision(pipeline_name, result)
         return result
 
+    def get_resident_pipeline(self, name: str) -> CvPipeline | None:
+        """
+        获取常驻内存的已编译流水线 文件有变化时重新加载
+        返回的流水线会被多个调用方共用 不能修改 需要修改时使用 load_pipeline
+        :param name: 流水线名称
+        :return:
+        """
+        file_path = os.path.join(self.PIPELINE_DIR, f"{name}.yml")
+        try:
+            stat = os.stat(file_path)
+        except OSError:
+            with self._pipeline_lock:
+                self._resident_pipeline_map.pop(name, None)
+            return None
+        signature = (stat.st_mtime_ns, stat.st_size)
+
+        with self._pipeline_lock:
+            cached = self._resident_pipeline_map.get(name)
+        if cached is not None and cached[0] == signature:
+            return cached[1]
+
+        pipeline = self.load_pipeline(name)
+        if pipeline is None:
+            return None
+        pipeline.compile()
+        with self._pipeline_lock:
+            self._resident_pipeline_map[name] = (signature, pipeline)
+        return pipeline
+
+    def clear_resident_pipeline(self, name: str | None = None) -> None:
+        """
+        清除常驻的流水线 下次使用时重新加载
+        :param name: 流水线名称 为None时清除全部
+        """
+        with self._pipeline_lock:
+            if name is None:
+                self._resident_pipeline_map.clear()
+            else:
+                self._resident_pipeline_map.pop(name, None)
+        self.step_cache.clear()
+
     def _emit_overlay_vision(self, pipeline_name: str, context: CvPipelineContext) -> None:
         bus = getattr(self.od_ctx, "overlay_debug_bus", None)
         if bus is None or context is None:
@@ -205,6 +257,7 @@ class CvService:
         file_path = os.path.join(self.PIPELINE_DIR, f"{name}.yml")
         with open(file_path, 'w', encoding='utf-8') as f:
             yaml.dump(data_to_save, f, allow_unicode=True, sort_keys=False)
+        self.clear_resident_pipeline(name)
 
         return True
 
@@ -245,6 +298,7 @@ class CvService:
         file_path = os.path.join(self.PIPELINE_DIR, f"{name}.yml")
         if os.path.exists(file_path):
             os.remove(file_path)
+        self.clear_resident_pipeline(name)
 
     def rename_pipeline(self, old_name: str, new_name: str):
         """
@@ -260,6 +314,8 @@ class CvService:
 
         if os.path.exists(old_file_path) and not os.path.exists(new_file_path):
             os.rename(old_file_path, new_file_path)
+            self.clear_resident_pipeline(old_name)
+            self.clear_resident_pipeline(new_name)
 
     def get_template_names(self) -> List[str]:
         """
@@ -3,6 +3,7 @@ from typing import Dict, Any, List, TYPE_CHECKING
 import cv2
 import numpy as np
 import time
+from one_dragon.base.cv_process.cv_step_cache import CvStepResultCache, CvStepSnapshot
 from one_dragon.base.matcher.match_result import MatchResult
 from one_dragon.utils import cv2_utils
 
@@ -14,13 +15,12 @@ class CvPipelineContext:
     """
     一个图像处理流水线的上下文
     """
-    def __init__(self, source_image: np.ndarray, service: 'CvService | None' = None, debug_mode: bool = True, start_time: float | None = None, timeout: float | None = None):
+    def __init__(self, source_image: np.ndarray, service: 'CvService | None' = None, debug_mode: bool = True, start_time: float | None = None, timeout: float | None = None,
+                 step_cache: CvStepResultCache | None = None):
         self.source_image: np.ndarray = source_image  # 原始输入图像 (只读)
         self.service: 'CvService' = service
         self.debug_mode: bool = debug_mode  # 是否为调试模式
-        self.display_image: np.ndarray = source_image.copy()  # 用于UI显示的主图像，可被修改
         self.crop_offset: tuple[int, int] = (0, 0)  # display_image 左上角相对于 source_image 的坐标偏移
-        self.mask_image: np.ndarray = None  # 二值掩码图像
         self.contours: List[np.ndarray] = []  # 检测到的轮廓列表
         self.analysis_results: List[str] = []  # 存储分析结果的字符串列表
         self.match_result: MatchResult = None
@@ -30,10 +30,177 @@ class CvPipelineContext:
         self.error_str: str = None  # 致命错误信息
         self.success: bool = True  # 流水线逻辑是否成功
 
+        # 用于UI显示的主图像 按需生成
+        # 连续的逐像素步骤 (灰度化、二值化、颜色过滤、腐蚀膨胀) 只计算掩码 显示图像在真正被读取时才一次性生成
+        self._display_base: np.ndarray = source_image  # 显示图像的基础
+        self._display_gray: bool = False  # 基础是单通道灰度图 显示时转为3通道
+        self._display_gate: np.ndarray | None = None  # 还没应用到显示图像上的掩码
+        self._display_shared: bool = True  # 基础与原图或缓存共享内存 修改前需要复制
+        self._mask_image: np.ndarray | None = None  # 二值掩码图像
+
+        # 步骤结果缓存 同一帧画面上复用相同前缀步骤的结果
+        self.step_cache: CvStepResultCache | None = step_cache
+        self.state_key: tuple | None = () if step_cache is not None else None  # 当前图像状态的键 为None时不使用缓存
+
         # 超时控制相关
         self.start_time: float = start_time if start_time is not None else time.time()
         self.timeout: float = timeout  # 允许的执行时间（秒），None表示无限制
 
+    @property
+    def display_image(self) -> np.ndarray:
+        """
+        用于UI显示的主图像 调用方可以原地修改 只读时使用 peek_display_image
+        :return:
+        """
+        self._materialize_display()
+        if self._display_shared:
+            self._display_base = self._display_base.copy()
+            self._display_shared = False
+        self.state_key = None  # 调用方可能修改图像 之后不能再复用步骤结果
+        return self._display_base
+
+    @display_image.setter
+    def display_image(self, image: np.ndarray) -> None:
+        self._display_base = image
+        self._display_gray = False
+        self._display_gate = None
+        self._display_shared = False
+        self.state_key = None
+
+    @property
+    def mask_image(self) -> np.ndarray | None:
+        return self._mask_image
+
+    @mask_image.setter
+    def mask_image(self, image: np.ndarray | None) -> None:
+        self._mask_image = image
+        self.state_key = None
+
+    def peek_display_image(self) -> np.ndarray:
+        """
+        只读地获取显示图像 不会为了防止修改而复制
+        :return:
+        """
+        self._materialize_display()
+        return self._display_base
+
+    def _materialize_display(self) -> None:
+        """
+        把还没应用的灰度转换和掩码 一次性应用到显示图像上
+        """
+        if not self._display_gray and self._display_gate is None:
+            return
+        image = self._display_base
+        if self._display_gray:
+            image = cv2.cvtColor(image, cv2.COLOR_GRAY2RGB)
+        if self._display_gate is not None:
+            image = cv2.bitwise_and(image, image, mask=self._display_gate)
+        self._display_base = image
+        self._display_gray = False
+        self._display_gate = None
+        self._display_shared = False
+
+    def get_display_gray(self) -> np.ndarray | None:
+        """
+        获取显示图像的灰度图 不需要先生成3通道的显示图像
+        :return: 显示图像已经是单通道时返回None
+        """
+        if self._display_gray:
+            gray = self._display_base
+        elif len(self._display_base.shape) == 3:
+            gray = cv2.cvtColor(self._display_base, cv2.COLOR_RGB2GRAY)
+        else:
+            return None
+
+        if self._display_gate is not None:
+            # 被掩码去掉的像素为黑色 灰度也是0
+            gray = cv2.bitwise_and(gray, gray, mask=self._display_gate)
+        return gray
+
+    def get_display_hsv(self) -> np.ndarray:
+        """
+        获取显示图像的HSV图 同一帧画面的相同图像状态只转换一次
+        :return:
+        """
+        cache_key = None if self.state_key is None else (self.state_key, 'hsv')
+        if cache_key is not None:
+            hsv_image = self.step_cache.get(self.source_image, cache_key)
+            if hsv_image is not None:
+                return hsv_image
+
+        hsv_image = cv2.cvtColor(self.peek_display_image(), cv2.COLOR_RGB2HSV)
+        if cache_key is not None:
+            self.step_cache.put(self.source_image, cache_key, hsv_image)
+        return hsv_image
+
+    def set_display_gray(self, gray: np.ndarray) -> None:
+        """
+        使用灰度图作为显示图像 转换为3通道的操作延迟到读取时
+        :param gray: 单通道灰度图
+        """
+        self._display_base = gray
+        self._display_gray = True
+        self._display_gate = None
+        self._display_shared = True
+        self.state_key = None
+
+    def mask_display(self, mask: np.ndarray) -> None:
+        """
+        只保留显示图像上掩码非0的部分 效果与 cv2.bitwise_and(display, display, mask=mask) 相同
+        连续的掩码会先合并 读取时只需要处理一次图像
+        :param mask: 掩码
+        """
+        if self._display_gate is None:
+            self._display_gate = mask
+        else:
+            # 两个掩码都非0的像素才保留
+            self._display_gate = cv2.min(self._display_gate, mask)
+        self.state_key = None
+
+    def crop_display(self, rect) -> None:
+        """
+        裁剪显示图像 只产生视图 不复制图像
+        :param rect: 裁剪区域
+        """
+        self._display_base = cv2_utils.crop_image_only(self._display_base, rect)
+        if self._display_gate is not None:
+            self._display_gate = cv2_utils.crop_image_only(self._display_gate, rect)
+        if self.state_key is not None and self._mask_image is None:
+            self.state_key = (self.state_key, 'crop', rect.x1, rect.y1, rect.x2, rect.y2)
+        else:
+            self.state_key = None
+
+    def take_snapshot(self, analysis_begin: int) -> CvStepSnapshot:
+        """
+        记录当前的图像状态 之后的步骤不能再原地修改这些图像
+        :param analysis_begin: 这个步骤开始前 分析结果的数量
+        :return:
+        """
+        self._display_shared = True
+        return CvStepSnapshot(
+            display_base=self._display_base,
+            display_gray=self._display_gray,
+            display_gate=self._display_gate,
+            mask_image=self._mask_image,
+            crop_offset=self.crop_offset,
+            analysis_results=self.analysis_results[analysis_begin:],
+        )
+
+    def restore_snapshot(self, snapshot: CvStepSnapshot, state_key: tuple) -> None:
+        """
+        恢复一个步骤执行后的图像状态
+        :param snapshot: 步骤结果
+        :param state_key: 恢复后的图像状态的键
+        """
+        self._display_base = snapshot.display_base
+        self._display_gray = snapshot.display_gray
+        self._display_gate = snapshot.display_gate
+        self._display_shared = True
+        self._mask_image = snapshot.mask_image
+        self.crop_offset = snapshot.crop_offset
+        self.analysis_results.extend(snapshot.analysis_results)
+        self.state_key = state_key
+
     @property
     def is_success(self) -> bool:
         """
@@ -141,6 +308,10 @@ class CvStep:
     所有图像处理步骤的基类
     """
 
+    # 步骤的结果是否只由图像状态 (显示图像、掩码、裁剪偏移) 和参数决定 并且只修改图像状态和分析结果
+    # 这样的步骤在同一帧画面上可以复用之前的结果
+    memoizable: bool = False
+
     def __init__(self, name: str):
         self.name = name
         self.params: Dict[str, Any] = {}
@@ -192,6 +363,16 @@ class CvStep:
                 else:
                     self.params[param_name] = value
 
+    def get_cache_key(self) -> tuple:
+        """
+        步骤和参数组成的键 用于复用步骤结果
+        :return:
+        """
+        return self.name, tuple(
+            (key, tuple(value) if isinstance(value, list) else value)
+            for key, value in sorted(self.params.items())
+        )
+
     def get_description(self) -> str:
         """
         获取该步骤的详细说明
@@ -226,7 +407,7 @@ class CvStep:
             context.success = False
             return
 
-        context.display_image = cv2_utils.crop_image_only(context.display_image, rect)
+        context.crop_display(rect)
 
         # 累加偏移量
         context.crop_offset = (context.crop_offset[0] + rect.x1, context.crop_offset[1] + rect.y1)
@@ -0,0 +1,113 @@
+import threading
+import weakref
+from collections import OrderedDict
+from collections.abc import Hashable
+from dataclasses import dataclass
+from typing import Any
+
+import numpy as np
+
+
+@dataclass
+class CvStepSnapshot:
+    """
+    一个步骤执行后的上下文状态 其中的图像只读 恢复时共享内存
+    """
+    display_base: np.ndarray
+    display_gray: bool
+    display_gate: np.ndarray | None
+    mask_image: np.ndarray | None
+    crop_offset: tuple[int, int]
+    analysis_results: list[str]  # 这个步骤新增的分析结果
+
+
+class _FrameResult:
+
+    def __init__(self, source_ref: weakref.ref):
+        """
+        一帧画面上的所有步骤结果
+        """
+        self.source_ref: weakref.ref = source_ref
+        self.result_map: OrderedDict[Hashable, Any] = OrderedDict()
+
+
+class CvStepResultCache:
+
+    def __init__(self, max_frame_cnt: int = 4, max_result_cnt: int = 64):
+        """
+        流水线步骤结果的缓存 按输入的画面区分
+        同一帧画面上 多个流水线有相同的前缀步骤时 (例如相同的裁剪和HSV过滤) 可以复用结果
+        画面对象被回收后 对应的结果不会再被使用
+        :param max_frame_cnt: 最多保留多少帧画面的结果 多个线程可能同时在不同的画面上运行流水线
+        :param max_result_cnt: 每帧画面最多保留的结果数量
+        """
+        self.max_frame_cnt: int = max(1, max_frame_cnt)
+        self.max_result_cnt: int = max(1, max_result_cnt)
+
+        self._lock = threading.Lock()
+        self._frame_map: OrderedDict[int, _FrameResult] = OrderedDict()
+
+        # 统计
+        self.hit_cnt: int = 0
+        self.miss_cnt: int = 0
+
+    def get(self, source_image: np.ndarray, key: Hashable) -> Any:
+        """
+        获取一个步骤结果
+        :param source_image: 流水线输入的原始画面
+        :param key: 结果的键
+        :return: 没有缓存时返回None
+        """
+        with self._lock:
+            frame = self._get_frame(source_image)
+            result = None if frame is None else frame.result_map.get(key)
+            if result is None:
+                self.miss_cnt += 1
+            else:
+                self.hit_cnt += 1
+            return result
+
+    def put(self, source_image: np.ndarray, key: Hashable, result: Any) -> None:
+        """
+        保存一个步骤结果
+        :param source_image: 流水线输入的原始画面
+        :param key: 结果的键
+        :param result: 步骤结果
+        """
+        with self._lock:
+            frame = self._get_frame(source_image)
+            if frame is None:
+                # 先丢弃已经被回收的画面
+                for frame_id in [k for k, v in self._frame_map.items() if v.source_ref() is None]:
+                    del self._frame_map[frame_id]
+                frame = _FrameResult(weakref.ref(source_image))
+                self._frame_map[id(source_image)] = frame
+                while len(self._frame_map) > self.max_frame_cnt:
+                    self._frame_map.popitem(last=False)
+
+            frame.result_map[key] = result
+            frame.result_map.move_to_end(key)
+            while len(frame.result_map) > self.max_result_cnt:
+                frame.result_map.popitem(last=False)
+
+    def clear(self) -> None:
+        """
+        清除所有结果
+        """
+        with self._lock:
+            self._frame_map.clear()
+
+    def _get_frame(self, source_image: np.ndarray) -> _FrameResult | None:
+        """
+        获取画面对应的结果 需要在持有锁时调用
+        """
+        frame_id = id(source_image)
+        frame = self._frame_map.get(frame_id)
+        if frame is None:
+            return None
+        if frame.source_ref() is not source_image:
+            # 原画面已经被回收 id被新的画面复用
+            del self._frame_map[frame_id]
+            return None
+        self._frame_map.move_to_end(frame_id)
+        return frame
@@ -5,6 +5,8 @@ from one_dragon.base.cv_process.cv_step import CvStep, CvPipelineContext
 
 class CvStepCropByArea(CvStep):
 
+    memoizable = True
+
     def __init__(self):
         super().__init__('按区域裁剪')
 
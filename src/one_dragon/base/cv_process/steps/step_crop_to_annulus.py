@@ -7,6 +7,8 @@ from one_dragon.base.cv_process.cv_step import CvStep, CvPipelineContext
 
 class CvStepCropToAnnulus(CvStep):
 
+    memoizable = True
+
     def __init__(self):
         super().__init__('环形裁剪')
 
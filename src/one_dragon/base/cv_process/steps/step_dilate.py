@@ -7,6 +7,8 @@ from one_dragon.base.cv_process.cv_step import CvStep, CvPipelineContext
 
 class CvDilateStep(CvStep):
 
+    memoizable = True
+
     def __init__(self):
         super().__init__('膨胀')
 
@@ -25,4 +27,4 @@ class CvDilateStep(CvStep):
         kernel = np.ones((kernel_size, kernel_size), np.uint8)
         dilated_mask = cv2.dilate(context.mask_image, kernel, iterations=iterations)
         context.mask_image = dilated_mask
-        context.display_image = cv2.bitwise_and(context.display_image, context.display_image, mask=dilated_mask)
\ No newline at end of file
+        context.mask_display(dilated_mask)
\ No newline at end of file
@@ -7,6 +7,8 @@ from one_dragon.base.cv_process.cv_step import CvStep, CvPipelineContext
 
 class CvErodeStep(CvStep):
 
+    memoizable = True
+
     def __init__(self):
         super().__init__('腐蚀')
 
@@ -25,4 +27,4 @@ class CvErodeStep(CvStep):
         kernel = np.ones((kernel_size, kernel_size), np.uint8)
         eroded_mask = cv2.erode(context.mask_image, kernel, iterations=iterations)
         context.mask_image = eroded_mask
-        context.display_image = cv2.bitwise_and(context.display_image, context.display_image, mask=eroded_mask)
\ No newline at end of file
+        context.mask_display(eroded_mask)
\ No newline at end of file
@@ -1,12 +1,13 @@
 # coding: utf-8
 from typing import Dict, Any
-import cv2
 from one_dragon.base.cv_process.cv_step import CvStep, CvPipelineContext
 from one_dragon.utils import cv2_utils
 
 
 class CvStepFilterByHSV(CvStep):
 
+    memoizable = True
+
     def __init__(self):
         super().__init__('HSV 范围过滤')
 
@@ -20,6 +21,7 @@ class CvStepFilterByHSV(CvStep):
         return "根据 HSV 颜色过滤图像。 `hsv_color` 参数指定要匹配的中心颜色，`hsv_diff` 参数指定 H, S, V 三个通道的容差范围。"
 
     def _execute(self, context: CvPipelineContext, hsv_color: tuple = (0, 0, 0), hsv_diff: tuple = (10, 255, 255), **kwargs):
-        mask = cv2_utils.filter_by_color(context.display_image, mode='hsv', hsv_color=hsv_color, hsv_diff=hsv_diff)
+        mask = cv2_utils.filter_by_color(context.peek_display_image(), mode='hsv', hsv_color=hsv_color, hsv_diff=hsv_diff,
+                                         hsv_image=context.get_display_hsv())
         context.mask_image = mask
-        context.display_image = cv2.bitwise_and(context.display_image, context.display_image, mask=mask)
\ No newline at end of file
+        context.mask_display(mask)
\ No newline at end of file
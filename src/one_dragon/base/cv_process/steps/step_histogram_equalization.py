@@ -5,6 +5,8 @@ from one_dragon.base.cv_process.cv_step import CvStep, CvPipelineContext
 
 class CvStepHistogramEqualization(CvStep):
 
+    memoizable = True
+
     def __init__(self):
         super().__init__('直方图均衡化')
 
@@ -15,7 +17,7 @@ class CvStepHistogramEqualization(CvStep):
         # 确保在灰度图上操作
         if context.mask_image is not None and len(context.mask_image.shape) == 2:
             equalized_image = cv2.equalizeHist(context.mask_image)
-            context.display_image = cv2.cvtColor(equalized_image, cv2.COLOR_GRAY2RGB)
+            context.set_display_gray(equalized_image)
             context.mask_image = equalized_image
             context.analysis_results.append("已应用直方图均衡化")
         else:
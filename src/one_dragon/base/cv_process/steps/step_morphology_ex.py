@@ -6,7 +6,9 @@ from one_dragon.base.cv_process.cv_step import CvStep, CvPipelineContext
 
 
 class CvMorphologyExStep(CvStep):
-    
+
+    memoizable = True
+
     def __init__(self):
         self.op_map = {
             '开运算': cv2.MORPH_OPEN,
@@ -35,4 +37,4 @@ class CvMorphologyExStep(CvStep):
         kernel = np.ones((kernel_size, kernel_size), np.uint8)
         morph_mask = cv2.morphologyEx(context.mask_image, cv2_op, kernel)
         context.mask_image = morph_mask
-        context.display_image = cv2.bitwise_and(context.display_image, context.display_image, mask=morph_mask)
\ No newline at end of file
+        context.mask_display(morph_mask)
\ No newline at end of file
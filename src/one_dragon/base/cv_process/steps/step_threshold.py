@@ -6,6 +6,8 @@ from one_dragon.base.cv_process.cv_step import CvStep, CvPipelineContext
 
 class CvStepThreshold(CvStep):
 
+    memoizable = True
+
     def __init__(self):
         self.method_map = {
             'BINARY': cv2.THRESH_BINARY,
@@ -52,4 +54,4 @@ class CvStepThreshold(CvStep):
             context.analysis_results.append(f"已应用全局二值化 (阈值: {threshold_value})")
 
         context.mask_image = thresh_image
-        context.display_image = cv2.cvtColor(thresh_image, cv2.COLOR_GRAY2RGB)
\ No newline at end of file
+        context.set_display_gray(thresh_image)
\ No newline at end of file
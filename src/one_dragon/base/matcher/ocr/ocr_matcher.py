@@ -2,6 +2,7 @@ from collections.abc import Callable
 
 from cv2.typing import MatLike
 
+from one_dragon.base.geometry.point import Point
 from one_dragon.base.geometry.rectangle import Rect
 from one_dragon.base.matcher.match_result import MatchResultList
 from one_dragon.base.matcher.ocr.ocr_match_result import OcrMatchResult
@@ -81,6 +82,39 @@ class OcrMatcher:
         """
         raise NotImplementedError('由具体的OCR实现提供')
 
+    def batch_ocr(
+            self,
+            image_list: list[MatLike],
+            threshold: float = 0,
+            merge_line_distance: float = -1,
+            offset_list: list[Point] | None = None,
+    ) -> list[list[OcrMatchResult]]:
+        """
+        对多张图片进行OCR 返回每张图片的识别结果
+        默认逐张识别 具体实现可以合并成批次推理
+
+        Args:
+            image_list: 图片列表
+            threshold: 匹配阈值
+            merge_line_distance: 多少行距内合并结果 -1为不合并
+            offset_list: 每张图片在原图中的偏移 仅用于 overlay 显示 结果坐标仍是各自图片内的坐标
+
+        Returns:
+            ocr_result_list_list: 与 image_list 一一对应的识别结果列表
+        """
+        bus = getattr(self, 'overlay_debug_bus', None)
+        result_list: list[list[OcrMatchResult]] = []
+        for idx, image in enumerate(image_list):
+            offset = offset_list[idx] if offset_list is not None else None
+            if bus is not None and offset is not None:
+                bus.set_crop_offset(offset.x, offset.y)
+            try:
+                result_list.append(self.ocr(image, threshold, merge_line_distance))
+            finally:
+                if bus is not None and offset is not None:
+                    bus.reset_crop_offset()
+        return result_list
+
     def crop_and_run_ocr(
             self,
             image: MatLike,
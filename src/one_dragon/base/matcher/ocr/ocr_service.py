@@ -1,10 +1,15 @@
+import hashlib
+import sys
+import threading
 import time
+from collections import OrderedDict
 from dataclasses import dataclass
 
 import cv2
 import numpy as np
 from cv2.typing import MatLike
 
+from one_dragon.base.geometry.point import Point
 from one_dragon.base.geometry.rectangle import Rect
 from one_dragon.base.matcher.match_result import MatchResultList
 from one_dragon.base.matcher.ocr.ocr_match_result import OcrMatchResult
@@ -17,19 +22,32 @@ from one_dragon.utils.log_utils import log
 @dataclass(frozen=True)
 class OcrCacheEntry:
     """OCR缓存条目"""
-    image_id: int  # 图片在内存中的ID
-    image: MatLike  # 将图片也缓存起来 防止旧图片没引用被回收 导致出现新图片ID与旧图片重复
-    ocr_result_list: list[OcrMatchResult]  # OCR识别结果
+    key: tuple  # 缓存键 由识别图片的内容哈希和识别参数组成
+    ocr_result_list: list[OcrMatchResult]  # OCR识别结果 坐标已经是原图坐标
     create_time: float  # 创建时间
-    color_range: list[list[int]] | None  # 颜色范围
-    rect: Rect | None = None  # 识别区域
-    crop_first: bool = True  # 先裁剪再识别 用于从连续文本中只提取特定区域的文本
+    size: int  # 估算占用的字节数
+
+
+@dataclass
+class OcrCacheStats:
+    """OCR缓存统计"""
+    hit: int = 0  # 命中次数
+    miss: int = 0  # 未命中次数
+    expired: int = 0  # 因过期被丢弃的次数
+    evicted: int = 0  # 因容量不足被淘汰的次数
+    entry_cnt: int = 0  # 当前缓存条目数
+    total_bytes: int = 0  # 当前缓存估算字节数
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hit + self.miss
+        return self.hit / total if total > 0 else 0
 
 
 class OcrService:
     """
     OCR服务
-    - 提供缓存
+    - 提供缓存 按识别区域的内容哈希缓存 画面不变时连续截图也能复用识别结果
     - 提供并发识别 (未实现)
 
     缺点：
@@ -40,96 +58,257 @@ class OcrService:
     def __init__(
         self,
         ocr_matcher: OcrMatcher,
-        max_cache_size: int = 5,
+        max_cache_bytes: int = 4 * 1024 * 1024,
+        cache_ttl: float = 30,
+        max_digest_memo_size: int = 16,
     ):
         """
         初始化OCR服务
 
         Args:
             ocr_matcher: OCR匹配器实例
-            max_cache_size: 最大缓存条目数
+            max_cache_bytes: 缓存占用的最大字节数(估算值) 超出后按最近最少使用淘汰
+            cache_ttl: 缓存有效时间(秒) 超过后重新识别
+            max_digest_memo_size: 同一张图片多次识别时 记录图片哈希的最大数量 避免重复计算哈希
         """
         self.ocr_matcher = ocr_matcher
-        self.max_cache_size = max_cache_size
+        self.max_cache_bytes: int = max_cache_bytes
+        self.cache_ttl: float = cache_ttl
+        self.max_digest_memo_size: int = max_digest_memo_size
+
+        # 缓存存储：key=内容哈希+识别参数 按最近使用顺序排列
+        self._cache: OrderedDict[tuple, OcrCacheEntry] = OrderedDict()
+        self._cache_bytes: int = 0
+        self._stats: OcrCacheStats = OcrCacheStats()
+        self._cache_lock = threading.Lock()
+
+        # 同一张图片的哈希记录：key=(图片ID, 识别参数) value=(图片, 缓存键)
+        # 将图片也保存起来 防止旧图片没引用被回收 导致出现新图片ID与旧图片重复
+        self._digest_memo: OrderedDict[tuple, tuple[MatLike, tuple]] = OrderedDict()
+
+    @staticmethod
+    def _cal_content_digest(image: MatLike) -> bytes:
+        """
+        计算图片内容的哈希
 
-        # 缓存存储：key=图片ID，value为缓存条目
-        self._cache: dict[int, list[OcrCacheEntry]] = {}
-        self._cache_list: list[OcrCacheEntry] = []
+        使用完整像素内容计算 只有内容完全一致才会命中
+        数字等细微变化也会被区分 不会误用旧的识别结果
 
-    def _clean_expired_cache(self) -> None:
+        Args:
+            image: 图片
+
+        Returns:
+            哈希值
         """
-        清除过期缓存
+        h = hashlib.blake2b(digest_size=16)
+        h.update(str((image.shape, image.dtype.str)).encode())
+        h.update(np.ascontiguousarray(image).data)
+        return h.digest()
+
+    @staticmethod
+    def _estimate_entry_size(key: tuple, ocr_result_list: list[OcrMatchResult]) -> int:
+        """
+        估算缓存条目占用的字节数
+
+        Args:
+            key: 缓存键
+            ocr_result_list: OCR识别结果
+
         Returns:
+            字节数
+        """
+        size = 256 + sys.getsizeof(key)
+        for ocr_result in ocr_result_list:
+            size += 256 + sys.getsizeof(ocr_result.data)
+        return size
 
+    @staticmethod
+    def _copy_result_list(ocr_result_list: list[OcrMatchResult]) -> list[OcrMatchResult]:
         """
-        while len(self._cache_list) > self.max_cache_size:
-            oldest_entry = self._cache_list.pop(0)
-            image_id = oldest_entry.image_id
+        复制识别结果 防止调用方修改结果(例如 add_offset)后影响缓存
 
-            if image_id in self._cache:
-                # 从与 image_id 关联的列表中移除特定的条目
-                try:
-                    self._cache[image_id].remove(oldest_entry)
-                    # 如果这个 image_id 的列表现在为空，则从字典中移除该键
-                    if not self._cache[image_id]:
-                        self._cache.pop(image_id)
-                except ValueError:
-                    # 在罕见的并发场景下，如果条目已经被移除，可能会发生这种情况，但可以安全地忽略。
-                    pass
+        Args:
+            ocr_result_list: OCR识别结果
 
-    def _apply_color_filter(self, image: MatLike, color_range: list[list[int]]) -> MatLike:
+        Returns:
+            复制后的识别结果
         """
-        应用颜色过滤，最后返回RGB格式的黑白图，用于OCR。
-        不返回原图颜色是因为，如果使用黑色过滤，最后得到会是一个全黑的图片，无法进行识别。
+        return [
+            OcrMatchResult(
+                c=i.confidence,
+                x=i.x,
+                y=i.y,
+                w=i.w,
+                h=i.h,
+                template_scale=i.template_scale,
+                data=i.data,
+            )
+            for i in ocr_result_list
+        ]
+
+    def _get_from_cache(self, key: tuple) -> OcrCacheEntry | None:
+        """
+        从缓存中获取OCR结果 过期的条目会被移除
+
+        Args:
+            key: 缓存键
+
+        Returns:
+            缓存条目
+        """
+        with self._cache_lock:
+            cache_entry = self._cache.get(key)
+            if cache_entry is not None and time.time() - cache_entry.create_time > self.cache_ttl:
+                self._remove_entry(cache_entry)
+                self._stats.expired += 1
+                cache_entry = None
+
+            if cache_entry is None:
+                self._stats.miss += 1
+                return None
+
+            self._cache.move_to_end(key)
+            self._stats.hit += 1
+            return cache_entry
+
+    def _put_into_cache(self, key: tuple, ocr_result_list: list[OcrMatchResult]) -> None:
+        """
+        存储到缓存 超出容量时淘汰最近最少使用的条目
+
+        Args:
+            key: 缓存键
+            ocr_result_list: OCR识别结果
+        """
+        cache_entry = OcrCacheEntry(
+            key=key,
+            ocr_result_list=ocr_result_list,
+            create_time=time.time(),
+            size=self._estimate_entry_size(key, ocr_result_list),
+        )
+        with self._cache_lock:
+            old_entry = self._cache.get(key)
+            if old_entry is not None:
+                self._remove_entry(old_entry)
+            self._cache[key] = cache_entry
+            self._cache_bytes += cache_entry.size
+            self._clean_expired_cache()
+
+    def _remove_entry(self, cache_entry: OcrCacheEntry) -> None:
+        """
+        移除缓存条目 调用方需持有锁
+
+        Args:
+            cache_entry: 缓存条目
+        """
+        if self._cache.pop(cache_entry.key, None) is not None:
+            self._cache_bytes -= cache_entry.size
+
+    def _clean_expired_cache(self) -> None:
+        """
+        清除超出容量的缓存 调用方需持有锁
+        """
+        while self._cache_bytes > self.max_cache_bytes and len(self._cache) > 1:
+            _, oldest_entry = self._cache.popitem(last=False)
+            self._cache_bytes -= oldest_entry.size
+            self._stats.evicted += 1
+
+    def _get_cache_key(
+        self,
+        image: MatLike,
+        color_range: list[list[int]] | None,
+        rect: Rect | None,
+        crop_first: bool,
+        threshold: float,
+        merge_line_distance: float,
+    ) -> tuple[tuple, MatLike | None, Rect | None]:
+        """
+        计算缓存键
 
         Args:
             image: 输入图片
-            color_range: 颜色范围 [[lower], [upper]]
+            color_range: 颜色范围过滤 [[lower], [upper]]
+            rect: 指定区域
+            crop_first: 先裁剪再识别
+            threshold: OCR阈值
+            merge_line_distance: 行合并距离
 
         Returns:
-            过滤后的图片
+            key: 缓存键
+            ocr_image: 需要识别的图片 从记录中获取到缓存键时为None 需要时再重新生成
+            crop_rect: 实际的裁剪区域 不裁剪时为None
         """
-        if color_range is None:
-            return image
+        do_crop = crop_first and rect is not None
+        rect_key = (rect.x1, rect.y1, rect.x2, rect.y2) if do_crop else None
+        color_key = None if color_range is None else tuple(tuple(i) for i in color_range)
+        memo_key = (id(image), rect_key, color_key, threshold, merge_line_distance)
+
+        with self._cache_lock:
+            memo = self._digest_memo.get(memo_key)
+            if memo is not None and memo[0] is image:
+                self._digest_memo.move_to_end(memo_key)
+                return memo[1], None, None
+
+        ocr_image, crop_rect = self._prepare_ocr_image(image, color_range, rect, crop_first)
+        crop_key = None if crop_rect is None else (crop_rect.x1, crop_rect.y1, crop_rect.x2, crop_rect.y2)
+        key = (
+            self._cal_content_digest(ocr_image),
+            color_key,
+            crop_key,
+            do_crop,
+            threshold,
+            merge_line_distance,
+        )
 
-        # 应用颜色范围过滤
-        mask = cv2.inRange(image, np.array(color_range[0]), np.array(color_range[1]))
-        return cv2.cvtColor(mask, cv2.COLOR_GRAY2RGB)
+        with self._cache_lock:
+            self._digest_memo[memo_key] = (image, key)
+            while len(self._digest_memo) > self.max_digest_memo_size:
+                self._digest_memo.popitem(last=False)
 
-    def _get_ocr_result_list_from_cache(
+        return key, ocr_image, crop_rect
+
+    def _prepare_ocr_image(
         self,
         image: MatLike,
-        color_range: list[list[int]] | None = None,
-        rect: Rect | None = None,
-        crop_first: bool = True,
-    ) -> OcrCacheEntry | None:
+        color_range: list[list[int]] | None,
+        rect: Rect | None,
+        crop_first: bool,
+    ) -> tuple[MatLike, Rect | None]:
         """
-        从缓存中获取OCR结果
+        生成用于识别的图片 先裁剪再做颜色过滤 只处理需要的区域
+
         Args:
             image: 输入图片
             color_range: 颜色范围过滤 [[lower], [upper]]
-            rect: 指定区域。识别结果后，筛选在指定区域中出现的结果，即文本所在的矩形有70%以上在指定区域内
-            crop_first: 先裁剪再识别 用于从连续文本中只提取特定区域的文本
+            rect: 指定区域
+            crop_first: 先裁剪再识别
 
         Returns:
-            缓存条目
+            ocr_image: 用于识别的图片
+            crop_rect: 实际的裁剪区域 不裁剪时为None
         """
-        image_id = id(image)
-        cache_list = self._cache.get(image_id)
-        if cache_list is None:
-            return None
+        crop_rect: Rect | None = None
+        if crop_first and rect is not None:
+            image, crop_rect = cv2_utils.crop_image(image, rect)
+        return self._apply_color_filter(image, color_range), crop_rect
 
-        for cache_entry in cache_list:
-            # Python 的列表 == 操作符会自动处理嵌套结构和值的比较 包括None
-            if cache_entry.color_range != color_range:
-                continue
-            if cache_entry.crop_first != crop_first:
-                continue
-            if crop_first and cache_entry.rect != rect:
-                continue
-            return cache_entry
+    def _apply_color_filter(self, image: MatLike, color_range: list[list[int]]) -> MatLike:
+        """
+        应用颜色过滤，最后返回RGB格式的黑白图，用于OCR。
+        不返回原图颜色是因为，如果使用黑色过滤，最后得到会是一个全黑的图片，无法进行识别。
 
-        return None
+        Args:
+            image: 输入图片
+            color_range: 颜色范围 [[lower], [upper]]
+
+        Returns:
+            过滤后的图片
+        """
+        if color_range is None:
+            return image
+
+        # 应用颜色范围过滤
+        mask = cv2.inRange(image, np.array(color_range[0]), np.array(color_range[1]))
+        return cv2.cvtColor(mask, cv2.COLOR_GRAY2RGB)
 
     def get_ocr_result_list(
         self,
@@ -154,31 +333,30 @@ class OcrService:
         Returns:
             ocr_result_list: OCR识别结果列表
         """
-        # 生成缓存键
-        image_id = id(image)
-
-        cache_entity = self._get_ocr_result_list_from_cache(
+        key, ocr_image, crop_rect = self._get_cache_key(
             image=image,
             color_range=color_range,
             rect=rect,
             crop_first=crop_first,
+            threshold=threshold,
+            merge_line_distance=merge_line_distance,
         )
 
         # 检查缓存
-        if cache_entity is not None:
-            ocr_result_list = cache_entity.ocr_result_list
+        cache_entry = self._get_from_cache(key)
+        if cache_entry is not None:
+            ocr_result_list = cache_entry.ocr_result_list
         else:
-            # 应用颜色过滤
-            processed_image = self._apply_color_filter(image, color_range)
+            if ocr_image is None:
+                ocr_image, crop_rect = self._prepare_ocr_image(image, color_range, rect, crop_first)
 
             # 执行OCR
-            if crop_first and rect is not None:
-                crop_image, crop_rect = cv2_utils.crop_image(processed_image, rect)
+            if crop_rect is not None:
                 bus = getattr(self.ocr_matcher, 'overlay_debug_bus', None)
                 if bus is not None:
                     bus.set_crop_offset(crop_rect.x1, crop_rect.y1)
                 ocr_result_list = self.ocr_matcher.ocr(
-                    crop_image,
+                    ocr_image,
                     threshold,
                     merge_line_distance,
                 )
@@ -187,37 +365,114 @@ class OcrService:
                 for ocr_result in ocr_result_list:
                     ocr_result.add_offset(crop_rect.left_top)
             else:
-                ocr_result_list = self.ocr_matcher.ocr(processed_image, threshold, merge_line_distance)
+                ocr_result_list = self.ocr_matcher.ocr(ocr_image, threshold, merge_line_distance)
 
             # 存储到缓存
-            cache_entry = OcrCacheEntry(
-                ocr_result_list=ocr_result_list,
-                create_time=time.time(),
-                color_range=color_range,
-                image_id=image_id,
+            self._put_into_cache(key, ocr_result_list)
+
+        return self._filter_by_rect(self._copy_result_list(ocr_result_list), rect)
+
+    def batch_ocr(
+        self,
+        image: MatLike,
+        region_list: list[tuple[Rect | None, list[list[int]] | None]],
+        crop_first: bool = True,
+        threshold: float = 0,
+        merge_line_distance: float = -1,
+    ) -> list[list[OcrMatchResult]]:
+        """
+        对同一张图片的多个区域进行OCR 优先从缓存获取
+        未命中缓存的区域会合并成一次批量识别 各区域单独检测文本 所有文本行一起识别
+        识别结果同样会存入缓存 之后对相同区域调用 get_ocr_result_list 可以直接命中
+
+        Args:
+            image: 输入图片
+            region_list: 区域列表 每项为 (识别区域, 颜色范围过滤)
+            crop_first: 先裁剪再识别 用于从连续文本中只提取指定区域的文本
+            threshold: OCR阈值
+            merge_line_distance: 行合并距离
+
+        Returns:
+            与 region_list 一一对应的识别结果列表
+        """
+        region_result_list: list[list[OcrMatchResult] | None] = [None] * len(region_list)
+
+        # 相同参数的区域只识别一次
+        to_ocr_key_list: list[tuple] = []
+        to_ocr_map: dict[tuple, tuple[MatLike, Rect | None, list[int]]] = {}
+        for idx, (rect, color_range) in enumerate(region_list):
+            key, ocr_image, crop_rect = self._get_cache_key(
                 image=image,
+                color_range=color_range,
                 rect=rect,
                 crop_first=crop_first,
+                threshold=threshold,
+                merge_line_distance=merge_line_distance,
             )
-            if image_id not in self._cache:
-                self._cache[image_id] = []
-            self._cache[image_id].append(cache_entry)
-            self._cache_list.append(cache_entry)
-            self._clean_expired_cache()
+            if key in to_ocr_map:
+                to_ocr_map[key][2].append(idx)
+                continue
 
-        if rect is not None:
-            # 过滤出指定区域内的结果
-            area_result_list: list[OcrMatchResult] = []
+            cache_entry = self._get_from_cache(key)
+            if cache_entry is not None:
+                region_result_list[idx] = cache_entry.ocr_result_list
+                continue
 
-            for ocr_result in ocr_result_list:
-                # 检查匹配结果是否和指定区域重叠
-                if cal_utils.cal_overlap_percent(ocr_result.rect, rect, base=ocr_result.rect) > 0.7:
-                    area_result_list.append(ocr_result)
+            if ocr_image is None:
+                ocr_image, crop_rect = self._prepare_ocr_image(image, color_range, rect, crop_first)
+            to_ocr_key_list.append(key)
+            to_ocr_map[key] = (ocr_image, crop_rect, [idx])
+
+        if len(to_ocr_key_list) > 0:
+            image_list: list[MatLike] = []
+            offset_list: list[Point] = []
+            for key in to_ocr_key_list:
+                ocr_image, crop_rect, _ = to_ocr_map[key]
+                image_list.append(ocr_image)
+                offset_list.append(Point(0, 0) if crop_rect is None else crop_rect.left_top)
+
+            batch_result_list = self.ocr_matcher.batch_ocr(
+                image_list,
+                threshold,
+                merge_line_distance,
+                offset_list=offset_list,
+            )
 
-            return area_result_list
-        else:
+            for key, offset, ocr_result_list in zip(to_ocr_key_list, offset_list, batch_result_list, strict=True):
+                for ocr_result in ocr_result_list:
+                    ocr_result.add_offset(offset)
+                self._put_into_cache(key, ocr_result_list)
+                for idx in to_ocr_map[key][2]:
+                    region_result_list[idx] = ocr_result_list
+
+        return [
+            self._filter_by_rect(self._copy_result_list(ocr_result_list), region_list[idx][0])
+            for idx, ocr_result_list in enumerate(region_result_list)
+        ]
+
+    @staticmethod
+    def _filter_by_rect(ocr_result_list: list[OcrMatchResult], rect: Rect | None) -> list[OcrMatchResult]:
+        """
+        过滤出指定区域内的结果 即文本所在的矩形有70%以上在指定区域内
+
+        Args:
+            ocr_result_list: OCR识别结果
+            rect: 指定区域 为None时不过滤
+
+        Returns:
+            过滤后的识别结果
+        """
+        if rect is None:
             return ocr_result_list
 
+        area_result_list: list[OcrMatchResult] = []
+        for ocr_result in ocr_result_list:
+            # 检查匹配结果是否和指定区域重叠
+            if cal_utils.cal_overlap_percent(ocr_result.rect, rect, base=ocr_result.rect) > 0.7:
+                area_result_list.append(ocr_result)
+
+        return area_result_list
+
     def get_ocr_result_map(
         self,
         image: MatLike,
@@ -303,7 +558,27 @@ class OcrService:
         target_idx = str_utils.find_best_match_by_difflib(target_word, ocr_word_list, cutoff=threshold)
         return target_idx is not None and target_idx >= 0
 
+    def get_cache_stats(self) -> OcrCacheStats:
+        """
+        获取缓存统计
+
+        Returns:
+            当前缓存统计的副本
+        """
+        with self._cache_lock:
+            return OcrCacheStats(
+                hit=self._stats.hit,
+                miss=self._stats.miss,
+                expired=self._stats.expired,
+                evicted=self._stats.evicted,
+                entry_cnt=len(self._cache),
+                total_bytes=self._cache_bytes,
+            )
+
     def clear_cache(self) -> None:
         """清空所有缓存"""
-        self._cache.clear()
+        with self._cache_lock:
+            self._cache.clear()
+            self._cache_bytes = 0
+            self._digest_memo.clear()
         log.debug("OCR缓存已清空")
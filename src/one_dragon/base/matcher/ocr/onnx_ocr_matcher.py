@@ -7,13 +7,14 @@ from typing import Any
 
 from cv2.typing import MatLike
 
+from one_dragon.base.geometry.point import Point
 from one_dragon.base.matcher.match_result import MatchResult, MatchResultList
 from one_dragon.base.matcher.ocr import ocr_utils
 from one_dragon.base.matcher.ocr.ocr_match_result import OcrMatchResult
 from one_dragon.base.matcher.ocr.ocr_matcher import OcrMatcher
 from one_dragon.base.web.common_downloader import CommonDownloaderParam
 from one_dragon.base.web.zip_downloader import ZipDownloader
-from one_dragon.utils import os_utils, str_utils
+from one_dragon.utils import os_utils, text_match_utils
 from one_dragon.utils.i18_utils import gt
 from one_dragon.utils.log_utils import log
 
@@ -88,6 +89,7 @@ class OnnxOcrParam:
             use_angle_cls: bool = False,
             det_limit_side_len: float = 960.0,
             ocr_model_size: str | None = None,
+            use_rec_batcher: bool = False,
     ):
         self.ocr_model_name: str = ocr_model_name
         self.models_dir: str = get_ocr_model_dir(ocr_model_name)
@@ -100,6 +102,7 @@ class OnnxOcrParam:
         # I. 设备与性能 (Device & Performance)
         # ===================================================================
         self.use_gpu = use_gpu  # 是否使用GPU进行计算
+        self.use_rec_batcher = use_rec_batcher  # 多个线程同时识别时 是否合并文本行一起推理
 
         # ===================================================================
         # II. 模型路径 (Model Paths)
@@ -127,6 +130,7 @@ class OnnxOcrParam:
         """将OCR配置转换为字典格式"""
         return {
             'use_gpu': self.use_gpu,
+            'use_rec_batcher': self.use_rec_batcher,
             'det_model_dir': self.det_model_dir,
             'rec_model_dir': self.rec_model_dir,
             'cls_model_dir': self.cls_model_dir,
@@ -394,24 +398,28 @@ class OnnxOcrMatcher(OcrMatcher, ZipDownloader):
         """
         all_match_result: dict = self.run_ocr(image, threshold, merge_line_distance=merge_line_distance)
         match_key = set()
-        for k in all_match_result:
-            for w in words:
-                ocr_result: str = k
-                ocr_target = gt(w, 'ocr')
-                if ignore_case:
-                    ocr_result = ocr_result.lower()
-                    ocr_target = ocr_target.lower()
+        # 目标只需要翻译一次
+        ocr_target_list: list[str] = [gt(w, 'ocr') for w in words]
+        if ignore_case:
+            ocr_target_list = [i.lower() for i in ocr_target_list]
+
+        if not same_word and lcs_percent != -1:
+            # 一个OCR结果和所有目标比较 使用预先编译的目标字典
+            target_dict = text_match_utils.get_target_dictionary(tuple(ocr_target_list), ignore_case=ignore_case)
+            for k in all_match_result:
+                if len(target_dict.find_all_by_lcs(k, percent=lcs_percent)) > 0:
+                    match_key.add(k)
+            return {key: all_match_result[key] for key in match_key if key in all_match_result}
 
+        for k in all_match_result:
+            ocr_result: str = k.lower() if ignore_case else k
+            for ocr_target in ocr_target_list:
                 if same_word:
                     if ocr_result == ocr_target:
                         match_key.add(k)
                 else:
-                    if lcs_percent == -1:
-                        if ocr_result.find(ocr_target) != -1:
-                            match_key.add(k)
-                    else:
-                        if str_utils.find_by_lcs(ocr_target, ocr_result, percent=lcs_percent):
-                            match_key.add(k)
+                    if ocr_result.find(ocr_target) != -1:
+                        match_key.add(k)
 
         return {key: all_match_result[key] for key in match_key if key in all_match_result}
 
@@ -428,6 +436,7 @@ class OnnxOcrMatcher(OcrMatcher, ZipDownloader):
             image: 图片
             threshold: 匹配阈值
             merge_line_distance: 多少行距内合并结果 -1为不合并 理论中文情况不会出现过长分行的 这里只是为了兼容英语的情况
+                不为-1时 行距内的结果会合并成一个 与 run_ocr 的合并方式一致
 
         Returns:
             ocr_result_list: 识别结果列表
@@ -442,6 +451,91 @@ class OnnxOcrMatcher(OcrMatcher, ZipDownloader):
             return ocr_result_list
 
         scan_result = scan_result_list[0]  # 只取第一张图片
+        ocr_result_list = self._convert_scan_result(scan_result, threshold)
+
+        if merge_line_distance != -1:
+            ocr_result_list = self._merge_ocr_result_list(ocr_result_list, merge_line_distance)
+
+        elapsed_ms = (time.time() - start_time) * 1000.0
+        self._emit_overlay_vision_from_ocr_results(ocr_result_list)
+        self._emit_overlay_perf_and_timeline(elapsed_ms, len(ocr_result_list))
+
+        if log.isEnabledFor(DEBUG):
+            log.debug('OCR结果 %s 耗时 %.2f', [i.data for i in ocr_result_list], time.time() - start_time)
+
+        return ocr_result_list
+
+    def batch_ocr(
+            self,
+            image_list: list[MatLike],
+            threshold: float = 0,
+            merge_line_distance: float = -1,
+            offset_list: list[Point] | None = None,
+    ) -> list[list[OcrMatchResult]]:
+        """
+        对多张图片进行OCR 每张图片单独检测 所有文本行合并成批次识别
+
+        Args:
+            image_list: 图片列表
+            threshold: 匹配阈值
+            merge_line_distance: 多少行距内合并结果 -1为不合并
+            offset_list: 每张图片在原图中的偏移 仅用于 overlay 显示 结果坐标仍是各自图片内的坐标
+
+        Returns:
+            ocr_result_list_list: 与 image_list 一一对应的识别结果列表
+        """
+        if len(image_list) == 0:
+            return []
+        if self._model is None and not self.init_model():
+            return [[] for _ in image_list]
+
+        start_time = time.time()
+        scan_result_list: list = self._model.batch_ocr(image_list, cls=False)
+        result_list: list[list[OcrMatchResult]] = [
+            self._convert_scan_result(scan_result, threshold)
+            for scan_result in scan_result_list
+        ]
+
+        if merge_line_distance != -1:
+            result_list = [
+                self._merge_ocr_result_list(ocr_result_list, merge_line_distance)
+                for ocr_result_list in result_list
+            ]
+
+        elapsed_ms = (time.time() - start_time) * 1000.0
+        bus = getattr(self, 'overlay_debug_bus', None)
+        item_count: int = 0
+        for idx, ocr_result_list in enumerate(result_list):
+            item_count += len(ocr_result_list)
+            if bus is None:
+                continue
+            offset = offset_list[idx] if offset_list is not None else Point(0, 0)
+            bus.set_crop_offset(offset.x, offset.y)
+            try:
+                self._emit_overlay_vision_from_ocr_results(ocr_result_list)
+            finally:
+                bus.reset_crop_offset()
+        self._emit_overlay_perf_and_timeline(elapsed_ms, item_count)
+
+        if log.isEnabledFor(DEBUG):
+            log.debug('批量OCR %d 张图片 结果 %s 耗时 %.2f', len(image_list),
+                      [[i.data for i in ocr_result_list] for ocr_result_list in result_list],
+                      time.time() - start_time)
+
+        return result_list
+
+    def _convert_scan_result(self, scan_result: list, threshold: float) -> list[OcrMatchResult]:
+        """
+        将模型返回的单张图片结果转化为识别结果列表
+
+        Args:
+            scan_result: 模型结果 [[box, (text, score)], ...]
+            threshold: 匹配阈值
+
+        Returns:
+            ocr_result_list: 识别结果列表
+        """
+        ocr_result_list: list[OcrMatchResult] = []
         for anchor in scan_result:
             anchor_position = anchor[0]
             anchor_text = anchor[1][0]
@@ -460,18 +554,36 @@ class OnnxOcrMatcher(OcrMatcher, ZipDownloader):
                 rect[3],
                 data=anchor_text)
             ocr_result_list.append(result)
+        return ocr_result_list
 
-        if merge_line_distance != -1:
-            pass  # TODO
-
-        elapsed_ms = (time.time() - start_time) * 1000.0
-        self._emit_overlay_vision_from_ocr_results(ocr_result_list)
-        self._emit_overlay_perf_and_timeline(elapsed_ms, len(ocr_result_list))
+    @staticmethod
+    def _merge_ocr_result_list(
+            ocr_result_list: list[OcrMatchResult],
+            merge_line_distance: float,
+    ) -> list[OcrMatchResult]:
+        """
+        合并行距内的识别结果 与 run_ocr 的合并方式一致
 
-        if log.isEnabledFor(DEBUG):
-            log.debug('OCR结果 %s 耗时 %.2f', [i.data for i in ocr_result_list], time.time() - start_time)
+        Args:
+            ocr_result_list: 识别结果列表
+            merge_line_distance: 多少行距内合并结果
 
-        return ocr_result_list
+        Returns:
+            ocr_result_list: 合并后的识别结果列表
+        """
+        ocr_map: dict[str, MatchResultList] = {}
+        for ocr_result in ocr_result_list:
+            if ocr_result.data not in ocr_map:
+                ocr_map[ocr_result.data] = MatchResultList(only_best=False)
+            ocr_map[ocr_result.data].append(ocr_result)
+
+        merge_map = ocr_utils.merge_ocr_result_to_multiple_line(ocr_map, join_space=True,
+                                                                merge_line_distance=merge_line_distance)
+        return [
+            OcrMatchResult(mr.confidence, mr.x, mr.y, mr.w, mr.h, data=mr.data)
+            for mrl in merge_map.values()
+            for mr in mrl
+        ]
 
     def _emit_overlay_vision(
         self,
@@ -1,4 +1,7 @@
+import threading
+
 import cv2
+import numpy as np
 from cv2.typing import MatLike
 
 from one_dragon.base.geometry.rectangle import Rect
@@ -8,6 +11,8 @@ from one_dragon.base.screen.template_loader import TemplateLoader
 from one_dragon.utils import cv2_utils
 from one_dragon.utils.log_utils import log
 
+_PYRAMID_FULL_MATCH_RATIO: float = 0.25  # 金字塔精匹配的候选区域超过整张分数图的这个比例时 改为整张原图匹配
+
 
 class TemplateMatcher:
 
@@ -15,6 +20,10 @@ class TemplateMatcher:
         self.template_loader: TemplateLoader = template_loader
         self.overlay_debug_bus = None
 
+        # 金字塔匹配用的缩小模板 key=(模板子目录, 模板id, 模板类型, 是否忽略掩码) value=(模板, 缩小模板, 缩小掩码)
+        self._pyramid_template_cache: dict[tuple[str, str, str, bool], tuple[TemplateInfo, MatLike, MatLike | None]] = {}
+        self._pyramid_template_lock = threading.Lock()
+
     def match_template(self, source: MatLike,
                        template_sub_dir: str,
                        template_id: str,
@@ -52,6 +61,203 @@ class TemplateMatcher:
         self._emit_overlay_vision(template_sub_dir, template_id, result)
         return result
 
+    def match_many(
+            self,
+            source: MatLike,
+            template_list: list[tuple[str, str]],
+            template_type: str = 'raw',
+            threshold: float = 0.5,
+            ignore_template_mask: bool = False,
+            only_best: bool = True,
+            ignore_inf: bool = True,
+            use_pyramid: bool = True,
+            pyramid_min_template_size: int = 24,
+            pyramid_threshold_margin: float = 0.2,
+    ) -> list[MatchResultList]:
+        """
+        在同一张原图中 匹配多个模板
+
+        - 原图按模板类型只转换一次 例如 gray 类型的模板共用一张灰度原图
+        - 模板按尺寸分组 同尺寸的模板共用是否走金字塔的判断
+        - 足够大的模板先在缩小一半的原图上粗匹配 粗匹配分数达不到 阈值-余量 的模板直接排除
+          剩余模板只在粗匹配分数达到 阈值-余量 的所有位置附近 用原尺寸精匹配 候选模板越多 节省越多
+
+        Args:
+            source: 原图
+            template_list: 模板列表 每项为 (模板子文件夹, 模板id)
+            template_type: 模板类型
+            threshold: 匹配阈值
+            ignore_template_mask: 是否忽略模板自身的掩码
+            only_best: 只返回每个模板最好的结果
+            ignore_inf: 是否忽略无限大的结果
+            use_pyramid: 是否使用金字塔粗匹配
+            pyramid_min_template_size: 模板宽高都不小于这个值时才使用金字塔粗匹配
+            pyramid_threshold_margin: 粗匹配的阈值余量 粗匹配分数 >= threshold - margin 的模板才会精匹配
+
+        Returns:
+            list[MatchResultList]: 与 template_list 一一对应的匹配结果
+        """
+        result_list: list[MatchResultList] = [MatchResultList(only_best=only_best) for _ in template_list]
+        if source is None or len(template_list) == 0:
+            return result_list
+
+        converted_source = self._convert_source(source, template_type)
+        small_source: MatLike | None = None  # 缩小一半的原图 需要时才计算
+
+        # 按模板尺寸分组
+        size_group: dict[tuple[int, ...], list[tuple[int, TemplateInfo]]] = {}
+        for idx, (template_sub_dir, template_id) in enumerate(template_list):
+            template: TemplateInfo = self.template_loader.get_template(template_sub_dir, template_id)
+            if template is None or template.get_image(template_type) is None:
+                log.error(f'未加载模板 {template_id}')
+                continue
+            template_image = template.get_image(template_type)
+            size_group.setdefault(template_image.shape[:2], []).append((idx, template))
+
+        for (th, tw), group in size_group.items():
+            pyramid = (
+                use_pyramid
+                and min(th, tw) >= pyramid_min_template_size
+                and converted_source.shape[0] >= th + 2
+                and converted_source.shape[1] >= tw + 2
+            )
+            if pyramid and small_source is None:
+                small_source = cv2.pyrDown(converted_source)
+
+            for idx, template in group:
+                template_sub_dir, template_id = template_list[idx]
+                template_image = template.get_image(template_type)
+                template_mask = None if ignore_template_mask else template.mask
+
+                if not pyramid:
+                    result = cv2_utils.match_template(converted_source, template_image, threshold,
+                                                      mask=template_mask, only_best=only_best, ignore_inf=ignore_inf)
+                else:
+                    result = self._match_by_pyramid(
+                        converted_source, small_source, template, template_type, ignore_template_mask,
+                        threshold, pyramid_threshold_margin, only_best, ignore_inf,
+                    )
+                result_list[idx] = result
+                self._emit_overlay_vision(template_sub_dir, template_id, result)
+
+        return result_list
+
+    @staticmethod
+    def _convert_source(source: MatLike, template_type: str) -> MatLike:
+        """
+        按模板类型转换原图
+        Args:
+            source: 原图 RGB或灰度图
+            template_type: 模板类型
+
+        Returns:
+            与模板通道一致的原图
+        """
+        if template_type in ('gray', 'mask') and source.ndim == 3:
+            return cv2.cvtColor(source, cv2.COLOR_RGB2GRAY)
+        return source
+
+    def _get_pyramid_template(
+            self,
+            template: TemplateInfo,
+            template_type: str,
+            ignore_template_mask: bool,
+    ) -> tuple[MatLike, MatLike | None]:
+        """
+        获取缩小一半的模板和掩码 按模板缓存
+
+        Args:
+            template: 模板
+            template_type: 模板类型
+            ignore_template_mask: 是否忽略模板自身的掩码
+
+        Returns:
+            缩小后的模板, 缩小后的掩码
+        """
+        key = (template.sub_dir, template.template_id, template_type, ignore_template_mask)
+        with self._pyramid_template_lock:
+            cache = self._pyramid_template_cache.get(key)
+            if cache is not None and cache[0] is template:
+                return cache[1], cache[2]
+
+        small_template = cv2.pyrDown(template.get_image(template_type))
+        small_mask: MatLike | None = None
+        if not ignore_template_mask and template.mask is not None:
+            small_mask = cv2.resize(template.mask, (small_template.shape[1], small_template.shape[0]),
+                                    interpolation=cv2.INTER_NEAREST)
+
+        with self._pyramid_template_lock:
+            self._pyramid_template_cache[key] = (template, small_template, small_mask)
+        return small_template, small_mask
+
+    def _match_by_pyramid(
+            self,
+            source: MatLike,
+            small_source: MatLike,
+            template: TemplateInfo,
+            template_type: str,
+            ignore_template_mask: bool,
+            threshold: float,
+            threshold_margin: float,
+            only_best: bool,
+            ignore_inf: bool,
+    ) -> MatchResultList:
+        """
+        先在缩小的原图上粗匹配 再在原尺寸上精匹配
+        粗匹配达到 阈值-余量 的位置都会精匹配 结果的提取与整张原图匹配一致
+
+        Args:
+            source: 原图
+            small_source: 缩小一半的原图
+            template: 模板
+            template_type: 模板类型
+            ignore_template_mask: 是否忽略模板自身的掩码
+            threshold: 匹配阈值
+            threshold_margin: 粗匹配的阈值余量
+            only_best: 只返回最好的结果
+            ignore_inf: 是否忽略无限大的结果
+
+        Returns:
+            MatchResultList: 匹配结果 坐标为原图坐标
+        """
+        template_image = template.get_image(template_type)
+        template_mask = None if ignore_template_mask else template.mask
+        small_template, small_mask = self._get_pyramid_template(template, template_type, ignore_template_mask)
+
+        th, tw = template_image.shape[:2]
+        sth, stw = small_template.shape[:2]
+        if small_source.shape[0] < sth or small_source.shape[1] < stw:
+            return MatchResultList(only_best=only_best)
+
+        coarse = cv2.matchTemplate(small_source, small_template, cv2.TM_CCOEFF_NORMED, mask=small_mask)
+        coarse[~np.isfinite(coarse)] = -1
+        candidate_y, candidate_x = np.nonzero(coarse >= threshold - threshold_margin)
+        if len(candidate_y) == 0:
+            return MatchResultList(only_best=only_best)
+
+        # 粗匹配达到 阈值-余量 的每个位置 对应到原尺寸附近的区域 都需要精匹配
+        result_h = source.shape[0] - th + 1
+        result_w = source.shape[1] - tw + 1
+        pad = 4
+        candidate_mask = np.zeros((result_h, result_w), dtype=np.uint8)
+        candidate_mask[np.minimum(candidate_y * 2, result_h - 1), np.minimum(candidate_x * 2, result_w - 1)] = 1
+        candidate_mask = cv2.dilate(candidate_mask, np.ones((pad * 2 + 1, pad * 2 + 1), dtype=np.uint8))
+
+        if cv2.countNonZero(candidate_mask) > result_h * result_w * _PYRAMID_FULL_MATCH_RATIO:
+            # 候选区域太大时 直接整张原图匹配更快
+            return cv2_utils.match_template(source, template_image, threshold,
+                                            mask=template_mask, only_best=only_best, ignore_inf=ignore_inf)
+
+        # 只计算候选区域的分数 其余位置视为不匹配 之后与整张原图匹配一样提取结果
+        result = np.full((result_h, result_w), -1, dtype=np.float32)
+        _, _, stats, _ = cv2.connectedComponentsWithStats(candidate_mask, connectivity=8)
+        for x, y, w, h, _ in stats[1:]:
+            window = source[y:y + h + th - 1, x:x + w + tw - 1]
+            result[y:y + h, x:x + w] = cv2.matchTemplate(window, template_image, cv2.TM_CCOEFF_NORMED,
+                                                         mask=template_mask)
+        return cv2_utils.get_match_result_list(result, threshold, tw, th,
+                                               only_best=only_best, ignore_inf=ignore_inf)
+
     def match_one_by_feature(self, source: MatLike,
                              template_sub_dir: str,
                              template_id: str,
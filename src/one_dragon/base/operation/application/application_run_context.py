@@ -366,6 +366,8 @@ class ApplicationRunContext:
             self.switch_context_pause_and_run()
 
         self._run_state = ApplicationRunContextStateEnum.STOP
+        if self.ctx.controller is not None:
+            self.ctx.controller.after_context_run()
         if dispatch_event:
             self.event_bus.dispatch_event(
                 ApplicationRunContextStateEventEnum.STOP, result
@@ -1,13 +1,19 @@
+import heapq
+import itertools
+import threading
+from collections import deque
 from collections.abc import Callable
 from concurrent.futures import Future, ThreadPoolExecutor
-from contextlib import suppress
 from dataclasses import dataclass
 from typing import Any
 
 from one_dragon.utils import thread_utils
+from one_dragon.utils.log_utils import log
 
 _od_event_bus_executor = ThreadPoolExecutor(thread_name_prefix='od_event_bus', max_workers=32)
 
+DEFAULT_MAX_QUEUE_SIZE: int = 64  # 每个监听默认最多积压的事件数量
+
 
 @dataclass
 class ContextEventItem:
@@ -15,37 +21,185 @@ class ContextEventItem:
     data: Any
 
 
+@dataclass
+class ContextEventMetrics:
+    """一个事件的下发统计"""
+
+    dispatch_cnt: int = 0  # 下发次数
+    deliver_cnt: int = 0  # 实际回调次数
+    inline_cnt: int = 0  # 其中同步回调的次数
+    coalesce_cnt: int = 0  # 被后续事件合并的次数
+    drop_cnt: int = 0  # 队列已满被丢弃的次数
+    max_pending: int = 0  # 单个监听积压的最大数量
+
+
+class _EventListener:
+
+    def __init__(
+            self,
+            event_id: str,
+            callback: Callable[[ContextEventItem], None],
+            inline: bool,
+            coalesce: bool,
+            max_queue_size: int,
+            priority: int,
+    ):
+        """
+        一个事件监听 异步的监听拥有自己的队列 同一时间只在一个线程中按顺序回调
+        """
+        self.event_id: str = event_id
+        self.callback: Callable[[ContextEventItem], None] = callback
+        self.inline: bool = inline
+        self.coalesce: bool = coalesce
+        self.max_queue_size: int = max(1, max_queue_size)
+        self.priority: int = priority
+
+        self.pending: deque[ContextEventItem] = deque()
+        self.scheduled: bool = False  # 是否已经有线程负责处理队列
+        self.removed: bool = False  # 是否已经解除监听
+
+
 class ContextEventBus:
 
     def __init__(self):
-        self.callbacks: dict[str, list[Callable[[Any], None]]] = {}
+        self._event_listener_map: dict[str, list[_EventListener]] = {}
+        self._event_metrics_map: dict[str, ContextEventMetrics] = {}
+        self._event_lock = threading.Lock()
+
+        # 等待处理的监听 按优先级排列 每个元素对应一个已提交到线程池的任务
+        self._event_ready_heap: list[tuple[int, int, _EventListener]] = []
+        self._event_ready_seq = itertools.count()
+
+    @property
+    def callbacks(self) -> dict[str, list[Callable[[Any], None]]]:
+        """
+        各个事件的回调 只用于查看
+        """
+        with self._event_lock:
+            return {
+                event_id: [i.callback for i in listener_list]
+                for event_id, listener_list in self._event_listener_map.items()
+            }
 
     def dispatch_event(self, event_id: str, event_obj: Any = None):
         """
         下发事件
+        同一个监听的回调按下发顺序执行 不会并发
         :param event_id: 事件ID
         :param event_obj: 事件体
         :return:
         """
-        if event_id not in self.callbacks:
-            return
-        for callback in self.callbacks[event_id]:
-            future: Future = _od_event_bus_executor.submit(callback, ContextEventItem(event_id, event_obj))
-            future.add_done_callback(thread_utils.handle_future_result)
+        with self._event_lock:
+            listener_list = self._event_listener_map.get(event_id)
+            if not listener_list:
+                return
+            listener_list = list(listener_list)
+            metrics = self._get_metrics(event_id)
+            metrics.dispatch_cnt += 1
+
+        item = ContextEventItem(event_id, event_obj)
+        for listener in listener_list:
+            if listener.inline:
+                self._invoke(listener, item)
+                with self._event_lock:
+                    metrics.deliver_cnt += 1
+                    metrics.inline_cnt += 1
+                continue
 
-    def listen_event(self, event_id: str, callback: Callable[[ContextEventItem], None]):
+            need_submit: bool = False
+            with self._event_lock:
+                if listener.removed:
+                    continue
+                if listener.coalesce and len(listener.pending) > 0:
+                    # 还没处理的事件 只保留最新的
+                    listener.pending[-1] = item
+                    metrics.coalesce_cnt += 1
+                else:
+                    if len(listener.pending) >= listener.max_queue_size:
+                        listener.pending.popleft()
+                        metrics.drop_cnt += 1
+                    listener.pending.append(item)
+                metrics.max_pending = max(metrics.max_pending, len(listener.pending))
+
+                if not listener.scheduled:
+                    listener.scheduled = True
+                    heapq.heappush(self._event_ready_heap, (-listener.priority, next(self._event_ready_seq), listener))
+                    need_submit = True
+
+            if need_submit:
+                future: Future = _od_event_bus_executor.submit(self._drain_ready_listener)
+                future.add_done_callback(thread_utils.handle_future_result)
+
+    def _get_metrics(self, event_id: str) -> ContextEventMetrics:
+        """
+        获取事件的统计 需要在持有锁时调用
+        """
+        metrics = self._event_metrics_map.get(event_id)
+        if metrics is None:
+            metrics = ContextEventMetrics()
+            self._event_metrics_map[event_id] = metrics
+        return metrics
+
+    def _drain_ready_listener(self) -> None:
+        """
+        线程池任务 取出优先级最高的监听 处理完它积压的所有事件
+        """
+        with self._event_lock:
+            if len(self._event_ready_heap) == 0:
+                return
+            _, _, listener = heapq.heappop(self._event_ready_heap)
+
+        while True:
+            with self._event_lock:
+                if listener.removed or len(listener.pending) == 0:
+                    listener.pending.clear()
+                    listener.scheduled = False
+                    return
+                item = listener.pending.popleft()
+
+            self._invoke(listener, item)
+            with self._event_lock:
+                self._get_metrics(listener.event_id).deliver_cnt += 1
+
+    @staticmethod
+    def _invoke(listener: _EventListener, item: ContextEventItem) -> None:
+        try:
+            listener.callback(item)
+        except Exception:
+            log.error(f'事件回调失败 {item.event_id}', exc_info=True)
+
+    def listen_event(
+            self,
+            event_id: str,
+            callback: Callable[[ContextEventItem], None],
+            inline: bool = False,
+            coalesce: bool = False,
+            max_queue_size: int = DEFAULT_MAX_QUEUE_SIZE,
+            priority: int = 0,
+    ):
         """
         新增监听事件
         监听的回调，如果耗时过长，应该在自己的线程池的工作，避免阻塞
         :param event_id:
         :param callback:
+        :param inline: 是否在下发事件的线程中直接回调 只适用于很快的回调 例如发出Qt信号
+        :param coalesce: 是否合并还没处理的事件 只处理最新的一个 适用于只关心最新状态的回调
+        :param max_queue_size: 最多积压的事件数量 超过时丢弃最早的事件
+        :param priority: 优先级 线程池繁忙时优先处理优先级高的监听
         :return:
         """
-        if event_id not in self.callbacks:
-            self.callbacks[event_id] = []
-        existed_callbacks = self.callbacks[event_id]
-        if callback not in existed_callbacks:
-            existed_callbacks.append(callback)
+        with self._event_lock:
+            listener_list = self._event_listener_map.setdefault(event_id, [])
+            if any(i.callback == callback for i in listener_list):
+                return
+            listener_list.append(_EventListener(
+                event_id=event_id,
+                callback=callback,
+                inline=inline,
+                coalesce=coalesce,
+                max_queue_size=max_queue_size,
+                priority=priority,
+            ))
 
     def unlisten_event(self, event_id: str, callback: Callable[[Any], None]):
         """
@@ -54,10 +208,15 @@ class ContextEventBus:
         :param callback:
         :return:
         """
-        if event_id not in self.callbacks:
-            return
-        with suppress(Exception):
-            self.callbacks[event_id].remove(callback)
+        with self._event_lock:
+            listener_list = self._event_listener_map.get(event_id)
+            if listener_list is None:
+                return
+            for listener in listener_list:
+                if listener.callback == callback:
+                    listener.removed = True
+                    listener_list.remove(listener)
+                    break
 
     def unlisten_all_event(self, obj: Any):
         """
@@ -65,16 +224,26 @@ class ContextEventBus:
         :param obj:
         :return:
         """
-        to_remove = {}
-        for key, existed_callbacks in self.callbacks.items():
-            to_remove[key] = []
-            for existed in existed_callbacks:
-                if id(existed.__self__) == id(obj):
-                    to_remove[key].append(existed)
+        with self._event_lock:
+            for event_id, listener_list in self._event_listener_map.items():
+                to_keep: list[_EventListener] = []
+                for listener in listener_list:
+                    if id(getattr(listener.callback, '__self__', None)) == id(obj):
+                        listener.removed = True
+                    else:
+                        to_keep.append(listener)
+                self._event_listener_map[event_id] = to_keep
 
-        for key, removes in to_remove.items():
-            for remove in removes:
-                self.callbacks[key].remove(remove)
+    def get_event_metrics(self) -> dict[str, ContextEventMetrics]:
+        """
+        获取各个事件的下发统计
+        :return:
+        """
+        with self._event_lock:
+            return {
+                event_id: ContextEventMetrics(**vars(metrics))
+                for event_id, metrics in self._event_metrics_map.items()
+            }
 
     def after_app_shutdown(self) -> None:
         """
@@ -71,6 +71,7 @@ class OneDragonContext(ContextEventBus, OneDragonEnvContext):
         self.ocr: OcrMatcher = OnnxOcrMatcher(
             OnnxOcrParam(
                 use_gpu=self.model_config.ocr_use_gpu,
+                use_rec_batcher=self.model_config.ocr_use_rec_batcher,
                 det_limit_side_len=max(self.project_config.screen_standard_width, self.project_config.screen_standard_height),
             )
         )
@@ -493,6 +494,7 @@ class OneDragonContext(ContextEventBus, OneDragonEnvContext):
             OnnxOcrParam(
                 ocr_model_name=self.model_config.ocr,
                 use_gpu=self.model_config.ocr_use_gpu,
+                use_rec_batcher=self.model_config.ocr_use_rec_batcher,
                 det_limit_side_len=max(self.project_config.screen_standard_width, self.project_config.screen_standard_height),
             )
         )
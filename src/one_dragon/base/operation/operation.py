@@ -1,7 +1,7 @@
 from __future__ import annotations
 
 import difflib
-import inspect
+import threading
 import time
 from collections.abc import Callable
 from functools import cached_property
@@ -17,9 +17,19 @@ from one_dragon.base.operation.application.application_run_context import (
     ApplicationRunContextStateEventEnum,
 )
 from one_dragon.base.operation.operation_base import OperationBase, OperationResult
-from one_dragon.base.operation.operation_edge import OperationEdge, OperationEdgeDesc
+from one_dragon.base.operation.operation_edge import OperationEdge
+from one_dragon.base.operation.operation_graph import (
+    OperationRoute,
+    build_route_map,
+    get_operation_graph,
+)
 from one_dragon.base.operation.operation_node import OperationNode
 from one_dragon.base.operation.operation_notify import send_node_notify
+from one_dragon.base.operation.operation_pacer import (
+    OperationPaceHistory,
+    get_pace_history,
+    wait_screen_change,
+)
 from one_dragon.base.operation.operation_round_result import (
     OperationRoundResult,
     OperationRoundResultEnum,
@@ -85,6 +95,12 @@ class Operation(OperationBase):
     STATUS_TIMEOUT: ClassVar[str] = '执行超时'
     STATUS_SCREEN_UNKNOWN: ClassVar[str] = '未能识别当前画面'
 
+    PACE_MIN_WAIT_RATIO: ClassVar[float] = 0.5
+    """节点历史不足时 画面变化并稳定后提前结束等待 至少等待原本等待时间的比例 避免停在淡入淡出等过渡画面上"""
+
+    PACE_EXPECTED_WAIT_RATIO: ClassVar[float] = 0.8
+    """有节点历史时 至少等待到节点通常离开时间的比例 留出余量 游戏响应变快时历史可以随之缩短"""
+
     def __init__(
             self,
             ctx: OneDragonContext,
@@ -137,6 +153,9 @@ class Operation(OperationBase):
         self._node_edges_map: dict[str, list[OperationEdge]] = {}
         """节点的边集合 key=节点名称 value=从该节点出发的边列表"""
 
+        self._node_route_map: dict[str, dict[bool, OperationRoute]] = {}
+        """节点的下一个节点 key=节点名称 value=按是否成功和返回状态整理的边"""
+
         self._start_node: OperationNode | None = None
         """起始节点 初始化后才会有"""
 
@@ -183,6 +202,19 @@ class Operation(OperationBase):
         self.node_status: dict[str, NodeStateProxy] = {}
         """已保存节点状态的字典"""
 
+        # 等待调度相关属性
+        self.adaptive_pacing: bool = True
+        """开启后台截图时 是否根据画面变化调整每轮的等待时间"""
+
+        self._pace_history: OperationPaceHistory = get_pace_history(type(self))
+        """本指令类各个节点的等待统计"""
+
+        self._round_wait_seconds: float = 0
+        """本轮的等待时间"""
+
+        self._pause_wake_event = threading.Event()
+        """暂停时用于提前唤醒 恢复或停止时设置"""
+
     def _init_before_execute(self):
         """在操作开始前初始化执行状态。
 
@@ -210,109 +242,26 @@ class Operation(OperationBase):
 
         # 监听事件
         self.ctx.run_context.event_bus.unlisten_all_event(self)
-        self.ctx.run_context.event_bus.listen_event(ApplicationRunContextStateEventEnum.PAUSE, self._on_pause)
-        self.ctx.run_context.event_bus.listen_event(ApplicationRunContextStateEventEnum.RESUME, self._on_resume)
+        self.ctx.run_context.event_bus.listen_event(ApplicationRunContextStateEventEnum.PAUSE, self._on_pause, priority=1)
+        self.ctx.run_context.event_bus.listen_event(ApplicationRunContextStateEventEnum.RESUME, self._on_resume, priority=1)
+        self.ctx.run_context.event_bus.listen_event(ApplicationRunContextStateEventEnum.STOP, self._on_stop, inline=True)
 
         self.handle_init()
 
-    def _analyse_node_annotations(self) -> tuple[OperationNode, list[OperationNode], list[OperationEdge]]:
-        """
-        扫描类方法的操作节点和边注解
-        Returns:
-            tuple[OperationNode, list[OperationNode], list[OperationEdge]]: 起始节点 节点列表 边列表
-        """
-        start_node: OperationNode | None = None
-        node_list: list[OperationNode] = []
-        edge_list: list[OperationEdge] = []
-
-        node_name_map: dict[str, OperationNode] = {}
-        edge_desc_list: list[OperationEdgeDesc] = []
-
-        for name, method in inspect.getmembers(self, predicate=inspect.ismethod):
-            # 从方法对象上直接获取 @operation_node 附加的节点信息
-            node: OperationNode = getattr(method, 'operation_node_annotation', None)
-            if node is None:
-                # 如果方法没有被 @operation_node 装饰，则不是节点，直接跳过
-                continue
-
-            node_name_map[node.cn] = node
-            node_list.append(node)
-            if node.is_start_node:
-                if start_node is not None and start_node.cn != node.cn:
-                    raise ValueError(f'存在多个起始节点 {start_node.cn} {node.cn}')
-                start_node = node
-
-            # 从方法对象上直接获取 @node_from 附加的节点信息
-            edges: list[OperationEdgeDesc] = getattr(method, 'operation_edge_annotation', None)
-            if edges is None:
-                continue
-            for edge in edges:
-                edge.node_to_name = node.cn
-                edge_desc_list.append(edge)
-
-        for edge_desc in edge_desc_list:
-            node_from = node_name_map.get(edge_desc.node_from_name, None)
-            if node_from is None:
-                raise ValueError('找不到节点 %s' % edge_desc.node_from_name)
-            node_to = node_name_map.get(edge_desc.node_to_name, None)
-            if node_to is None:
-                raise ValueError('找不到节点 %s' % edge_desc.node_to_name)
-
-            new_node = OperationEdge(
-                node_from,
-                node_to,
-                success=edge_desc.success,
-                status=edge_desc.status,
-                ignore_status=edge_desc.ignore_status
-            )
-            edge_list.append(new_node)
-
-        return start_node, node_list, edge_list
-
     def _init_network(self) -> None:
         """初始化操作节点网络。
 
-        此方法通过以下步骤构建操作图：
-        1. 从注解添加节点和边
-        2. 从子类实现添加节点和边
-        3. 构建用于图遍历的内部数据结构
-        4. 确定起始节点
+        节点网络在每个类上是固定的 只在第一次使用时编译 之后所有实例共用。
+        这里只复制编译后的节点集合 再加上实例相关的游戏窗口检查节点。
         """
-        # 初始化节点和边集合
-        self._node_edges_map.clear()
-        self._node_map.clear()
-
-        start_node, node_list, edge_list = self._analyse_node_annotations()
-
-        # 添加节点
-        for node in node_list:
-            self._add_node(node)
-
-        # 添加边
-        op_in_map: dict[str, int] = {}  # 入度
-        for edge in edge_list:
-            from_id = edge.node_from.cn
-            if from_id not in self._node_edges_map:
-                self._node_edges_map[from_id] = []
-            self._node_edges_map[from_id].append(edge)
-
-            to_id = edge.node_to.cn
-            if to_id not in op_in_map:
-                op_in_map[to_id] = 0
-            op_in_map[to_id] = op_in_map[to_id] + 1
-
-        if start_node is None:  # 没有指定开始节点时 自动判断
-            # 找出入度为0的开始点
-            for node in node_list:
-                if op_in_map.get(node.cn, 0) == 0:
-                    if start_node is not None and start_node.cn != node.cn:
-                        raise ValueError(f'存在多个起始节点 {start_node.cn} {node.cn}')
-                    start_node = node
-
-        if start_node is None:
-            raise ValueError('找不到起始节点')
-
-        start_node = self._add_check_game_node(start_node)
+        graph = get_operation_graph(type(self))
+
+        # 复制节点和边集合 边列表本身只读 不需要复制
+        self._node_map = dict(graph.node_map)
+        self._node_edges_map = dict(graph.node_edges_map)
+        self._node_route_map = dict(graph.node_route_map)
+
+        start_node = self._add_check_game_node(graph.start_node)
         # 初始化开始节点
         self._start_node = start_node
         self._current_node = start_node
@@ -342,6 +291,8 @@ class Operation(OperationBase):
 
             self._node_edges_map[check_game_window.cn] = [no_game_edge, with_game_edge]
             self._node_edges_map[open_and_enter_game.cn] = [enter_game_edge]
+            self._node_route_map[check_game_window.cn] = build_route_map(self._node_edges_map[check_game_window.cn])
+            self._node_route_map[open_and_enter_game.cn] = build_route_map(self._node_edges_map[open_and_enter_game.cn])
 
             start_node = check_game_window
 
@@ -402,6 +353,7 @@ class Operation(OperationBase):
         op_result: OperationResult | None = None
         while True:
             self.round_start_time = time.time()
+            self._round_wait_seconds = 0
             if self.timeout_seconds != -1 and self.operation_usage_time >= self.timeout_seconds:
                 op_result = self.op_fail(Operation.STATUS_TIMEOUT)
                 break
@@ -409,7 +361,10 @@ class Operation(OperationBase):
                 op_result = self.op_fail('人工结束')
                 break
             elif self.ctx.run_context.is_context_pause:
-                time.sleep(1)
+                # 恢复或停止时会被提前唤醒
+                self._pause_wake_event.clear()
+                if self.ctx.run_context.is_context_pause:
+                    self._pause_wake_event.wait(1)
                 continue
 
             try:
@@ -448,7 +403,12 @@ class Operation(OperationBase):
                     level="ERROR",
                     ttl_seconds=60.0,
                 )
-            self._emit_overlay_round_perf((time.time() - self.round_start_time) * 1000.0)
+            round_seconds = time.time() - self.round_start_time
+            self._emit_overlay_round_perf(round_seconds * 1000.0)
+            if self._current_node is not None:
+                self._pace_history.record_round(self._current_node.cn,
+                                                work_seconds=round_seconds - self._round_wait_seconds,
+                                                wait_seconds=self._round_wait_seconds)
 
             # 重试或者等待的
             if round_result.result == OperationRoundResultEnum.RETRY:
@@ -465,6 +425,8 @@ class Operation(OperationBase):
 
             # 成功或者失败的 找下一个节点
             next_node = self._get_next_node(round_result)
+            if self._current_node is not None and self._current_node_start_time is not None:
+                self._pace_history.record_transition(self._current_node.cn, time.time() - self._current_node_start_time)
 
             # 结束后发送节点通知
             send_node_notify(self, round_result, self._current_node, next_node)
@@ -537,34 +499,14 @@ class Operation(OperationBase):
         """
         if self._current_node is None:
             return None
-        edges = self._node_edges_map.get(self._current_node.cn)
-        if edges is None or len(edges) == 0:  # 没有下一个节点了
+        route_map = self._node_route_map.get(self._current_node.cn)
+        if route_map is None:  # 没有下一个节点了
             return None
 
-        next_node_id: str | None = None
-        final_next_node_id: str | None = None  # 兜底指令
-        for edge in edges:
-            if edge.success != (current_round_result.result == OperationRoundResultEnum.SUCCESS):
-                continue
-
-            if edge.ignore_status:
-                final_next_node_id = edge.node_to.cn
-
-            if edge.status is None and current_round_result.status is None:
-                next_node_id = edge.node_to.cn
-                break
-            elif edge.status is None or current_round_result.status is None:
-                continue
-            elif edge.status == current_round_result.status:
-                next_node_id = edge.node_to.cn
-                break
-
-        if next_node_id is not None:
-            return self._node_map[next_node_id]
-        elif final_next_node_id is not None:
-            return self._node_map[final_next_node_id]
-        else:
+        route = route_map.get(current_round_result.result == OperationRoundResultEnum.SUCCESS)
+        if route is None:
             return None
+        return route.get_next_node(current_round_result.status)
 
     def _reset_status_for_new_node(self) -> None:
         """进入新节点时重置状态。
@@ -610,6 +552,7 @@ class Operation(OperationBase):
         self.current_pause_time = time.time() - self.pause_start_time
         self.pause_total_time += self.current_pause_time
         self._current_node_start_time += self.current_pause_time
+        self._pause_wake_event.set()
         self.handle_resume()
 
     def handle_resume(self) -> None:
@@ -619,6 +562,14 @@ class Operation(OperationBase):
         """
         pass
 
+    def _on_stop(self, e=None):
+        """停止运行时触发的回调 唤醒暂停中的等待。
+
+        Args:
+            e: 事件参数（可选）。
+        """
+        self._pause_wake_event.set()
+
     @property
     def operation_usage_time(self) -> float:
         """获取操作执行时间（不包括暂停时间）。
@@ -671,6 +622,7 @@ class Operation(OperationBase):
             result: 最终操作结果。
         """
         self.ctx.unlisten_all_event(self)
+        log.debug(self._pace_history.get_summary())
         if result.success:
             log.info('%s 执行成功 返回状态 %s', self.display_name, coalesce_gt(result.status, '成功', model='ui'))
         else:
@@ -846,11 +798,62 @@ class Operation(OperationBase):
             wait_round_time: 等待直到轮次时间达到此值，如果设置了wait则忽略。默认为None。
         """
         if wait is not None and wait > 0:
-            time.sleep(wait)
+            self._pace_wait(wait)
         elif wait_round_time is not None and wait_round_time > 0:
             to_wait = wait_round_time - (time.time() - self.round_start_time)
             if to_wait > 0:
-                time.sleep(to_wait)
+                self._pace_wait(to_wait)
+
+    def _pace_wait(self, seconds: float) -> None:
+        """按调度等待。
+
+        开启后台截图时 画面变化并稳定后提前结束等待 但至少等待一个最短时间:
+        有节点历史时 等待到节点通常离开时间的 PACE_EXPECTED_WAIT_RATIO 比例;
+        历史不足时 等待原本等待时间的 PACE_MIN_WAIT_RATIO 比例。
+        不会超过原本的等待时间。没有开启后台截图时 和固定等待一致。
+
+        Args:
+            seconds: 原本的等待时间（秒）。
+        """
+        producer = None
+        if self.adaptive_pacing and self.ctx.controller is not None:
+            producer = self.ctx.controller.frame_producer
+        if producer is None or not producer.is_running or self.last_screenshot is None:
+            self._fixed_wait(seconds)
+            return
+
+        result = wait_screen_change(producer, self.last_screenshot, seconds,
+                                    min_wait=self._get_pace_min_wait(seconds),
+                                    stop_checker=lambda: self.ctx.run_context.is_context_stop)
+        self._round_wait_seconds += result.waited
+        if result.settled and result.waited < seconds and self._current_node is not None:
+            self._pace_history.record_early_wake(self._current_node.cn, seconds - result.waited)
+
+    def _get_pace_min_wait(self, seconds: float) -> float:
+        """提前结束等待前 至少需要等待的时间。
+
+        Args:
+            seconds: 原本的等待时间（秒）。
+
+        Returns:
+            float: 最短等待时间（秒） 不超过原本的等待时间。
+        """
+        if self._current_node is not None and self._current_node_start_time is not None:
+            expected = self._pace_history.get_expected_transition_seconds(self._current_node.cn)
+            if expected is not None:
+                remaining = expected * Operation.PACE_EXPECTED_WAIT_RATIO - (time.time() - self._current_node_start_time)
+                return min(seconds, max(0.0, remaining))
+        return seconds * Operation.PACE_MIN_WAIT_RATIO
+
+    def _fixed_wait(self, seconds: float) -> None:
+        """固定时间的等待 不会提前结束 计入本轮的等待时间。
+
+        Args:
+            seconds: 等待时间（秒）。
+        """
+        if seconds > 0:
+            time.sleep(seconds)
+            self._round_wait_seconds += seconds
 
     def round_by_op_result(self, op_result: OperationResult, status: str | None = None, retry_on_fail: bool = False,
                            wait: float | None = None, wait_round_time: float | None = None) -> OperationRoundResult:
@@ -953,7 +956,7 @@ class Operation(OperationBase):
             if not any_found:
                 return self.round_success(status=area_name, wait=success_wait, wait_round_time=success_wait_round)
 
-        time.sleep(pre_delay)
+        self._fixed_wait(pre_delay)
         click = screen_utils.find_and_click_area(
             ctx=self.ctx,
             screen=screen,
@@ -1118,7 +1121,7 @@ class Operation(OperationBase):
             to_click = area.left_top
         else:
             to_click = area.center
-        time.sleep(pre_delay)
+        self._fixed_wait(pre_delay)
         click = self.ctx.controller.click(pos=to_click, pc_alt=area.pc_alt, gamepad_key=area.gamepad_key)
         if click:
             self.update_screen_after_operation(screen_name, area_name)
@@ -1208,7 +1211,7 @@ class Operation(OperationBase):
         if offset is not None:
             to_click = to_click + offset
 
-        time.sleep(pre_delay)
+        self._fixed_wait(pre_delay)
         click = self.ctx.controller.click(to_click)
         if click:
             return self.round_success(target_cn, wait=success_wait, wait_round_time=success_wait_round)
@@ -1272,7 +1275,7 @@ class Operation(OperationBase):
             if offset is not None:
                 to_click = to_click + offset
 
-            time.sleep(pre_delay)
+            self._fixed_wait(pre_delay)
             self.ctx.controller.click(to_click)
             return self.round_success(status=match_word, wait=success_wait, wait_round_time=success_wait_round)
 
@@ -1344,7 +1347,7 @@ class Operation(OperationBase):
             if offset is not None:
                 to_click = to_click + offset
 
-            time.sleep(pre_delay)
+            self._fixed_wait(pre_delay)
             self.ctx.controller.click(to_click)
 
             action = action_map.get(match_word, OperationRoundResultEnum.SUCCESS)
@@ -0,0 +1,290 @@
+"""指令节点网络的编译缓存。
+
+``@operation_node`` 和 ``@node_from`` 声明的节点网络在每个类上是固定的,
+因此每个指令类只在第一次使用时扫描一次注解, 编译为 ``OperationGraph`` 后缓存;
+之后每次执行指令只需要复制节点集合, 并加上实例相关的节点 (例如检测游戏窗口)。
+
+也可以作为命令行工具 编译一个包下所有的指令类 检查节点网络是否有错误::
+
+    uv run python -m one_dragon.base.operation.operation_graph zzz_od
+"""
+from __future__ import annotations
+
+import importlib
+import pkgutil
+import threading
+import types
+from dataclasses import dataclass, field
+
+from one_dragon.base.operation.operation_edge import OperationEdge, OperationEdgeDesc
+from one_dragon.base.operation.operation_node import OperationNode
+
+
+@dataclass
+class OperationRoute:
+    """一个节点在成功或失败时的下一个节点"""
+
+    status_map: dict[str | None, OperationNode] = field(default_factory=dict)  # 返回状态 -> 下一个节点
+    fallback: OperationNode | None = None  # 所有状态都匹配不到时的兜底节点
+
+    def get_next_node(self, status: str | None) -> OperationNode | None:
+        node = self.status_map.get(status)
+        return node if node is not None else self.fallback
+
+
+def build_route_map(edge_list: list[OperationEdge]) -> dict[bool, OperationRoute]:
+    """
+    将一个节点出发的边 按是否成功和返回状态整理 和按顺序遍历所有边的结果一致
+    - 状态相同的多条边 使用第一条;
+    - 忽略状态的多条边 使用最后一条作为兜底。
+
+    Args:
+        edge_list: 从同一个节点出发的边
+
+    Returns:
+        dict[bool, OperationRoute]: key=是否成功
+    """
+    route_map: dict[bool, OperationRoute] = {}
+    for edge in edge_list:
+        route = route_map.get(edge.success)
+        if route is None:
+            route = OperationRoute()
+            route_map[edge.success] = route
+        if edge.ignore_status:
+            route.fallback = edge.node_to
+        if edge.status not in route.status_map:
+            route.status_map[edge.status] = edge.node_to
+    return route_map
+
+
+class OperationGraph:
+
+    def __init__(self, op_class: type):
+        """
+        一个指令类编译后的节点网络 所有实例共用 只读
+        :param op_class: 指令类
+        """
+        self.op_class: type = op_class
+
+        self.node_list: list[OperationNode] = []
+        """节点列表 按方法名排序"""
+
+        self.node_map: dict[str, OperationNode] = {}
+        """节点集合 key=节点名称 value=节点"""
+
+        self.node_edges_map: dict[str, list[OperationEdge]] = {}
+        """节点的边集合 key=节点名称 value=从该节点出发的边列表"""
+
+        self.node_route_map: dict[str, dict[bool, OperationRoute]] = {}
+        """节点的下一个节点 key=节点名称 value=按是否成功和返回状态整理的边"""
+
+        self.start_node: OperationNode | None = None
+        """起始节点"""
+
+        self._compile()
+
+    def _compile(self) -> None:
+        """
+        扫描类方法的操作节点和边注解 构建节点网络
+        """
+        start_node: OperationNode | None = None
+        edge_desc_list: list[OperationEdgeDesc] = []
+        node_name_map: dict[str, OperationNode] = {}
+
+        for method in _get_class_method_list(self.op_class):
+            # 从方法对象上直接获取 @operation_node 附加的节点信息
+            node: OperationNode = getattr(method, 'operation_node_annotation', None)
+            if node is None:
+                # 如果方法没有被 @operation_node 装饰，则不是节点，直接跳过
+                continue
+
+            node_name_map[node.cn] = node
+            self.node_list.append(node)
+            if node.is_start_node:
+                if start_node is not None and start_node.cn != node.cn:
+                    raise ValueError(f'存在多个起始节点 {start_node.cn} {node.cn}')
+                start_node = node
+
+            # 从方法对象上直接获取 @node_from 附加的节点信息
+            edges: list[OperationEdgeDesc] = getattr(method, 'operation_edge_annotation', None)
+            if edges is None:
+                continue
+            for edge in edges:
+                edge.node_to_name = node.cn
+                edge_desc_list.append(edge)
+
+        for node in self.node_list:
+            if node.cn in self.node_map:
+                raise ValueError(f'存在重复的节点 {node.cn}')
+            self.node_map[node.cn] = node
+
+        op_in_map: dict[str, int] = {}  # 入度
+        for edge_desc in edge_desc_list:
+            node_from = node_name_map.get(edge_desc.node_from_name)
+            if node_from is None:
+                raise ValueError(f'找不到节点 {edge_desc.node_from_name}')
+            node_to = node_name_map.get(edge_desc.node_to_name)
+            if node_to is None:
+                raise ValueError(f'找不到节点 {edge_desc.node_to_name}')
+
+            edge = OperationEdge(
+                node_from,
+                node_to,
+                success=edge_desc.success,
+                status=edge_desc.status,
+                ignore_status=edge_desc.ignore_status
+            )
+            self.node_edges_map.setdefault(node_from.cn, []).append(edge)
+            op_in_map[node_to.cn] = op_in_map.get(node_to.cn, 0) + 1
+
+        if start_node is None:  # 没有指定开始节点时 自动判断
+            # 找出入度为0的开始点
+            for node in self.node_list:
+                if op_in_map.get(node.cn, 0) == 0:
+                    if start_node is not None and start_node.cn != node.cn:
+                        raise ValueError(f'存在多个起始节点 {start_node.cn} {node.cn}')
+                    start_node = node
+
+        if start_node is None:
+            raise ValueError('找不到起始节点')
+        self.start_node = start_node
+
+        for node_name, edge_list in self.node_edges_map.items():
+            self.node_route_map[node_name] = build_route_map(edge_list)
+
+
+def _get_class_method_list(op_class: type) -> list[types.FunctionType]:
+    """
+    获取类上 (包括父类) 的所有普通方法 子类覆盖的方法以子类为准 按方法名排序
+    和在实例上获取绑定方法的结果一致 但不会触发实例上的属性
+    """
+    member_map: dict[str, object] = {}
+    for klass in reversed(op_class.__mro__):
+        member_map.update(klass.__dict__)
+    return [
+        member_map[name]
+        for name in sorted(member_map.keys())
+        if isinstance(member_map[name], types.FunctionType)
+    ]
+
+
+_graph_cache: dict[type, OperationGraph] = {}
+_graph_cache_lock = threading.Lock()
+
+
+def get_operation_graph(op_class: type) -> OperationGraph:
+    """
+    获取指令类编译后的节点网络 第一次获取时编译
+    编译失败时抛出异常 不缓存 下次获取时会重新编译
+    :param op_class: 指令类
+    :return:
+    """
+    graph = _graph_cache.get(op_class)
+    if graph is not None:
+        return graph
+
+    with _graph_cache_lock:
+        graph = _graph_cache.get(op_class)
+        if graph is None:
+            graph = OperationGraph(op_class)
+            _graph_cache[op_class] = graph
+        return graph
+
+
+def clear_operation_graph_cache() -> None:
+    """
+    清除所有编译后的节点网络 用于重新加载了指令类的代码后
+    """
+    with _graph_cache_lock:
+        _graph_cache.clear()
+
+
+def _has_operation_node(op_class: type) -> bool:
+    return any(
+        getattr(method, 'operation_node_annotation', None) is not None
+        for method in _get_class_method_list(op_class)
+    )
+
+
+def validate_package(package_name: str, exclude_list: list[str] | None = None) -> list[str]:
+    """
+    导入一个包下的所有模块 编译其中所有指令类的节点网络
+    没有任何节点的类视为基类 跳过
+
+    Args:
+        package_name: 包名 例如 zzz_od
+        exclude_list: 不导入的子包名称 例如界面相关的 gui
+
+    Returns:
+        list[str]: 错误信息 为空时全部编译成功
+    """
+    from one_dragon.base.operation.operation import Operation
+    from one_dragon.utils.log_utils import log
+
+    error_list: list[str] = []
+    package = importlib.import_module(package_name)
+
+    # 不使用 pkgutil.walk_packages 它遍历时会导入被排除的子包 并且只处理 ImportError
+    to_walk: list[tuple[str, list[str]]] = [(package_name, package.__path__)]
+    while len(to_walk) > 0:
+        parent_name, parent_path = to_walk.pop()
+        for module_info in pkgutil.iter_modules(parent_path, prefix=f'{parent_name}.'):
+            if exclude_list is not None and module_info.name.rsplit('.', 1)[-1] in exclude_list:
+                continue
+            try:
+                module = importlib.import_module(module_info.name)
+            except (Exception, SystemExit) as e:  # 部分入口模块导入时会调用 sys.exit
+                error_list.append(f'{module_info.name} 导入失败 {type(e).__name__}: {e}')
+                continue
+            if module_info.ispkg:
+                to_walk.append((module_info.name, module.__path__))
+
+    op_class_list: list[type] = []
+    to_visit: list[type] = [Operation]
+    visited: set[type] = set()
+    while len(to_visit) > 0:
+        op_class = to_visit.pop()
+        if op_class in visited:
+            continue
+        visited.add(op_class)
+        to_visit.extend(op_class.__subclasses__())
+        if op_class.__module__.startswith(package_name):
+            op_class_list.append(op_class)
+
+    compiled_cnt: int = 0
+    for op_class in sorted(op_class_list, key=lambda i: f'{i.__module__}.{i.__qualname__}'):
+        if not _has_operation_node(op_class):
+            continue
+        try:
+            graph = get_operation_graph(op_class)
+            compiled_cnt += 1
+            log.debug(f'{op_class.__module__}.{op_class.__qualname__} 节点={len(graph.node_map)} 起始={graph.start_node.cn}')
+        except Exception as e:
+            error_list.append(f'{op_class.__module__}.{op_class.__qualname__} 编译失败 {e}')
+
+    log.info(f'编译指令节点网络 {package_name} 成功 {compiled_cnt} 个 错误 {len(error_list)} 个')
+    return error_list
+
+
+def main():
+    import argparse
+    import sys
+
+    from one_dragon.utils.log_utils import log
+
+    parser = argparse.ArgumentParser(description='编译所有指令类的节点网络 检查是否有错误')
+    parser.add_argument('package', nargs='*', default=['zzz_od'], help='需要检查的包')
+    parser.add_argument('--exclude', nargs='*', default=['gui', 'backend', 'win_exe'], help='不导入的子包名称')
+    args = parser.parse_args()
+
+    error_list: list[str] = []
+    for package_name in args.package:
+        error_list.extend(validate_package(package_name, exclude_list=args.exclude))
+
+    for error in error_list:
+        log.error(error)
+    sys.exit(1 if len(error_list) > 0 else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,275 @@
+"""指令轮次的等待调度。
+
+节点处理函数返回时指定的等待时间 (``wait`` / ``wait_round_time``) 是按最慢的情况设置的固定值。
+开启了后台截图 (``FrameProducer``) 时 可以在等待期间观察画面:
+
+- 画面相对本轮截图发生了变化 并且之后保持稳定一小段时间 说明游戏已经响应完毕 可以提前结束等待;
+- 纯色的画面 (例如淡入淡出时的黑屏) 是过渡画面 不算作稳定;
+- 提前结束前至少等待一个最短时间 按节点历史上通常多久之后离开计算 历史不足时使用固定比例;
+- 画面一直不变或者一直在变 (例如有动态背景) 时 仍然等满原来的时间 不会比原来更激进;
+- 不会等待超过原来的时间。
+
+每个指令类的各个节点 会记录离开节点的耗时 以及每轮的 识别工作时间 / 等待时间 / 节省的等待时间。
+没有开启后台截图时 等待和原来完全一致 只记录统计。
+"""
+from __future__ import annotations
+
+import threading
+import time
+from collections import deque
+from collections.abc import Callable
+from dataclasses import dataclass, field
+
+import cv2
+import numpy as np
+from cv2.typing import MatLike
+
+from one_dragon.base.controller.frame_producer import FrameProducer
+
+_THUMBNAIL_SIZE: tuple[int, int] = (64, 36)  # 比较画面时缩小后的大小 保持16:9
+_BLANK_STD_THRESHOLD: float = 3  # 缩小后画面的标准差低于这个值时 认为是纯色的过渡画面
+
+
+@dataclass
+class PaceWaitResult:
+    """一次等待的结果"""
+
+    waited: float = 0  # 实际等待的时间
+    changed: bool = False  # 画面是否发生了变化
+    settled: bool = False  # 画面变化后是否已经稳定 稳定时提前结束了等待
+
+
+@dataclass
+class NodePaceStats:
+    """一个节点的等待统计"""
+
+    node_name: str
+    visit_cnt: int = 0  # 离开节点的次数
+    round_cnt: int = 0  # 执行的轮次
+    work_seconds: float = 0  # 除等待外的执行时间
+    wait_seconds: float = 0  # 等待的时间
+    saved_seconds: float = 0  # 提前结束等待节省的时间
+    early_wake_cnt: int = 0  # 提前结束等待的次数
+    transition_list: deque[float] = field(default_factory=lambda: deque(maxlen=32))  # 最近离开节点的耗时
+
+    @property
+    def expected_transition_seconds(self) -> float | None:
+        """
+        通常进入节点后多久离开 取最近记录的中位数 记录太少时为None
+        """
+        if len(self.transition_list) < 3:
+            return None
+        return float(np.median(self.transition_list))
+
+    @property
+    def wait_ratio(self) -> float:
+        """等待时间占比"""
+        total = self.work_seconds + self.wait_seconds
+        return self.wait_seconds / total if total > 0 else 0
+
+
+class OperationPaceHistory:
+
+    def __init__(self, op_name: str):
+        """
+        一个指令类各个节点的等待统计 同一个类的所有实例共用
+        :param op_name: 指令类名称
+        """
+        self.op_name: str = op_name
+        self._lock = threading.Lock()
+        self._node_map: dict[str, NodePaceStats] = {}
+
+    def _get_node(self, node_name: str) -> NodePaceStats:
+        """
+        获取节点的统计 需要在持有锁时调用
+        """
+        stats = self._node_map.get(node_name)
+        if stats is None:
+            stats = NodePaceStats(node_name)
+            self._node_map[node_name] = stats
+        return stats
+
+    def record_round(self, node_name: str, work_seconds: float, wait_seconds: float) -> None:
+        """
+        记录一轮的执行时间
+        :param node_name: 节点名称
+        :param work_seconds: 除等待外的执行时间
+        :param wait_seconds: 等待的时间
+        """
+        with self._lock:
+            stats = self._get_node(node_name)
+            stats.round_cnt += 1
+            stats.work_seconds += max(0.0, work_seconds)
+            stats.wait_seconds += max(0.0, wait_seconds)
+
+    def record_early_wake(self, node_name: str, saved_seconds: float) -> None:
+        """
+        记录一次提前结束的等待
+        :param node_name: 节点名称
+        :param saved_seconds: 节省的时间
+        """
+        with self._lock:
+            stats = self._get_node(node_name)
+            stats.early_wake_cnt += 1
+            stats.saved_seconds += max(0.0, saved_seconds)
+
+    def record_transition(self, node_name: str, seconds: float) -> None:
+        """
+        记录一次离开节点
+        :param node_name: 节点名称
+        :param seconds: 进入节点到离开的时间
+        """
+        with self._lock:
+            stats = self._get_node(node_name)
+            stats.visit_cnt += 1
+            stats.transition_list.append(seconds)
+
+    def get_expected_transition_seconds(self, node_name: str) -> float | None:
+        """
+        节点通常进入后多久离开
+        :param node_name: 节点名称
+        :return: 记录太少时返回None
+        """
+        with self._lock:
+            stats = self._node_map.get(node_name)
+            return None if stats is None else stats.expected_transition_seconds
+
+    def get_stats_list(self) -> list[NodePaceStats]:
+        """
+        所有节点的统计 按等待时间从多到少排序
+        """
+        with self._lock:
+            return sorted(self._node_map.values(), key=lambda i: i.wait_seconds, reverse=True)
+
+    def get_summary(self) -> str:
+        """
+        等待时间的摘要 用于日志
+        """
+        stats_list = self.get_stats_list()
+        work = sum(i.work_seconds for i in stats_list)
+        wait = sum(i.wait_seconds for i in stats_list)
+        saved = sum(i.saved_seconds for i in stats_list)
+        return f'{self.op_name} 执行 {work:.2f}s 等待 {wait:.2f}s 提前结束等待节省 {saved:.2f}s'
+
+
+_history_map: dict[type, OperationPaceHistory] = {}
+_history_lock = threading.Lock()
+
+
+def get_pace_history(op_class: type) -> OperationPaceHistory:
+    """
+    获取指令类的等待统计 第一次获取时创建
+    :param op_class: 指令类
+    :return:
+    """
+    history = _history_map.get(op_class)
+    if history is not None:
+        return history
+
+    with _history_lock:
+        history = _history_map.get(op_class)
+        if history is None:
+            history = OperationPaceHistory(op_class.__name__)
+            _history_map[op_class] = history
+        return history
+
+
+def clear_pace_history() -> None:
+    """
+    清除所有指令类的等待统计
+    """
+    with _history_lock:
+        _history_map.clear()
+
+
+def get_thumbnail(image: MatLike) -> np.ndarray:
+    """
+    缩小后的画面 用于比较两帧是否有变化
+    :param image: 画面
+    :return:
+    """
+    return cv2.resize(image, _THUMBNAIL_SIZE, interpolation=cv2.INTER_AREA)
+
+
+def get_frame_diff(thumbnail_1: np.ndarray, thumbnail_2: np.ndarray) -> float:
+    """
+    两帧缩小后画面的平均像素差 [0, 255]
+    """
+    if thumbnail_1.shape != thumbnail_2.shape:
+        return 255.0
+    return float(cv2.absdiff(thumbnail_1, thumbnail_2).mean())
+
+
+def is_blank_frame(thumbnail: np.ndarray) -> bool:
+    """
+    缩小后的画面是否纯色 例如淡入淡出时的黑屏或白屏
+    """
+    return float(thumbnail.std()) < _BLANK_STD_THRESHOLD
+
+
+def wait_screen_change(
+        producer: FrameProducer,
+        ref_image: MatLike,
+        max_wait: float,
+        change_threshold: float = 4,
+        stable_threshold: float = 1.5,
+        settle_seconds: float = 0.15,
+        min_wait: float = 0,
+        stop_checker: Callable[[], bool] | None = None,
+) -> PaceWaitResult:
+    """
+    等待画面变化并稳定 最多等待 max_wait 秒
+    纯色的画面 (例如淡入淡出时的黑屏) 是过渡画面 不会作为稳定的画面结束等待
+
+    Args:
+        producer: 后台截图服务
+        ref_image: 参照的画面 一般是本轮开始时的截图
+        max_wait: 最长等待时间
+        change_threshold: 和参照画面的差异超过这个值时 认为画面发生了变化
+        stable_threshold: 相邻两帧的差异低于这个值时 认为画面稳定
+        settle_seconds: 画面变化后 需要保持稳定多久才结束等待
+        min_wait: 画面稳定后 也至少要等待的时间
+        stop_checker: 返回True时马上结束等待 例如已经停止运行
+
+    Returns:
+        PaceWaitResult: 等待结果
+    """
+    start_time = time.time()
+    deadline = start_time + max_wait
+    result = PaceWaitResult()
+
+    ref_thumbnail = get_thumbnail(ref_image)
+    prev_thumbnail: np.ndarray | None = None
+    stable_since: float = 0
+    last_frame_time: float = 0  # 第一次使用当前最新的一帧 之后每次等待新的一帧
+
+    while True:
+        remaining = deadline - time.time()
+        if remaining <= 0:
+            break
+        if stop_checker is not None and stop_checker():
+            break
+        if not producer.is_running:
+            time.sleep(remaining)
+            break
+
+        frame_time, frame = producer.wait_frame_after(last_frame_time, timeout=remaining)
+        if frame is None:
+            continue
+        last_frame_time = frame_time
+        thumbnail = get_thumbnail(frame)
+
+        if not result.changed:
+            if get_frame_diff(thumbnail, ref_thumbnail) > change_threshold:
+                result.changed = True
+                stable_since = frame_time
+        elif get_frame_diff(thumbnail, prev_thumbnail) > stable_threshold or is_blank_frame(thumbnail):
+            stable_since = frame_time
+        elif frame_time - stable_since >= settle_seconds and frame_time - start_time >= min_wait:
+            result.settled = True
+            break
+
+        prev_thumbnail = thumbnail
+
+    result.waited = time.time() - start_time
+    return result
@@ -0,0 +1,109 @@
+"""画面区域变化检测。
+
+对识别用到的区域计算缩略图作为签名 与上一次实际识别时的签名比较。
+区域没有变化时 识别结果必然相同 可以直接复用上一次的结果 跳过识别。
+"""
+import threading
+from dataclasses import dataclass
+from typing import Any
+
+import cv2
+import numpy as np
+from cv2.typing import MatLike
+
+from one_dragon.base.geometry.rectangle import Rect
+from one_dragon.utils import cv2_utils
+
+
+@dataclass
+class RegionChangeRecord:
+    """一个检测键最后一次实际识别时的记录"""
+
+    signature: np.ndarray  # 区域签名
+    result: Any  # 识别结果
+
+
+class RegionChangeDetector:
+
+    def __init__(
+        self,
+        thumbnail_size: int = 16,
+        diff_threshold: int = 8,
+    ):
+        """
+        Args:
+            thumbnail_size: 每个区域缩略图的边长
+            diff_threshold: 缩略图任一像素的差值超过这个值时 认为区域有变化
+        """
+        self.thumbnail_size: int = thumbnail_size
+        self.diff_threshold: int = diff_threshold
+
+        self._lock = threading.Lock()
+        self._record_map: dict[str, RegionChangeRecord] = {}
+
+    def cal_signature(self, screen: MatLike, rect_list: list[Rect]) -> np.ndarray:
+        """
+        计算区域签名 各区域缩略到固定大小后拼接
+
+        Args:
+            screen: 游戏画面
+            rect_list: 区域列表
+
+        Returns:
+            np.ndarray: 区域签名
+        """
+        size = (self.thumbnail_size, self.thumbnail_size)
+        thumbnail_list: list[np.ndarray] = []
+        for rect in rect_list:
+            part = cv2_utils.crop_image_only(screen, rect)
+            if part is None or part.size == 0:
+                thumbnail_list.append(np.zeros(size, dtype=np.int16))
+                continue
+            if part.ndim == 3:
+                part = cv2.cvtColor(part, cv2.COLOR_RGB2GRAY)
+            # INTER_AREA 取区域均值 可以抵消少量噪点
+            thumbnail = cv2.resize(part, size, interpolation=cv2.INTER_AREA)
+            thumbnail_list.append(thumbnail.astype(np.int16))
+
+        return np.stack(thumbnail_list)
+
+    def get_unchanged_result(self, key: str, signature: np.ndarray) -> tuple[bool, Any]:
+        """
+        区域没有变化时 返回上一次的识别结果
+
+        Args:
+            key: 检测键 通常是识别的名称
+            signature: 当前的区域签名
+
+        Returns:
+            tuple[bool, Any]: 区域是否没有变化, 上一次的识别结果
+        """
+        with self._lock:
+            record = self._record_map.get(key)
+        if record is None or record.signature.shape != signature.shape:
+            return False, None
+
+        diff = np.abs(record.signature - signature)
+        if int(diff.max()) > self.diff_threshold:
+            return False, None
+
+        return True, record.result
+
+    def update(self, key: str, signature: np.ndarray, result: Any) -> None:
+        """
+        记录一次实际识别的签名和结果
+
+        Args:
+            key: 检测键
+            signature: 区域签名
+            result: 识别结果
+        """
+        with self._lock:
+            self._record_map[key] = RegionChangeRecord(signature=signature, result=result)
+
+    def clear(self) -> None:
+        """
+        清除所有记录
+        """
+        with self._lock:
+            self._record_map.clear()
@@ -1,10 +1,14 @@
+import threading
+from collections import deque
 from pathlib import Path
 
 import yaml
 
 from one_dragon.base.screen.screen_area import ScreenArea
 from one_dragon.base.screen.screen_info import ScreenInfo
-from one_dragon.utils import os_utils, yaml_utils
+from one_dragon.base.screen.screen_match_index import ScreenMatchIndex
+from one_dragon.base.screen.yaml_metadata_cache import get_screen_metadata_cache
+from one_dragon.utils import os_utils
 from one_dragon.utils.log_utils import log
 
 
@@ -51,7 +55,11 @@ class ScreenContext:
         self._id_2_screen: dict[str, ScreenInfo] = {}
         self._extra_screen_ids: set[str] = set()
         self._extra_screen_file_path_map: dict[str, Path] = {}
-        self.screen_route_map: dict[str, dict[str, ScreenRoute]] = {}
+        self.screen_route_map: dict[str, dict[str, ScreenRoute]] = {}  # 已计算的路径 按出发画面懒加载
+        self._screen_adjacency: dict[str, list[ScreenRouteNode]] = {}  # 画面的直接跳转
+        self._screen_route_lock = threading.Lock()
+        self.screen_match_index: ScreenMatchIndex = ScreenMatchIndex()  # 画面识别索引
+        self.use_screen_match_index: bool = True  # 是否使用画面识别索引 关闭时逐个画面判断
 
         self.last_screen_name: str | None = None  # 上一个画面名字
         self.current_screen_name: str | None = None  # 当前的画面名字
@@ -83,6 +91,7 @@ class ScreenContext:
         self.screen_info_list.clear()
         self.screen_info_map.clear()
         self._screen_area_map.clear()
+        metadata_cache = get_screen_metadata_cache()
         if not from_memory:
             self._extra_screen_ids.clear()
             self._extra_screen_file_path_map.clear()
@@ -101,9 +110,7 @@ class ScreenContext:
                     continue
                 if file_path.name == '_od_merged.yml':
                     continue
-                with file_path.open(encoding='utf-8') as file:
-                    log.debug(f"加载yaml: {file_path}")
-                    data = yaml_utils.safe_load(file)
+                data = metadata_cache.get(str(file_path))
                 if not isinstance(data, dict):
                     log.warning(f"画面配置格式错误，已跳过: {file_path}")
                     continue
@@ -126,9 +133,7 @@ class ScreenContext:
             self._id_2_screen.clear()
             file_path = self.merge_yml_file_path
             if file_path.exists():
-                with file_path.open(encoding='utf-8') as file:
-                    log.debug(f"加载yaml: {file_path}")
-                    yaml_data = yaml_utils.safe_load(file)
+                yaml_data = metadata_cache.get(str(file_path))
             else:
                 log.info(f"合并画面配置文件不存在，按空配置加载: {file_path}")
                 yaml_data = []
@@ -155,7 +160,9 @@ class ScreenContext:
                 for screen_area in screen_info.area_list:
                     self._screen_area_map[f'{screen_info.screen_name}.{screen_area.area_name}'] = screen_area
 
+        metadata_cache.save()
         self.init_screen_route()
+        self.screen_match_index.build(self.screen_info_list)
 
         # 自动计算全局 screen：没有 app_id 的 screen 为全局
         self._global_screen_names = {
@@ -176,12 +183,12 @@ class ScreenContext:
             return
 
         added = False
+        metadata_cache = get_screen_metadata_cache()
         for file_path in screen_dir.iterdir():
             if file_path.suffix != '.yml':
                 continue
-            with file_path.open(encoding='utf-8') as file:
-                log.debug(f"加载插件画面: {file_path}")
-                data = yaml_utils.safe_load(file)
+            log.debug(f"加载插件画面: {file_path}")
+            data = metadata_cache.get(str(file_path))
             if not isinstance(data, dict):
                 log.warning(f"插件画面配置格式错误，已跳过: {file_path}")
                 continue
@@ -209,6 +216,7 @@ class ScreenContext:
 
         if added:
             self.init_screen_route()
+            self.screen_match_index.build(self.screen_info_list)
             self._global_screen_names = {
                 s.screen_name for s in self.screen_info_list if not s.app_id
             }
@@ -340,73 +348,88 @@ class ScreenContext:
 
     def init_screen_route(self) -> None:
         """
-        初始化画面间的跳转路径
+        初始化画面间的跳转关系
+        只记录每个画面的直接跳转 路径在使用时按出发画面通过BFS计算并缓存
+        只有跳转关系发生变化的画面 会使经过它的已缓存路径失效
         :return:
         """
-        self.screen_route_map.clear()
-
-        # 先对任意两个画面之间做初始化
-        for screen_1 in self.screen_info_list:
-            self.screen_route_map[screen_1.screen_name] = {}
-            for screen_2 in self.screen_info_list:
-                self.screen_route_map[screen_1.screen_name][screen_2.screen_name] = ScreenRoute(
-                    from_screen=screen_1.screen_name,
-                    to_screen=screen_2.screen_name
-                )
-
-        # 根据画面的goto_list来初始化边
+        new_adjacency: dict[str, list[ScreenRouteNode]] = {}
         for screen_info in self.screen_info_list:
+            node_list: list[ScreenRouteNode] = []
+            to_screen_set: set[str] = set()
             for area in screen_info.area_list:
                 if area.goto_list is None or len(area.goto_list) == 0:
                     continue
-                from_screen_route = self.screen_route_map[screen_info.screen_name]
-                if from_screen_route is None:
-                    log.error('画面路径没有初始化 %s', screen_info.screen_name)
-                    continue
                 for goto_screen_name in area.goto_list:
-                    if goto_screen_name not in from_screen_route:
+                    if goto_screen_name not in self.screen_info_map:
                         log.error('画面路径 %s -> %s 无法找到目标画面', screen_info.screen_name, goto_screen_name)
                         continue
-                    from_screen_route[goto_screen_name].node_list.append(
+                    if goto_screen_name in to_screen_set:  # 多个区域前往同一画面时 使用第一个区域
+                        continue
+                    to_screen_set.add(goto_screen_name)
+                    node_list.append(
                         ScreenRouteNode(
                             from_screen=screen_info.screen_name,
                             from_area=area.area_name,
                             to_screen=goto_screen_name
                         )
                     )
-
-        # Floyd算出任意两个画面之间的路径
-        screen_len = len(self.screen_info_list)
-        for k in range(screen_len):
-            screen_k = self.screen_info_list[k]
-            for i in range(screen_len):
-                if i == k:
+            new_adjacency[screen_info.screen_name] = node_list
+
+        with self._screen_route_lock:
+            # 找出跳转关系有变化的画面 包括新增和删除的画面
+            changed_screen_set: set[str] = set()
+            for screen_name in set(new_adjacency.keys()) | set(self._screen_adjacency.keys()):
+                old_node_list = self._screen_adjacency.get(screen_name)
+                new_node_list = new_adjacency.get(screen_name)
+                if old_node_list is None or new_node_list is None:
+                    changed_screen_set.add(screen_name)
                     continue
-                screen_i = self.screen_info_list[i]
-
-                route_ik: ScreenRoute = self.screen_route_map[screen_i.screen_name][screen_k.screen_name]
-                if not route_ik.can_go:  # 无法从 i 到 k
+                if ([(i.from_area, i.to_screen) for i in old_node_list]
+                        != [(i.from_area, i.to_screen) for i in new_node_list]):
+                    changed_screen_set.add(screen_name)
+
+            self._screen_adjacency = new_adjacency
+
+            # BFS只会经过可到达的画面 路径没有经过变化画面的话 结果不变
+            for from_screen in list(self.screen_route_map.keys()):
+                from_route = self.screen_route_map[from_screen]
+                if from_screen in changed_screen_set or any(
+                    route.to_screen in changed_screen_set
+                    for route in from_route.values()
+                    if route.can_go
+                ):
+                    del self.screen_route_map[from_screen]
+
+    def _cal_screen_route_by_bfs(self, from_screen: str) -> dict[str, ScreenRoute]:
+        """
+        通过BFS计算一个画面出发到所有可到达画面的最短路径
+        调用方需持有 self._screen_route_lock
+        :param from_screen: 出发画面
+        :return: 目标画面 -> 路径
+        """
+        from_route: dict[str, ScreenRoute] = {
+            from_screen: ScreenRoute(from_screen=from_screen, to_screen=from_screen)
+        }
+        queue: deque[str] = deque([from_screen])
+        while len(queue) > 0:
+            current_screen = queue.popleft()
+            current_node_list = from_route[current_screen].node_list
+            for node in self._screen_adjacency.get(current_screen, []):
+                if node.to_screen in from_route:
                     continue
+                route = ScreenRoute(from_screen=from_screen, to_screen=node.to_screen)
+                route.node_list = current_node_list + [node]
+                from_route[node.to_screen] = route
+                queue.append(node.to_screen)
 
-                for j in range(screen_len):
-                    if k == j or i == j:
-                        continue
-                    screen_j = self.screen_info_list[j]
-
-                    route_kj: ScreenRoute = self.screen_route_map[screen_k.screen_name][screen_j.screen_name]
-                    if not route_kj.can_go:  # 无法从 k 到 j
-                        continue
-
-                    route_ij: ScreenRoute = self.screen_route_map[screen_i.screen_name][screen_j.screen_name]
+        # 画面可以跳转到自身时 (例如切换标签页) 保留这个跳转
+        for node in self._screen_adjacency.get(from_screen, []):
+            if node.to_screen == from_screen:
+                from_route[from_screen].node_list = [node]
+                break
 
-                    if (not route_ij.can_go  # 当前无法从 i 到 j
-                        or len(route_ik.node_list) + len(route_kj.node_list) < len(route_ij.node_list)  # 新的更短
-                    ):
-                        route_ij.node_list = []
-                        for node_ik in route_ik.node_list:
-                            route_ij.node_list.append(node_ik)
-                        for node_kj in route_kj.node_list:
-                            route_ij.node_list.append(node_kj)
+        return from_route
 
     def get_screen_route(self, from_screen: str, to_screen: str) -> ScreenRoute | None:
         """
@@ -415,10 +438,18 @@ class ScreenContext:
         :param to_screen:
         :return:
         """
-        from_route = self.screen_route_map.get(from_screen, None)
-        if from_route is None:
+        if from_screen not in self.screen_info_map or to_screen not in self.screen_info_map:
             return None
-        return from_route.get(to_screen, None)
+        with self._screen_route_lock:
+            from_route = self.screen_route_map.get(from_screen, None)
+            if from_route is None:
+                from_route = self._cal_screen_route_by_bfs(from_screen)
+                self.screen_route_map[from_screen] = from_route
+            route = from_route.get(to_screen, None)
+            if route is None:  # 无法到达
+                route = ScreenRoute(from_screen=from_screen, to_screen=to_screen)
+                from_route[to_screen] = route
+            return route
 
     def update_current_screen_name(self, screen_name: str) -> None:
         """
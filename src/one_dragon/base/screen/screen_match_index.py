@@ -0,0 +1,233 @@
+"""画面识别索引。
+
+画面加载后预先编译每个画面的标识区域(``id_mark``),识别时:
+- 相同 rect 且相同判断条件的区域在所有画面间共享 同一帧只判断一次;
+- 每个画面按代价排序判断 模板区域在前 文本区域在后 同代价时优先判断被更多画面共享的区域;
+- 一个共享区域判断失败 所有包含它的画面都会被直接排除 相当于按区域划分的决策树;
+- 剩余候选画面的文本区域合并成一次批量OCR。
+"""
+from __future__ import annotations
+
+import threading
+from dataclasses import dataclass
+from typing import TYPE_CHECKING
+
+from one_dragon.base.screen import screen_utils
+from one_dragon.base.screen.screen_area import ScreenArea
+from one_dragon.base.screen.screen_info import ScreenInfo
+
+if TYPE_CHECKING:
+    from cv2.typing import MatLike
+
+    from one_dragon.base.operation.one_dragon_context import OneDragonContext
+
+
+@dataclass
+class ScreenAreaCheck:
+    """一个去重后的区域判断"""
+
+    idx: int  # 在索引中的下标
+    area: ScreenArea  # 用于判断的区域 取第一个出现的区域
+    is_text: bool  # 是否需要OCR
+    share_cnt: int = 0  # 被多少个画面使用
+
+
+@dataclass
+class CompiledScreen:
+    """编译后的画面标识"""
+
+    screen_info: ScreenInfo
+    area_signature: tuple[int, ...]  # 编译时区域对象的id 用于发现区域列表被修改
+    template_check_list: list[int]  # 非文本区域判断 按优先级排列
+    text_check_list: list[int]  # 文本区域判断 按优先级排列
+
+
+class ScreenMatchIndex:
+
+    def __init__(self):
+        self.check_list: list[ScreenAreaCheck] = []
+        self.screen_map: dict[str, CompiledScreen] = {}
+
+        # 同一帧的判断结果 key=(判断下标, crop_first)
+        self._frame_lock = threading.Lock()
+        self._frame_image: MatLike | None = None
+        self._frame_result: dict[tuple[int, bool], bool] = {}
+
+    @staticmethod
+    def get_check_key(area: ScreenArea) -> tuple:
+        """
+        区域判断的唯一键 相同键的区域判断结果一定相同
+
+        Args:
+            area: 区域
+
+        Returns:
+            tuple: 判断的键
+        """
+        rect = (area.rect.x1, area.rect.y1, area.rect.x2, area.rect.y2)
+        if area.is_text_area:
+            color_range = None if area.color_range is None else tuple(tuple(i) for i in area.color_range)
+            return 'text', rect, area.text, area.lcs_percent, color_range
+        elif area.is_template_area:
+            return 'template', rect, area.template_sub_dir, area.template_id, area.template_match_threshold
+        else:
+            return 'other', rect
+
+    def build(self, screen_info_list: list[ScreenInfo]) -> None:
+        """
+        编译画面列表
+
+        Args:
+            screen_info_list: 画面列表
+        """
+        check_list: list[ScreenAreaCheck] = []
+        check_key_map: dict[tuple, ScreenAreaCheck] = {}
+        screen_check_map: dict[str, list[ScreenAreaCheck]] = {}
+
+        for screen_info in screen_info_list:
+            screen_check_list: list[ScreenAreaCheck] = []
+            for area in screen_info.area_list:
+                if not area.id_mark:
+                    continue
+                key = self.get_check_key(area)
+                check = check_key_map.get(key)
+                if check is None:
+                    check = ScreenAreaCheck(idx=len(check_list), area=area, is_text=area.is_text_area)
+                    check_list.append(check)
+                    check_key_map[key] = check
+                if check in screen_check_list:
+                    continue
+                check.share_cnt += 1
+                screen_check_list.append(check)
+            screen_check_map[screen_info.screen_name] = screen_check_list
+
+        screen_map: dict[str, CompiledScreen] = {}
+        for screen_info in screen_info_list:
+            screen_check_list = screen_check_map[screen_info.screen_name]
+            # 共享越多的区域 判断失败时能排除越多画面
+            screen_check_list.sort(key=lambda i: -i.share_cnt)
+            screen_map[screen_info.screen_name] = CompiledScreen(
+                screen_info=screen_info,
+                area_signature=tuple(id(i) for i in screen_info.area_list),
+                template_check_list=[i.idx for i in screen_check_list if not i.is_text],
+                text_check_list=[i.idx for i in screen_check_list if i.is_text],
+            )
+
+        with self._frame_lock:
+            self.check_list = check_list
+            self.screen_map = screen_map
+            self._frame_image = None
+            self._frame_result = {}
+
+    def get_compiled_screen(self, screen_info: ScreenInfo) -> CompiledScreen | None:
+        """
+        获取编译后的画面 画面对象或区域列表在编译后被修改时返回None
+
+        Args:
+            screen_info: 画面信息
+
+        Returns:
+            CompiledScreen | None: 编译后的画面
+        """
+        compiled = self.screen_map.get(screen_info.screen_name)
+        if compiled is None or compiled.screen_info is not screen_info:
+            return None
+        if len(compiled.area_signature) != len(screen_info.area_list):
+            return None
+        for area_id, area in zip(compiled.area_signature, screen_info.area_list, strict=True):
+            if area_id != id(area):
+                return None
+        return compiled
+
+    def _get_frame_result(self, screen: MatLike) -> dict[tuple[int, bool], bool]:
+        """
+        获取当前帧的判断结果 换了截图时重新记录
+
+        Args:
+            screen: 游戏截图
+
+        Returns:
+            dict: 判断结果
+        """
+        with self._frame_lock:
+            if self._frame_image is not screen:
+                self._frame_image = screen
+                self._frame_result = {}
+            return self._frame_result
+
+    def get_first_match_screen_name(
+        self,
+        ctx: OneDragonContext,
+        screen: MatLike,
+        screen_info_list: list[ScreenInfo],
+        crop_first: bool = True,
+    ) -> str | None:
+        """
+        根据游戏截图 按顺序返回第一个匹配的画面
+        调用方需先确认画面都已编译 见 get_compiled_screen
+
+        Args:
+            ctx: 上下文
+            screen: 游戏截图
+            screen_info_list: 按优先级排列的画面列表
+            crop_first: 在传入区域时 是否先裁剪再进行文本识别
+
+        Returns:
+            str | None: 画面名称
+        """
+        frame_result = self._get_frame_result(screen)
+        check_list = self.check_list
+
+        def _check(check_idx: int) -> bool:
+            key = (check_idx, crop_first)
+            result = frame_result.get(key)
+            if result is None:
+                area = check_list[check_idx].area
+                result = screen_utils.find_area_in_screen(ctx, screen, area, crop_first) == screen_utils.FindAreaResultEnum.TRUE
+                frame_result[key] = result
+            return result
+
+        candidate_list: list[CompiledScreen] = []
+        for screen_info in screen_info_list:
+            compiled = self.screen_map.get(screen_info.screen_name)
+            if compiled is None:
+                continue
+            if len(compiled.template_check_list) == 0 and len(compiled.text_check_list) == 0:
+                continue
+
+            # 已知失败的文本区域 直接排除
+            if any(frame_result.get((i, crop_first)) is False for i in compiled.text_check_list):
+                continue
+            if not all(_check(i) for i in compiled.template_check_list):
+                continue
+
+            if len(candidate_list) == 0 and all(frame_result.get((i, crop_first)) for i in compiled.text_check_list):
+                # 前面没有需要OCR的画面 可以直接返回
+                return screen_info.screen_name
+            candidate_list.append(compiled)
+
+        if len(candidate_list) == 0:
+            return None
+
+        # 剩余候选画面中未判断的文本区域 合并成一次批量OCR
+        to_check_idx_list: list[int] = []
+        for compiled in candidate_list:
+            for check_idx in compiled.text_check_list:
+                if (check_idx, crop_first) not in frame_result and check_idx not in to_check_idx_list:
+                    to_check_idx_list.append(check_idx)
+
+        if len(to_check_idx_list) > 0:
+            find_result_list = screen_utils.batch_find_area_in_screen(
+                ctx,
+                screen,
+                [check_list[i].area for i in to_check_idx_list],
+                crop_first,
+            )
+            for check_idx, find_result in zip(to_check_idx_list, find_result_list, strict=True):
+                frame_result[(check_idx, crop_first)] = find_result == screen_utils.FindAreaResultEnum.TRUE
+
+        for compiled in candidate_list:
+            if all(frame_result[(i, crop_first)] for i in compiled.text_check_list):
+                return compiled.screen_info.screen_name
+
+        return None
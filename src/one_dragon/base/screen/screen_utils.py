@@ -179,6 +179,54 @@ def find_area_in_screen(
     return FindAreaResultEnum.TRUE if find else FindAreaResultEnum.FALSE
 
 
+def batch_find_area_in_screen(
+    ctx: OneDragonContext,
+    screen: MatLike,
+    area_list: list[ScreenArea],
+    crop_first: bool = True,
+) -> list[FindAreaResultEnum]:
+    """
+    游戏截图中 是否能找到多个区域
+    所有文本区域合并成一次批量OCR 模板区域逐个匹配
+
+    Args:
+        ctx: 上下文
+        screen: 游戏截图
+        area_list: 区域列表
+        crop_first: 在传入区域时 是否先裁剪再进行文本识别
+
+    Returns:
+        list[FindAreaResultEnum]: 与 area_list 一一对应的结果
+    """
+    result_list: list[FindAreaResultEnum] = [FindAreaResultEnum.FALSE] * len(area_list)
+
+    text_idx_list: list[int] = []
+    for idx, area in enumerate(area_list):
+        if area is None:
+            result_list[idx] = FindAreaResultEnum.AREA_NO_CONFIG
+        elif area.is_text_area:
+            text_idx_list.append(idx)
+        else:
+            result_list[idx] = find_area_in_screen(ctx, screen, area, crop_first)
+
+    if len(text_idx_list) == 0:
+        return result_list
+
+    ocr_result_list_list = ctx.ocr_service.batch_ocr(
+        image=screen,
+        region_list=[(area_list[idx].rect, area_list[idx].color_range) for idx in text_idx_list],
+        crop_first=crop_first,
+    )
+    for idx, ocr_result_list in zip(text_idx_list, ocr_result_list_list, strict=True):
+        area = area_list[idx]
+        for ocr_result in ocr_result_list:
+            if str_utils.find_by_lcs(gt(area.text, 'game'), ocr_result.data, percent=area.lcs_percent):
+                result_list[idx] = FindAreaResultEnum.TRUE
+                break
+
+    return result_list
+
+
 def find_template_coord_in_area(
     ctx: OneDragonContext,
     screen: MatLike,
@@ -351,19 +399,21 @@ def get_match_screen_name(
         str | None: 画面名称
     """
     if screen_name_list is not None:
-        for screen_info in ctx.screen_loader.screen_info_list:
-            if screen_info.screen_name not in screen_name_list:
-                continue
-            if is_target_screen(ctx, screen, screen_info=screen_info, crop_first=crop_first):
-                return screen_info.screen_name
+        return get_first_match_screen_name(
+            ctx,
+            screen,
+            [i for i in ctx.screen_loader.screen_info_list if i.screen_name in screen_name_list],
+            crop_first=crop_first,
+        )
     elif ctx.screen_loader.current_screen_name is not None or ctx.screen_loader.last_screen_name is not None:
         return get_match_screen_name_from_last(ctx, screen, crop_first=crop_first)
     else:
-        for screen_info in ctx.screen_loader.active_screen_info_list:
-            if is_target_screen(ctx, screen, screen_info=screen_info, crop_first=crop_first):
-                return screen_info.screen_name
-
-    return None
+        return get_first_match_screen_name(
+            ctx,
+            screen,
+            ctx.screen_loader.active_screen_info_list,
+            crop_first=crop_first,
+        )
 
 
 def get_match_screen_name_from_last(
@@ -424,14 +474,103 @@ def get_match_screen_name_from_last(
                     bfs_list.append(goto_screen)
 
     # 最后 尝试搜索中没有出现的画面
-    for screen_info in ctx.screen_loader.active_screen_info_list:
-        if screen_info.screen_name in bfs_list:
+    return get_first_match_screen_name(
+        ctx,
+        screen,
+        [i for i in ctx.screen_loader.active_screen_info_list if i.screen_name not in bfs_list],
+        crop_first=crop_first,
+    )
+
+
+def get_first_match_screen_name(
+    ctx: OneDragonContext,
+    screen: MatLike,
+    screen_info_list: list[ScreenInfo],
+    crop_first: bool = True,
+) -> str | None:
+    """
+    根据游戏截图 按顺序返回第一个匹配的画面
+    先逐个判断非文本的标识区域 排除不符合的画面后 剩余画面的所有文本标识区域合并成一次批量OCR
+
+    Args:
+        ctx: 上下文
+        screen: 游戏截图
+        screen_info_list: 按优先级排列的画面列表
+        crop_first: 在传入区域时 是否先裁剪再进行文本识别
+
+    Returns:
+        str | None: 画面名称
+    """
+    screen_loader = ctx.screen_loader
+    if screen_loader.use_screen_match_index and all(
+        screen_loader.screen_match_index.get_compiled_screen(i) is not None
+        for i in screen_info_list
+    ):
+        return screen_loader.screen_match_index.get_first_match_screen_name(
+            ctx, screen, screen_info_list, crop_first=crop_first
+        )
+
+    candidate_list: list[tuple[ScreenInfo, list[ScreenArea]]] = []
+    for screen_info in screen_info_list:
+        text_area_list = _get_text_id_mark_if_others_fit(ctx, screen, screen_info, crop_first)
+        if text_area_list is None:
             continue
-        if is_target_screen(ctx, screen, screen_info=screen_info, crop_first=crop_first):
+        if len(text_area_list) == 0 and len(candidate_list) == 0:
+            # 前面没有需要OCR的画面 可以直接返回
+            return screen_info.screen_name
+        candidate_list.append((screen_info, text_area_list))
+
+    if len(candidate_list) == 0:
+        return None
+
+    all_text_area_list: list[ScreenArea] = []
+    for _, text_area_list in candidate_list:
+        all_text_area_list.extend(text_area_list)
+    find_result_list = batch_find_area_in_screen(ctx, screen, all_text_area_list, crop_first)
+
+    result_idx: int = 0
+    for screen_info, text_area_list in candidate_list:
+        area_result_list = find_result_list[result_idx:result_idx + len(text_area_list)]
+        result_idx += len(text_area_list)
+        if all(i == FindAreaResultEnum.TRUE for i in area_result_list):
             return screen_info.screen_name
 
     return None
 
+
+def _get_text_id_mark_if_others_fit(
+    ctx: OneDragonContext,
+    screen: MatLike,
+    screen_info: ScreenInfo,
+    crop_first: bool = True,
+) -> list[ScreenArea] | None:
+    """
+    判断画面中非文本的标识区域是否都符合 符合时返回还需要OCR判断的文本标识区域
+
+    Args:
+        ctx: 上下文
+        screen: 游戏截图
+        screen_info: 目标画面信息
+        crop_first: 在传入区域时 是否先裁剪再进行文本识别
+
+    Returns:
+        list[ScreenArea] | None: 需要OCR判断的文本标识区域 画面没有标识区域或非文本标识区域不符合时返回None
+    """
+    existed_id_mark: bool = False
+    text_area_list: list[ScreenArea] = []
+    for screen_area in screen_info.area_list:
+        if not screen_area.id_mark:
+            continue
+        existed_id_mark = True
+
+        if screen_area.is_text_area:
+            text_area_list.append(screen_area)
+        elif find_area_in_screen(ctx, screen, screen_area, crop_first) != FindAreaResultEnum.TRUE:
+            return None
+
+    return text_area_list if existed_id_mark else None
+
+
 def is_target_screen(
     ctx: OneDragonContext,
     screen: MatLike,
@@ -459,18 +598,19 @@ def is_target_screen(
         if screen_info is None:
             return False
 
-    existed_id_mark: bool = False
-    fit_id_mark: bool = True
-    for screen_area in screen_info.area_list:
-        if not screen_area.id_mark:
-            continue
-        existed_id_mark = True
+    screen_loader = ctx.screen_loader
+    if screen_loader.use_screen_match_index and screen_loader.screen_match_index.get_compiled_screen(screen_info) is not None:
+        return screen_loader.screen_match_index.get_first_match_screen_name(
+            ctx, screen, [screen_info], crop_first=crop_first
+        ) is not None
 
-        if find_area_in_screen(ctx, screen, screen_area, crop_first) != FindAreaResultEnum.TRUE:
-            fit_id_mark = False
-            break
+    # 先判断非文本的标识区域 不符合时无需OCR
+    text_area_list = _get_text_id_mark_if_others_fit(ctx, screen, screen_info, crop_first)
+    if text_area_list is None:
+        return False
 
-    return existed_id_mark and fit_id_mark
+    find_result_list = batch_find_area_in_screen(ctx, screen, text_area_list, crop_first)
+    return all(i == FindAreaResultEnum.TRUE for i in find_result_list)
 
 
 def find_by_ocr(
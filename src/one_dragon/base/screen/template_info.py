@@ -5,7 +5,7 @@ import shutil
 from cv2.typing import MatLike
 from enum import Enum
 from functools import lru_cache
-from typing import List, Optional, Tuple
+from typing import TYPE_CHECKING, List, Optional, Tuple
 
 from one_dragon.base.config.config_item import ConfigItem
 from one_dragon.base.config.yaml_operator import YamlOperator
@@ -13,6 +13,9 @@ from one_dragon.base.geometry.point import Point
 from one_dragon.base.geometry.rectangle import Rect
 from one_dragon.utils import os_utils, cal_utils, cv2_utils
 
+if TYPE_CHECKING:
+    from one_dragon.base.screen.template_store import TemplateStoreEntry
+
 TEMPLATE_RAW_FILE_NAME = 'raw.png'
 TEMPLATE_MASK_FILE_NAME = 'mask.png'
 TEMPLATE_CONFIG_FILE_NAME = 'config.yml'
@@ -30,7 +33,12 @@ class TemplateShapeEnum(Enum):
 
 class TemplateInfo(YamlOperator):
 
-    def __init__(self, sub_dir: str, template_id: str):
+    def __init__(self, sub_dir: str, template_id: str, store_entry: Optional['TemplateStoreEntry'] = None):
+        """
+        :param sub_dir: 模板分类
+        :param template_id: 模板id
+        :param store_entry: 模板存储中预计算好的数据 传入时不再从硬盘读取图片
+        """
         # 旧的模板ID 在开发工具中使用 方便更改后迁移文件
         self.old_sub_dir: str = sub_dir
         self.old_template_id: str = template_id
@@ -52,14 +60,24 @@ class TemplateInfo(YamlOperator):
         self.auto_mask: bool = self.get('auto_mask', True)
         self.point_updated: bool = False  # 点位是否更改过 开发工具中用
 
-        self.raw: MatLike = cv2_utils.read_image(get_template_raw_path(self.sub_dir, self.template_id))  # 原图
-        self.mask: MatLike = cv2_utils.read_image(get_template_mask_path(self.sub_dir, self.template_id))  # 掩码
-
         # 运算后保存在内存的
         self._gray: MatLike = None  # 灰度图
+        self._hsv: MatLike = None  # HSV图
         self._kps: List[cv2.KeyPoint] = None  # 关键点
         self._desc: MatLike = None  # 描述
 
+        if store_entry is not None:
+            self.raw: MatLike = store_entry.raw  # 原图
+            self.mask: MatLike = store_entry.mask  # 掩码
+            self._gray = store_entry.gray
+            self._hsv = store_entry.hsv
+            features = store_entry.features
+            if features is not None:
+                self._kps, self._desc = features
+        else:
+            self.raw: MatLike = cv2_utils.read_image(get_template_raw_path(self.sub_dir, self.template_id))  # 原图
+            self.mask: MatLike = cv2_utils.read_image(get_template_mask_path(self.sub_dir, self.template_id))  # 掩码
+
     def get_yml_file_path(self) -> str:
         return get_template_config_path(self.sub_dir, self.template_id)
 
@@ -126,6 +144,15 @@ class TemplateInfo(YamlOperator):
         self._gray = cv2.cvtColor(self.raw, cv2.COLOR_RGB2GRAY)
         return self._gray
 
+    @property
+    def hsv(self) -> MatLike:
+        if self._hsv is not None:
+            return self._hsv
+        if self.raw is None:
+            return None
+        self._hsv = cv2.cvtColor(self.raw, cv2.COLOR_RGB2HSV)
+        return self._hsv
+
     @property
     def features(self) -> Tuple[List[cv2.KeyPoint], MatLike]:
         if self._kps is not None:
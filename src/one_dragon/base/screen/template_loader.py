@@ -2,15 +2,26 @@ import os
 from cv2.typing import MatLike
 from typing import List, Optional
 
-from one_dragon.base.screen.template_info import TemplateInfo, is_template_existed
+from one_dragon.base.config import yaml_operator
+from one_dragon.base.screen.template_info import TemplateInfo, get_template_config_path, is_template_existed
+from one_dragon.base.screen.template_store import TemplateStore
+from one_dragon.base.screen.yaml_metadata_cache import get_template_metadata_cache
 from one_dragon.utils import os_utils
 
 
 class TemplateLoader:
 
-    def __init__(self):
+    def __init__(self, use_store: bool = True):
+        """
+        :param use_store: 是否使用预计算的模板存储 存储文件不存在时照常从硬盘读取
+        """
         self.template: dict[str, TemplateInfo] = {}
 
+        self.template_store: TemplateStore | None = None
+        if use_store:
+            self.template_store = TemplateStore()
+            self.template_store.load()
+
     def get_all_template_info_from_disk(self, need_raw: bool = True, need_config: bool = False) -> List[TemplateInfo]:
         """
         从硬盘加载模板信息
@@ -38,10 +49,27 @@ class TemplateLoader:
                 if not is_template_existed(sub_name_1, sub_name_2, need_raw=need_raw, need_config=need_config):
                     continue
 
+                self._prime_template_config(sub_name_1, sub_name_2)
                 info_list.append(TemplateInfo(sub_name_1, sub_name_2))
 
+        get_template_metadata_cache().save()
         return info_list
 
+    @staticmethod
+    def _prime_template_config(sub_dir: str, template_id: str) -> None:
+        """
+        从二进制缓存中读取模板配置 预先放入yml缓存 模板读取配置时不需要再解析
+        :param sub_dir: 模板分类
+        :param template_id: 模板id
+        :return:
+        """
+        config_path = get_template_config_path(sub_dir, template_id)
+        if not os.path.exists(config_path):
+            return
+        data = get_template_metadata_cache().get(config_path)
+        if isinstance(data, dict | list):
+            yaml_operator.put_cache(config_path, data)
+
     def load_template(self, sub_dir: str, template_id: str, only_mask: bool = False) -> Optional[TemplateInfo]:
         """
         加载某个模板到内存
@@ -52,12 +80,30 @@ class TemplateLoader:
         """
         if not is_template_existed(sub_dir, template_id, need_raw=False):
             return None
-        template: TemplateInfo = TemplateInfo(sub_dir, template_id)
+        store_entry = None
+        if self.template_store is not None and self.template_store.loaded:
+            store_entry = self.template_store.get_entry(sub_dir, template_id)
+        self._prime_template_config(sub_dir, template_id)
+        template: TemplateInfo = TemplateInfo(sub_dir, template_id, store_entry=store_entry)
 
         key = '%s:%s' % (sub_dir, template_id)
         self.template[key] = template
         return template
 
+    def build_template_store(self, with_features: bool = False) -> None:
+        """
+        重新构建模板存储 并清空已加载的模板
+        构建前先释放已加载模板对旧存储文件的引用 构建会写入新的数据文件 不会覆盖旧文件
+        :param with_features: 是否计算特征点
+        :return:
+        """
+        self.template.clear()
+        if self.template_store is None:
+            self.template_store = TemplateStore()
+        self.template_store.close()
+        self.template_store.build(with_features=with_features)
+        self.template_store.load()
+
     def get_template(self, sub_dir: str, template_id: str) -> TemplateInfo:
         """
         获取某个模板 会存在内容
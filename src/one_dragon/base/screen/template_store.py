@@ -0,0 +1,346 @@
+"""模板的预计算存储。
+
+将 assets/template 下所有模板的原图、灰度图、掩码、HSV图 以及可选的特征点
+预先计算后打包成一个二进制文件 启动时通过内存映射读取 不再逐个解码PNG。
+模板的配置文件由 ``yaml_metadata_cache`` 缓存 这里不重复保存。
+
+每次构建都写入一个新的数据文件 ``template_store.<序号>.bin``
+再替换指针文件 ``template_store.bin.current`` 指向它。
+旧的数据文件可能仍被内存映射 (Windows 下无法覆盖或删除) 因此构建时不会覆盖 只尝试清理。
+
+数据文件格式
+- 8字节 魔数
+- 4字节 版本号 (little-endian uint32)
+- 8字节 索引长度 (little-endian uint64)
+- 索引 JSON (utf-8) 记录每个模板的来源文件签名及各数组的偏移、形状、类型
+- 对齐到64字节后 为所有数组的原始数据
+
+模板来源文件 (raw.png / mask.png) 的修改时间或大小变化时 该模板视为过期 回退到从硬盘读取。
+"""
+import json
+import os
+import struct
+import threading
+import time
+from dataclasses import dataclass, field
+
+import cv2
+import numpy as np
+
+from one_dragon.base.screen.template_info import (
+    TEMPLATE_MASK_FILE_NAME,
+    TEMPLATE_RAW_FILE_NAME,
+    get_template_dir_path,
+)
+from one_dragon.utils import os_utils
+from one_dragon.utils.log_utils import log
+
+TEMPLATE_STORE_VERSION: int = 2
+_TEMPLATE_STORE_MAGIC: bytes = b'ODTPLSTR'
+_TEMPLATE_STORE_ALIGN: int = 64
+_SOURCE_FILE_NAME_LIST: list[str] = [TEMPLATE_RAW_FILE_NAME, TEMPLATE_MASK_FILE_NAME]
+_CURRENT_FILE_SUFFIX: str = '.current'
+
+
+def get_template_store_path() -> str:
+    """
+    模板存储文件的默认路径 实际的数据文件由它的指针文件指定
+    :return:
+    """
+    return os.path.join(os_utils.get_path_under_work_dir('.cache', 'template'), 'template_store.bin')
+
+
+def get_template_source_signature(sub_dir: str, template_id: str) -> list[list[int] | None]:
+    """
+    模板来源文件的签名 每个文件为 [修改时间(纳秒), 大小] 不存在时为None
+    :param sub_dir: 模板分类
+    :param template_id: 模板id
+    :return:
+    """
+    template_dir = get_template_dir_path(sub_dir, template_id)
+    signature: list[list[int] | None] = []
+    for file_name in _SOURCE_FILE_NAME_LIST:
+        try:
+            stat = os.stat(os.path.join(template_dir, file_name))
+            signature.append([stat.st_mtime_ns, stat.st_size])
+        except OSError:
+            signature.append(None)
+    return signature
+
+
+@dataclass
+class TemplateStoreEntry:
+    """存储中的一个模板 数组都是内存映射上的视图"""
+
+    sub_dir: str
+    template_id: str
+    array_map: dict[str, np.ndarray] = field(default_factory=dict)
+
+    @property
+    def raw(self) -> np.ndarray | None:
+        return self.array_map.get('raw')
+
+    @property
+    def gray(self) -> np.ndarray | None:
+        return self.array_map.get('gray')
+
+    @property
+    def mask(self) -> np.ndarray | None:
+        return self.array_map.get('mask')
+
+    @property
+    def hsv(self) -> np.ndarray | None:
+        return self.array_map.get('hsv')
+
+    @property
+    def features(self) -> tuple[list[cv2.KeyPoint], np.ndarray] | None:
+        """
+        特征点和描述子 构建时没有计算特征的话返回None
+        """
+        kps_arr = self.array_map.get('kps')
+        if kps_arr is None:
+            return None
+        kps = [
+            cv2.KeyPoint(float(i[0]), float(i[1]), float(i[2]), float(i[3]), float(i[4]), int(i[5]), int(i[6]))
+            for i in kps_arr
+        ]
+        return kps, self.array_map.get('desc')
+
+
+class TemplateStore:
+
+    def __init__(self, file_path: str | None = None):
+        """
+        模板的预计算存储
+        :param file_path: 存储文件路径 默认放在工作目录的 .cache/template 下
+            实际的数据文件为 ``<文件名>.<序号><后缀>`` 由 ``<file_path>.current`` 指定
+        """
+        self.file_path: str = get_template_store_path() if file_path is None else file_path
+        self.current_file_path: str = self.file_path + _CURRENT_FILE_SUFFIX
+
+        self._lock = threading.Lock()
+        self._mmap: np.memmap | None = None
+        self._index: dict[str, dict] = {}
+        self._data_offset: int = 0
+
+    @staticmethod
+    def get_key(sub_dir: str, template_id: str) -> str:
+        return f'{sub_dir}:{template_id}'
+
+    @property
+    def loaded(self) -> bool:
+        return self._mmap is not None
+
+    def _get_data_file_path(self, generation: int) -> str:
+        """
+        某次构建的数据文件路径
+        :param generation: 构建序号
+        :return:
+        """
+        stem, ext = os.path.splitext(self.file_path)
+        return f'{stem}.{generation}{ext}'
+
+    def get_current_data_file_path(self) -> str | None:
+        """
+        指针文件指向的数据文件路径
+        :return: 还没有构建过时返回None
+        """
+        try:
+            with open(self.current_file_path, encoding='utf-8') as file:
+                file_name = file.read().strip()
+        except OSError:
+            return None
+        if len(file_name) == 0:
+            return None
+        return os.path.join(os.path.dirname(self.file_path), file_name)
+
+    def load(self) -> bool:
+        """
+        内存映射存储文件 文件不存在或版本不一致时返回False
+        :return: 是否加载成功
+        """
+        self.close()
+        data_file_path = self.get_current_data_file_path()
+        if data_file_path is None or not os.path.exists(data_file_path):
+            return False
+
+        try:
+            with open(data_file_path, 'rb') as file:
+                head = file.read(len(_TEMPLATE_STORE_MAGIC) + 12)
+                if len(head) < len(_TEMPLATE_STORE_MAGIC) + 12 or not head.startswith(_TEMPLATE_STORE_MAGIC):
+                    log.warning(f'模板存储文件格式错误 {data_file_path}')
+                    return False
+                version, index_len = struct.unpack('<IQ', head[len(_TEMPLATE_STORE_MAGIC):])
+                if version != TEMPLATE_STORE_VERSION:
+                    log.info(f'模板存储文件版本不一致 {version} != {TEMPLATE_STORE_VERSION}')
+                    return False
+                index = json.loads(file.read(index_len).decode('utf-8'))
+
+            index_end = len(_TEMPLATE_STORE_MAGIC) + 12 + index_len
+            # copy-on-write 调用方修改数组不会影响文件
+            mm = np.memmap(data_file_path, dtype=np.uint8, mode='c')
+        except Exception:
+            log.error(f'模板存储文件加载失败 {data_file_path}', exc_info=True)
+            return False
+
+        with self._lock:
+            self._mmap = mm
+            self._index = index
+            self._data_offset = _align(index_end)
+
+        log.debug(f'加载模板存储 {len(index)} 个模板')
+        return True
+
+    def close(self) -> None:
+        """
+        不再使用内存映射 已经取出的数组仍然引用着映射 释放后文件才会真正解除映射
+        :return:
+        """
+        with self._lock:
+            self._mmap = None
+            self._index = {}
+            self._data_offset = 0
+
+    def get_entry(self, sub_dir: str, template_id: str) -> TemplateStoreEntry | None:
+        """
+        获取一个模板 来源文件有变化时返回None
+        :param sub_dir: 模板分类
+        :param template_id: 模板id
+        :return:
+        """
+        with self._lock:
+            mm = self._mmap
+            item = self._index.get(self.get_key(sub_dir, template_id))
+            data_offset = self._data_offset
+        if mm is None or item is None:
+            return None
+
+        if item['signature'] != get_template_source_signature(sub_dir, template_id):
+            return None
+
+        entry = TemplateStoreEntry(sub_dir=sub_dir, template_id=template_id)
+        for name, (offset, shape, dtype) in item['arrays'].items():
+            # 内存映射上的视图 不复制数据
+            entry.array_map[name] = np.ndarray(
+                shape=tuple(shape),
+                dtype=np.dtype(dtype),
+                buffer=mm,
+                offset=data_offset + offset,
+            )
+
+        return entry
+
+    def build(self, with_features: bool = False) -> int:
+        """
+        从硬盘读取所有模板 重新生成存储文件
+        :param with_features: 是否计算特征点 计算较慢 只有特征匹配的模板需要
+        :return: 写入的模板数量
+        """
+        # 延迟导入 避免循环依赖
+        from one_dragon.base.screen.template_loader import TemplateLoader
+
+        loader = TemplateLoader(use_store=False)
+        index: dict[str, dict] = {}
+        chunk_list: list[bytes] = []
+        total_len: int = 0
+
+        for template in loader.get_all_template_info_from_disk(need_raw=False):
+            array_map: dict[str, np.ndarray] = {}
+            if template.raw is not None:
+                array_map['raw'] = template.raw
+                if template.raw.ndim == 3 and template.raw.shape[2] == 3:
+                    array_map['gray'] = template.gray
+                    array_map['hsv'] = cv2.cvtColor(template.raw, cv2.COLOR_RGB2HSV)
+            if template.mask is not None:
+                array_map['mask'] = template.mask
+            if with_features and template.raw is not None:
+                kps, desc = template.features
+                if desc is not None:
+                    array_map['kps'] = np.array(
+                        [[k.pt[0], k.pt[1], k.size, k.angle, k.response, k.octave, k.class_id] for k in kps],
+                        dtype=np.float32,
+                    ).reshape((-1, 7))
+                    array_map['desc'] = desc
+
+            array_info: dict[str, list] = {}
+            for name, arr in array_map.items():
+                arr = np.ascontiguousarray(arr)
+                data = arr.tobytes()
+                array_info[name] = [total_len, list(arr.shape), arr.dtype.str]
+                padding = _align(len(data)) - len(data)
+                chunk_list.append(data)
+                if padding > 0:
+                    chunk_list.append(b'\0' * padding)
+                total_len += len(data) + padding
+
+            index[self.get_key(template.sub_dir, template.template_id)] = {
+                'signature': get_template_source_signature(template.sub_dir, template.template_id),
+                'arrays': array_info,
+            }
+
+        index_bytes = json.dumps(index, ensure_ascii=False).encode('utf-8')
+        head = _TEMPLATE_STORE_MAGIC + struct.pack('<IQ', TEMPLATE_STORE_VERSION, len(index_bytes))
+        index_end = len(head) + len(index_bytes)
+
+        # 写入新的数据文件 不覆盖可能仍被内存映射的旧文件
+        os.makedirs(os.path.dirname(self.file_path), exist_ok=True)
+        data_file_path = self._get_data_file_path(time.time_ns())
+        temp_path = data_file_path + '.tmp'
+        with open(temp_path, 'wb') as file:
+            file.write(head)
+            file.write(index_bytes)
+            file.write(b'\0' * (_align(index_end) - index_end))
+            for chunk in chunk_list:
+                file.write(chunk)
+        os.replace(temp_path, data_file_path)
+
+        # 指针文件不会被内存映射 替换后马上切换到新的数据文件
+        temp_path = self.current_file_path + '.tmp'
+        with open(temp_path, 'w', encoding='utf-8') as file:
+            file.write(os.path.basename(data_file_path))
+        os.replace(temp_path, self.current_file_path)
+
+        self.close()
+        self._remove_stale_data_files(data_file_path)
+
+        log.info(f'模板存储构建完成 {len(index)} 个模板 {data_file_path}')
+        return len(index)
+
+    def _remove_stale_data_files(self, current_path: str) -> None:
+        """
+        尝试删除旧的数据文件 仍被内存映射的文件会删除失败 留到下次构建时再清理
+        :param current_path: 当前使用的数据文件
+        :return:
+        """
+        dir_path = os.path.dirname(self.file_path)
+        stem, ext = os.path.splitext(os.path.basename(self.file_path))
+        for file_name in os.listdir(dir_path):
+            file_path = os.path.join(dir_path, file_name)
+            if file_path == current_path:
+                continue
+            if not (file_name.startswith(stem + '.') and file_name.endswith(ext)):
+                continue
+            try:
+                os.remove(file_path)
+            except OSError:
+                log.debug(f'旧的模板存储文件仍在使用 暂不删除 {file_path}')
+
+
+def _align(size: int) -> int:
+    return (size + _TEMPLATE_STORE_ALIGN - 1) // _TEMPLATE_STORE_ALIGN * _TEMPLATE_STORE_ALIGN
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description='构建模板的预计算存储')
+    parser.add_argument('--features', action='store_true', help='同时计算特征点')
+    parser.add_argument('--output', type=str, default=None, help='存储文件路径')
+    args = parser.parse_args()
+
+    store = TemplateStore(args.output)
+    store.build(with_features=args.features)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,283 @@
+"""画面和模板yml的二进制元数据缓存。
+
+画面配置和模板的 config.yml 数量很多 每次启动都用YAML解析比较慢。
+这里把解析结果用 marshal 序列化后存放在一个二进制文件中 (不使用pickle 只包含基础类型)
+下次启动时直接反序列化。
+
+每个来源文件记录 [修改时间(纳秒), 大小, 内容哈希]
+- 修改时间和大小一致时 直接使用缓存;
+- 不一致时计算内容哈希 哈希一致 (例如重新检出代码) 时仍使用缓存 只更新修改时间;
+- 哈希也不一致时 重新解析YAML 并在之后写回缓存文件。
+
+文件格式
+- 8字节 魔数
+- 4字节 版本号 (little-endian uint32)
+- 2+2字节 生成缓存的Python主次版本号 marshal格式与Python版本相关
+- 8字节 索引长度 (little-endian uint64)
+- 索引 (marshal) 来源路径 -> (修改时间, 大小, 哈希, 数据偏移, 数据长度)
+- 各文件解析结果 (marshal)
+"""
+import atexit
+import hashlib
+import marshal
+import os
+import struct
+import sys
+import threading
+from dataclasses import dataclass
+from typing import Any
+
+from one_dragon.utils import os_utils, yaml_utils
+from one_dragon.utils.log_utils import log
+
+YAML_METADATA_CACHE_VERSION: int = 1
+_YAML_METADATA_CACHE_MAGIC: bytes = b'ODYMLMTA'
+_HEAD_FORMAT: str = '<IHHQ'
+_HEAD_LEN: int = len(_YAML_METADATA_CACHE_MAGIC) + struct.calcsize(_HEAD_FORMAT)
+
+
+def get_yaml_metadata_cache_path(name: str) -> str:
+    """
+    缓存文件的默认路径
+    :param name: 缓存名称
+    :return:
+    """
+    return os.path.join(os_utils.get_path_under_work_dir('.cache', 'yaml_metadata'), f'{name}.bin')
+
+
+def _hash_content(content: bytes) -> bytes:
+    return hashlib.blake2b(content, digest_size=16).digest()
+
+
+@dataclass
+class _CacheEntry:
+    """一个来源文件的缓存"""
+
+    mtime_ns: int
+    size: int
+    digest: bytes  # 文件内容的哈希
+    payload: bytes  # 解析结果的 marshal 数据
+
+
+class YamlMetadataCache:
+
+    def __init__(self, name: str, file_path: str | None = None):
+        """
+        yml解析结果的二进制缓存
+        :param name: 缓存名称 用于默认的文件名
+        :param file_path: 缓存文件路径 默认放在工作目录的 .cache/yaml_metadata 下
+        """
+        self.name: str = name
+        self.file_path: str = get_yaml_metadata_cache_path(name) if file_path is None else file_path
+
+        self._lock = threading.Lock()
+        self._entry_map: dict[str, _CacheEntry] = {}
+        self._dirty: bool = False  # 是否有变化需要写回
+
+        # 统计
+        self.hit_cnt: int = 0
+        self.parse_cnt: int = 0
+
+    def load(self) -> bool:
+        """
+        读取缓存文件 文件不存在或版本不一致时返回False
+        :return: 是否加载成功
+        """
+        with self._lock:
+            self._entry_map = {}
+            self._dirty = False
+
+        if not os.path.exists(self.file_path):
+            return False
+
+        try:
+            with open(self.file_path, 'rb') as file:
+                content = file.read()
+            if len(content) < _HEAD_LEN or not content.startswith(_YAML_METADATA_CACHE_MAGIC):
+                log.warning(f'yml缓存文件格式错误 {self.file_path}')
+                return False
+            version, py_major, py_minor, index_len = struct.unpack(
+                _HEAD_FORMAT, content[len(_YAML_METADATA_CACHE_MAGIC):_HEAD_LEN]
+            )
+            if version != YAML_METADATA_CACHE_VERSION or (py_major, py_minor) != sys.version_info[:2]:
+                log.info(f'yml缓存文件版本不一致 将重新生成 {self.file_path}')
+                return False
+
+            index = marshal.loads(content[_HEAD_LEN:_HEAD_LEN + index_len])
+            data_offset = _HEAD_LEN + index_len
+            entry_map: dict[str, _CacheEntry] = {}
+            for source_path, (mtime_ns, size, digest, offset, length) in index.items():
+                begin = data_offset + offset
+                entry_map[source_path] = _CacheEntry(
+                    mtime_ns=mtime_ns,
+                    size=size,
+                    digest=digest,
+                    payload=content[begin:begin + length],
+                )
+        except Exception:
+            log.error(f'yml缓存文件加载失败 {self.file_path}', exc_info=True)
+            return False
+
+        with self._lock:
+            self._entry_map = entry_map
+
+        log.debug(f'加载yml缓存 {self.name} {len(entry_map)} 个文件')
+        return True
+
+    def get(self, file_path: str) -> Any:
+        """
+        获取yml文件的解析结果 每次返回新的对象 调用方可以修改
+        :param file_path: yml文件路径
+        :return: 解析结果
+        """
+        key = os.path.abspath(file_path)
+        stat = os.stat(key)
+        with self._lock:
+            entry = self._entry_map.get(key)
+
+        if entry is not None and entry.mtime_ns == stat.st_mtime_ns and entry.size == stat.st_size:
+            self.hit_cnt += 1
+            return marshal.loads(entry.payload)
+
+        with open(key, 'rb') as file:
+            content = file.read()
+        digest = _hash_content(content)
+
+        if entry is not None and entry.digest == digest:
+            # 内容没变 只是修改时间变了
+            with self._lock:
+                self._entry_map[key] = _CacheEntry(stat.st_mtime_ns, stat.st_size, digest, entry.payload)
+                self._dirty = True
+            self.hit_cnt += 1
+            return marshal.loads(entry.payload)
+
+        log.debug(f"加载yaml: {file_path}")
+        data = yaml_utils.safe_load(content)
+        self.parse_cnt += 1
+        try:
+            payload = marshal.dumps(data)
+        except ValueError:
+            # 含有无法序列化的类型 不缓存
+            return data
+
+        with self._lock:
+            self._entry_map[key] = _CacheEntry(stat.st_mtime_ns, stat.st_size, digest, payload)
+            self._dirty = True
+        return data
+
+    def save(self, force: bool = False) -> bool:
+        """
+        有变化时写回缓存文件 来源文件已经不存在的记录会被删除
+        :param force: 没有变化时也写入
+        :return: 是否写入了文件
+        """
+        with self._lock:
+            if not self._dirty and not force:
+                return False
+            entry_map = {k: v for k, v in self._entry_map.items() if os.path.exists(k)}
+            self._entry_map = entry_map
+            self._dirty = False
+
+        index: dict[str, tuple] = {}
+        payload_list: list[bytes] = []
+        total_len: int = 0
+        for source_path, entry in entry_map.items():
+            index[source_path] = (entry.mtime_ns, entry.size, entry.digest, total_len, len(entry.payload))
+            payload_list.append(entry.payload)
+            total_len += len(entry.payload)
+
+        index_bytes = marshal.dumps(index)
+        head = _YAML_METADATA_CACHE_MAGIC + struct.pack(
+            _HEAD_FORMAT, YAML_METADATA_CACHE_VERSION, sys.version_info[0], sys.version_info[1], len(index_bytes)
+        )
+
+        # 先写临时文件再替换 避免读到一半的文件
+        temp_path = self.file_path + '.tmp'
+        try:
+            with open(temp_path, 'wb') as file:
+                file.write(head)
+                file.write(index_bytes)
+                for payload in payload_list:
+                    file.write(payload)
+            os.replace(temp_path, self.file_path)
+        except OSError:
+            log.warning(f'yml缓存文件写入失败 {self.file_path}', exc_info=True)
+            return False
+
+        log.debug(f'写入yml缓存 {self.name} {len(index)} 个文件')
+        return True
+
+    def clear(self) -> None:
+        """
+        清空内存中的缓存 下次保存时整个文件重新生成
+        """
+        with self._lock:
+            self._entry_map = {}
+            self._dirty = True
+
+
+_screen_cache: YamlMetadataCache | None = None
+_template_cache: YamlMetadataCache | None = None
+_global_lock = threading.Lock()
+
+
+def get_screen_metadata_cache() -> YamlMetadataCache:
+    """
+    画面配置的缓存 首次获取时加载缓存文件
+    :return:
+    """
+    global _screen_cache
+    with _global_lock:
+        if _screen_cache is None:
+            _screen_cache = YamlMetadataCache('screen_info')
+            _screen_cache.load()
+            # 按需加载的文件较多 退出时统一写回
+            atexit.register(_screen_cache.save)
+        return _screen_cache
+
+
+def get_template_metadata_cache() -> YamlMetadataCache:
+    """
+    模板配置的缓存 首次获取时加载缓存文件
+    :return:
+    """
+    global _template_cache
+    with _global_lock:
+        if _template_cache is None:
+            _template_cache = YamlMetadataCache('template_config')
+            _template_cache.load()
+            # 按需加载的文件较多 退出时统一写回
+            atexit.register(_template_cache.save)
+        return _template_cache
+
+
+def build_all() -> None:
+    """
+    重新生成画面和模板配置的缓存
+    """
+    from one_dragon.base.screen.screen_loader import ScreenContext
+    from one_dragon.base.screen.template_loader import TemplateLoader
+
+    screen_cache = get_screen_metadata_cache()
+    screen_cache.clear()
+    ScreenContext().reload()
+    screen_cache.save(force=True)
+    log.info(f'画面配置缓存构建完成 {screen_cache.file_path}')
+
+    template_cache = get_template_metadata_cache()
+    template_cache.clear()
+    template_cnt = len(TemplateLoader(use_store=False).get_all_template_info_from_disk(need_raw=False))
+    template_cache.save(force=True)
+    log.info(f'模板配置缓存构建完成 {template_cnt} 个模板 {template_cache.file_path}')
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description='预先生成画面和模板配置的yml缓存')
+    parser.parse_args()
+    build_all()
+
+
+if __name__ == '__main__':
+    main()
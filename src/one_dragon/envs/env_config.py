@@ -364,6 +364,17 @@ class EnvConfig(YamlConfig):
     def screenshot_method(self, new_value: str) -> None:
         self.update('screenshot_method', new_value)
 
+    @property
+    def background_screenshot(self) -> bool:
+        """
+        运行时是否在独立线程中持续截图
+        """
+        return self.get('background_screenshot', False)
+
+    @background_screenshot.setter
+    def background_screenshot(self, new_value: bool) -> None:
+        self.update('background_screenshot', new_value)
+
     @property
     def key_start_running(self) -> str:
         """
@@ -209,7 +209,21 @@ def match_template(source: MatLike, template: MatLike, threshold,
     # show_image(template, win_name='template')
     # show_image(mask, win_name='mask', wait=1)
     result = cv2.matchTemplate(source, template, cv2.TM_CCOEFF_NORMED, mask=mask)
+    return get_match_result_list(result, threshold, tx, ty, only_best=only_best, ignore_inf=ignore_inf)
 
+
+def get_match_result_list(result: np.ndarray, threshold, tx: int, ty: int,
+                          only_best: bool = True, ignore_inf: bool = False) -> MatchResultList:
+    """
+    从模板匹配的分数图中 提取达到阈值的匹配结果
+    :param result: cv2.matchTemplate 的结果
+    :param threshold: 阈值
+    :param tx: 模板宽度
+    :param ty: 模板高度
+    :param only_best: 只返回最好的结果
+    :param ignore_inf: 是否忽略无限大的结果
+    :return: 所有匹配结果
+    """
     match_result_list = MatchResultList(only_best=only_best)
     filtered_locations = np.where(np.logical_and(
         result >= threshold,
@@ -987,7 +1001,8 @@ def filter_by_color(
     lower_rgb: Optional[Union[List[int], Tuple[int, int, int], np.ndarray]] = None,
     upper_rgb: Optional[Union[List[int], Tuple[int, int, int], np.ndarray]] = None,
     hsv_color: Optional[Union[List[int], Tuple[int, int, int], np.ndarray]] = None,
-    hsv_diff: Optional[Union[List[int], Tuple[int, int, int], np.ndarray]] = None
+    hsv_diff: Optional[Union[List[int], Tuple[int, int, int], np.ndarray]] = None,
+    hsv_image: MatLike | None = None,
 ) -> MatLike:
     """
     根据指定的模式和颜色范围，对图像进行颜色过滤。
@@ -998,13 +1013,15 @@ def filter_by_color(
     :param upper_rgb:   RGB上限
     :param hsv_color:   HSV基准颜色
     :param hsv_diff:    HSV颜色容差
+    :param hsv_image:   已经转换好的HSV图像 传入时不再重复转换
     :return:            二值化的 mask 图像。白色为符合条件，黑色为不符合。
     """
     if mode == 'hsv':
         if hsv_color is None or hsv_diff is None:
             return np.full((image.shape[0], image.shape[1]), 0, dtype=np.uint8)
 
-        hsv_image = cv2.cvtColor(image, cv2.COLOR_RGB2HSV)
+        if hsv_image is None:
+            hsv_image = cv2.cvtColor(image, cv2.COLOR_RGB2HSV)
 
         _hsv_color = np.array(hsv_color, dtype=np.int32)
         _hsv_diff = np.array(hsv_diff, dtype=np.int32)
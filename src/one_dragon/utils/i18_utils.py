@@ -5,6 +5,8 @@ import os
 from one_dragon.utils import os_utils
 
 _gt = {}
+_gt_cache: dict[tuple[str, str, str], str] = {}  # (原文, 模块, 语言) -> 译文 OCR匹配时同一个目标会被反复翻译
+_GT_CACHE_MAX_SIZE: int = 8192  # 有些文本是动态拼接的 超过数量时整个清空
 _default_lang = 'zh'
 
 
@@ -51,13 +53,22 @@ def gt(msg: str | None, model: str = 'ui', lang: str | None = None) -> str:
         return ''
     if lang is None:
         lang = _default_lang
+    key = (msg, model, lang)
+    result = _gt_cache.get(key)
+    if result is not None:
+        return result
+
     if model not in _gt:
         _gt[model] = {}
     if lang not in _gt[model]:
         _gt[model][lang] = get_translations(model, lang)
 
     trans = _gt[model][lang]
-    return trans.gettext(msg) if trans is not None else msg
+    result = trans.gettext(msg) if trans is not None else msg
+    if len(_gt_cache) >= _GT_CACHE_MAX_SIZE:
+        _gt_cache.clear()
+    _gt_cache[key] = result
+    return result
 
 
 def coalesce_gt(msg: str | None, default: str, model: str = 'ui', lang: str | None = None) -> str:
@@ -1,3 +1,4 @@
+import threading
 from functools import lru_cache
 
 import cv2
@@ -56,6 +57,29 @@ def generate_polar_remap_maps(
     return mx, my
 
 
+@lru_cache
+def generate_ring_remap_maps(
+        d: int,
+        angle_resolution: int = 360,
+        radius_range: tuple[float, float] = (0.1, 0.6),
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    只包含半径范围内的行的坐标映射表
+    cv2.remap 逐个像素独立计算 先裁剪映射表再展开 和展开后再裁剪的结果一致 但只需要计算用到的部分
+
+    Args:
+        d: 原始正方形图像的边长。
+        angle_resolution: 角度映射到横坐标的长度
+        radius_range: 计算采用的半径范围
+
+    Returns:
+        mx, my: 用于 cv2.remap 的x, y坐标映射表。
+    """
+    mx, my = generate_polar_remap_maps(d, angle_resolution=angle_resolution)
+    row_slice = slice(int(d * radius_range[0]), int(d * radius_range[1]))
+    return np.ascontiguousarray(mx[row_slice]), np.ascontiguousarray(my[row_slice])
+
+
 def create_angular_histogram_from_peaks(
     gradient_signal: np.ndarray,
     angular_resolution: int,
@@ -148,28 +172,40 @@ def peak_confidence(arr: np.ndarray) -> float:
     return confidence
 
 
-def convolve(arr: np.ndarray, kernel: int = 3) -> np.ndarray:
+@lru_cache
+def generate_triangle_kernel(kernel: int) -> np.ndarray:
     """
-    使用 SciPy 高效实现带三角核的周期性卷积，用于平滑数组。
+    生成三角核 (Triangular Kernel) 返回的数组只读
 
     Args:
-        arr (np.ndarray): 输入的一维数组。
         kernel (int): 决定三角核宽度和锐度的参数。核的总宽度为 2*kernel - 1。
 
     Returns:
-        np.ndarray: 卷积后的平滑数组。
+        np.ndarray: 三角核
     """
-    # 1. 生成三角核 (Triangular Kernel)
-    #    核的范围从 -kernel+1 到 kernel-1，总长度为 2*kernel - 1
+    # 核的范围从 -kernel+1 到 kernel-1，总长度为 2*kernel - 1
     kernel_range = np.arange(-kernel + 1, kernel)
 
-    #    根据公式 (kernel - abs(i)) / kernel 计算权重。
+    # 根据公式 (kernel - abs(i)) / kernel 计算权重。
     triangle_kernel = (kernel - np.abs(kernel_range)) / float(kernel)
+    triangle_kernel.flags.writeable = False
+    return triangle_kernel
+
+
+def convolve(arr: np.ndarray, kernel: int = 3) -> np.ndarray:
+    """
+    使用带三角核的卷积，用于平滑数组。
+
+    Args:
+        arr (np.ndarray): 输入的一维数组。
+        kernel (int): 决定三角核宽度和锐度的参数。核的总宽度为 2*kernel - 1。
 
-    # 2. 使用 SciPy 的 convolve 函数进行高效卷积
-    #    mode='same' 确保输出与输入大小相同。
-    #    method='fft' 利用快速傅里叶变换，对周期性数据处理得又快又好。
-    return signal.convolve(arr, triangle_kernel, mode='same', method='fft')
+    Returns:
+        np.ndarray: 卷积后的平滑数组。
+    """
+    # 核的长度是奇数 mode='same' 确保输出与输入大小相同 且和 scipy 的 'same' 对齐方式一致
+    # 核很短 (十几个点) 直接卷积比FFT快 也没有FFT的舍入误差
+    return np.convolve(arr, generate_triangle_kernel(kernel), mode='same')
 
 
 def normalize_angle(angle: float) -> float:
@@ -180,6 +216,236 @@ def normalize_angle(angle: float) -> float:
         angle += 360
     return angle
 
+class MiniMapAngleEstimator:
+
+    def __init__(
+            self,
+            scale: int = 1,
+            angle_resolution: int = 360,
+            radius_range: tuple[float, float] = (0.1, 0.6),
+            view_angle: int = 90,
+    ):
+        """
+        小地图朝向角度的计算器 参数固定后可以反复使用
+        - 极坐标映射表按小地图直径缓存 只展开半径范围内的部分;
+        - 中间结果使用每个线程自己的缓冲区 不需要每次分配;
+        - 左边界和各个偏移的右边界模板的乘积 通过预先计算的下标一次得到 不需要逐个 np.roll。
+
+        Args:
+            scale: 图像的缩放因子，放大可用于提高检测精度
+            angle_resolution: 角度分辨率，中心圆形展开时的宽度，值越小计算越快，误差大
+            radius_range: 计算采用的半径范围，避免中心点和边缘的干扰
+            view_angle: 视野角度 即扇形的角度 通常是90度
+        """
+        self.scale: int = scale
+        self.angle_resolution: int = angle_resolution
+        self.radius_range: tuple[float, float] = radius_range
+        self.view_angle: int = view_angle
+
+        self.width: int = angle_resolution * scale  # 展开后角度方向的长度
+        self.kernel_width: int = 2 * scale
+        self.triangle_ker_size: int = 3 * self.kernel_width
+
+        # 右边界模板各个偏移的下标 shift_index[k, i] = np.roll(arr, -shift_k)[i] 在原数组中的下标
+        # 偏移 offset 从 -kernel_width+1 到 kernel_width-1 和逐个 np.roll 的顺序一致
+        view_angle_width = int(angle_resolution * view_angle * scale / 360)
+        shift_list = [view_angle_width - offset for offset in range(-self.kernel_width + 1, self.kernel_width)]
+        self.shift_index: np.ndarray = (np.arange(self.width)[None, :] + np.array(shift_list)[:, None]) % self.width
+
+        self._local = threading.local()
+
+    def _get_buffer(self, name: str, shape: tuple[int, ...], dtype) -> np.ndarray:
+        """
+        获取当前线程的缓冲区 形状不同时重新分配
+        """
+        buffer_map: dict[str, np.ndarray] | None = getattr(self._local, 'buffer_map', None)
+        if buffer_map is None:
+            buffer_map = {}
+            self._local.buffer_map = buffer_map
+        buffer = buffer_map.get(name)
+        if buffer is None or buffer.shape != shape or buffer.dtype != dtype:
+            buffer = np.empty(shape, dtype=dtype)
+            buffer_map[name] = buffer
+        return buffer
+
+    def _detect_boundary(self, view_mask: MatLike) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """
+        坐标变换、梯度检测和峰值检测 得到左右边界的角度直方图
+
+        Returns:
+            remap, gradient, l_sig, r_sig: 后两个为左右边界 前两个为中间结果 是缓冲区 下一次计算时会被覆盖
+        """
+        d = view_mask.shape[0]  # 获取图像尺寸 即小地图的直径
+
+        # 坐标变换，将圆形区域展开为矩形 只展开半径范围内的部分，避免中心点和边缘的干扰
+        # 展开后：行代表半径，列代表角度
+        m1, m2 = generate_ring_remap_maps(d, angle_resolution=self.angle_resolution, radius_range=self.radius_range)
+        remap_u8 = self._get_buffer('remap_u8', m1.shape, view_mask.dtype)
+        cv2.remap(view_mask, m1, m2, cv2.INTER_LINEAR, dst=remap_u8)
+        remap = self._get_buffer('remap', m1.shape, np.float32)
+        np.copyto(remap, remap_u8, casting='unsafe')
+        if self.scale != 1:
+            # 根据scale参数放大图像，提高角度检测精度
+            remap = cv2.resize(remap, None, fx=self.scale, fy=self.scale, interpolation=cv2.INTER_LINEAR)
+
+        # 梯度检测，找到视野扇形的边界
+        # 使用Scharr算子计算x方向（角度方向）的梯度 扇形边界处会有强烈的梯度变化
+        gradient = self._get_buffer('gradient', remap.shape, np.float32)
+        cv2.Scharr(remap, cv2.CV_32F, 1, 0, dst=gradient)
+
+        # 峰值检测，找到扇形的左右边界
+        # 检测正梯度峰值（左边界）和负梯度峰值（右边界） 按角度统计峰值出现次数
+        # ravel() 将2D梯度图展平为1D数组 第1行第2行第3行那样拼接起来
+        gradient_signal = gradient.ravel()
+        l_hist = create_angular_histogram_from_peaks(
+            gradient_signal=gradient_signal,
+            angular_resolution=self.width
+        )
+        # 注意：通过给gradient取反，找到负梯度峰值
+        negative_signal = self._get_buffer('negative_signal', gradient_signal.shape, np.float32)
+        np.negative(gradient_signal, out=negative_signal)
+        r_hist = create_angular_histogram_from_peaks(
+            gradient_signal=negative_signal,
+            angular_resolution=self.width
+        )
+
+        # 分离左右边界：只保留左边界强于右边界的位置作为左边界，反之亦然
+        # 这样可以避免同一位置既是左边界又是右边界的情况
+        l_sig, r_sig = np.maximum(l_hist - r_hist, 0), np.maximum(r_hist - l_hist, 0)
+        return remap, gradient, l_sig, r_sig
+
+    def _match(self, l_sig: np.ndarray, r_sig: np.ndarray) -> np.ndarray:
+        """
+        卷积匹配 左边界信号*模糊后各个偏移的右边界信号 如果是左右边界匹配，则乘积结果会很大
+        支持在前面增加一个批量的维度
+
+        Returns:
+            np.ndarray: 各个偏移的乘积 shape=(..., 偏移数量, 角度)
+        """
+        # 创建用于平滑 r_sig 信号的三角核 预先卷积后 各个偏移只需要取对应的下标
+        kernel = generate_triangle_kernel(self.triangle_ker_size)
+        if r_sig.ndim == 1:
+            r_convolved = np.convolve(r_sig, kernel, mode='same')
+        else:
+            r_convolved = np.stack([np.convolve(i, kernel, mode='same') for i in r_sig])
+
+        conv0 = l_sig[..., None, :] * r_convolved[..., self.shift_index]
+        # 确保所有值都大于等于1，避免后续计算出现问题
+        np.maximum(conv0, 1, out=conv0)
+        return conv0
+
+    def _evaluate(self, conv0: np.ndarray) -> tuple[float | None, np.ndarray, float, int | None]:
+        """
+        结果处理和置信度评估 并将匹配点转换为角度
+
+        Returns:
+            角度, 最终响应, 置信度, 最大响应位置
+        """
+        # 取所有偏移结果的最大值，得到最强的响应
+        maximum = np.max(conv0, axis=0)
+        # 计算检测置信度
+        rotation_confidence = round(peak_confidence(maximum), 3)
+
+        if rotation_confidence > 0:
+            result = maximum
+        else:
+            # 进行额外的平滑处理以减少噪声
+            average = np.mean(conv0, axis=0)  # 计算平均值
+            minimum = np.min(conv0, axis=0)   # 计算最小值
+
+            # 组合最大值、平均值和最小值，然后进行卷积平滑
+            # 这种组合可以增强真实信号，抑制噪声
+            result = convolve(maximum * average * minimum, 2 * self.scale)
+            rotation_confidence = round(peak_confidence(maximum), 3)
+
+        if rotation_confidence <= 0:
+            # 放弃当前结果
+            return None, result, rotation_confidence, None
+
+        # 找到响应最强的位置（角度索引）
+        max_index = int(np.argmax(result))
+        # 将索引转换为标准极坐标角度：[0,360)
+        # 由右边界计算中心的坐标
+        degree = (max_index * 360.0 / self.width) + (self.view_angle / 2.0)
+        # 确保角度在[0, 360)范围内
+        return normalize_angle(degree), result, rotation_confidence, max_index
+
+    def calculate(self, view_mask: MatLike, debug_steps: bool = False) -> tuple[float | None, dict | None]:
+        """
+        计算小地图上角色的朝向角度 算法见 calculate
+
+        Args:
+            view_mask: 小地图图像，处理为视野遮罩的mask，应为正方形
+            debug_steps: 是否保存调试步骤结果
+
+        Returns:
+            tuple: (角度, 步骤结果字典)
+        """
+        remap, gradient, l_sig, r_sig = self._detect_boundary(view_mask)
+        conv0 = self._match(l_sig, r_sig)
+        degree, result, rotation_confidence, max_index = self._evaluate(conv0)
+
+        # 存储每个步骤的结果
+        if debug_steps:
+            steps = {
+                'original': view_mask,
+                'polar_transform': remap.copy(),
+                'gradient': gradient.copy(),
+                'left_boundary': l_sig,
+                'right_boundary': r_sig,
+                'convolution_results': conv0,
+                'final_result': result,
+                'confidence': rotation_confidence,
+                'max_index': max_index,
+                'view_angle': degree
+            }
+        else:
+            steps = None
+
+        return degree, steps
+
+    def calculate_batch(self, view_mask_list: list[MatLike]) -> list[float | None]:
+        """
+        批量计算多帧小地图的朝向角度 卷积匹配部分一次完成
+
+        Args:
+            view_mask_list: 小地图视野遮罩的列表
+
+        Returns:
+            list[float | None]: 每帧的角度 无法判断时为None
+        """
+        if len(view_mask_list) == 0:
+            return []
+
+        l_list: list[np.ndarray] = []
+        r_list: list[np.ndarray] = []
+        for view_mask in view_mask_list:
+            _, _, l_sig, r_sig = self._detect_boundary(view_mask)
+            l_list.append(l_sig)
+            r_list.append(r_sig)
+
+        conv0_batch = self._match(np.stack(l_list), np.stack(r_list))
+        return [self._evaluate(conv0)[0] for conv0 in conv0_batch]
+
+
+@lru_cache
+def get_estimator(
+        scale: int = 1,
+        angle_resolution: int = 360,
+        radius_range: tuple[float, float] = (0.1, 0.6),
+        view_angle: int = 90,
+) -> MiniMapAngleEstimator:
+    """
+    获取共用的角度计算器 相同参数只创建一次
+    """
+    return MiniMapAngleEstimator(
+        scale=scale,
+        angle_resolution=angle_resolution,
+        radius_range=radius_range,
+        view_angle=view_angle,
+    )
+
+
 def calculate(
         view_mask: MatLike,
         scale: int = 1,
@@ -212,8 +478,6 @@ def calculate(
             - 角度: float, 角色朝向角度（度），标准极坐标系：0度为正右方向，逆时针增加
             - 步骤结果字典: dict, 包含每个处理步骤的中间结果
                 - 'original': 原始小地图图像
-                - 'yuv_v_channel': YUV色彩空间的V通道
-                - 'inverted': 反转亮度后的图像
                 - 'polar_transform': 极坐标变换后的图像
                 - 'gradient': 梯度检测结果
                 - 'left_boundary': 左边界检测结果
@@ -224,108 +488,13 @@ def calculate(
                 - 'view_angle': 检测到的角度
                 - 'max_index': 最大响应位置索引
     """
-    d = view_mask.shape[0]  # 获取图像尺寸 即小地图的直径
-
-    # 第二步：坐标变换，将圆形区域展开为矩形
-    # 获取极坐标到直角坐标的映射矩阵
-    m1, m2 = generate_polar_remap_maps(d, angle_resolution=angle_resolution)
-
-    # 使用remap将圆形图像按角度展开为矩形
-    # 展开后：行代表半径，列代表角度 remap.shape=(d, angle_resolution)
-    remap = cv2.remap(view_mask, m1, m2, cv2.INTER_LINEAR)
-    # 只取中间部分，避免中心点和边缘的干扰
-    remap = remap[int(d * radius_range[0]):int(d * radius_range[1])].astype(np.float32)
-    # 根据scale参数放大图像，提高角度检测精度
-    remap = cv2.resize(remap, None, fx=scale, fy=scale, interpolation=cv2.INTER_LINEAR)
-
-    # 第三步：梯度检测，找到视野扇形的边界
-    # 使用Scharr算子计算x方向（角度方向）的梯度 扇形边界处会有强烈的梯度变化
-    gradient = cv2.Scharr(remap, cv2.CV_32F, 1, 0)
-
-    # 第四步：峰值检测，找到扇形的左右边界
-    # 检测正梯度峰值（左边界）和负梯度峰值（右边界） 按角度统计峰值出现次数
-    # ravel() 将2D梯度图展平为1D数组 第1行第2行第3行那样拼接起来
-    l_hist = create_angular_histogram_from_peaks(
-        gradient_signal=gradient.ravel(),
-        angular_resolution=angle_resolution * scale
+    estimator = get_estimator(
+        scale=scale,
+        angle_resolution=angle_resolution,
+        radius_range=tuple(radius_range),
+        view_angle=view_angle,
     )
-    # 注意：通过给gradient取反，找到负梯度峰值
-    r_hist = create_angular_histogram_from_peaks(
-        gradient_signal=-gradient.ravel(),
-        angular_resolution=angle_resolution * scale
-    )
-
-    # 分离左右边界：只保留左边界强于右边界的位置作为左边界，反之亦然
-    # 这样可以避免同一位置既是左边界又是右边界的情况
-    l, r = np.maximum(l_hist - r_hist, 0), np.maximum(r_hist - l_hist, 0)
-
-    # 第五步：卷积匹配，寻找最佳的扇形角度
-    # 1. 创建用于平滑 r 信号的三角核
-    kernel_width = 2 * scale
-    triangle_ker_size = 3 * kernel_width
-    r_convolved = convolve(r, triangle_ker_size)
-
-    # 3. 在循环中，仅对预先计算好的卷积结果进行高效移位
-    conv0 = []
-    view_angle_width = int(angle_resolution * view_angle * scale / 360)
-    for offset in range(-kernel_width + 1, kernel_width):
-        # 使用 np.roll 对预卷积的数组进行高效的周期性移位
-        blurred_r_template = np.roll(r_convolved, shift=-view_angle_width + offset)
-        # 左边界信号*模糊的右边界信号 如果是左右边界匹配，则乘积结果会很大 方便后续评估
-        conv0.append(l * blurred_r_template)
-
-    # 第六步：结果处理和置信度评估
-    # 确保所有值都大于等于1，避免后续计算出现问题
-    conv0 = np.maximum(conv0, 1)
-    # 取所有偏移结果的最大值，得到最强的响应
-    maximum = np.max(conv0, axis=0)
-    # 计算检测置信度
-    rotation_confidence = round(peak_confidence(maximum), 3)
-
-    if rotation_confidence > 0:
-        result = maximum
-    else:
-        # 进行额外的平滑处理以减少噪声
-        average = np.mean(conv0, axis=0)  # 计算平均值
-        minimum = np.min(conv0, axis=0)   # 计算最小值
-
-        # 组合最大值、平均值和最小值，然后进行卷积平滑
-        # 这种组合可以增强真实信号，抑制噪声
-        result = convolve(maximum * average * minimum, 2 * scale)
-        rotation_confidence = round(peak_confidence(maximum), 3)
-
-    # 第七步：将匹配点转换为角度
-    if rotation_confidence <= 0:
-        # 放弃当前结果
-        max_index = None
-        degree = None
-    else:
-        # 找到响应最强的位置（角度索引）
-        max_index = int(np.argmax(result))
-        # 将索引转换为标准极坐标角度：[0,360)
-        # 由右边界计算中心的坐标
-        degree = (max_index * 360.0 / (angle_resolution * scale)) + (view_angle / 2.0)
-        # 确保角度在[0, 360)范围内
-        degree = normalize_angle(degree)
-
-    # 存储每个步骤的结果
-    if debug_steps:
-        steps = {
-            'original': view_mask,
-            'polar_transform': remap,
-            'gradient': gradient,
-            'left_boundary': l,
-            'right_boundary': r,
-            'convolution_results': np.array(conv0),
-            'final_result': result,
-            'confidence': rotation_confidence,
-            'max_index': max_index,
-            'view_angle': degree
-        }
-    else:
-        steps = None
-
-    return degree, steps
+    return estimator.calculate(view_mask, debug_steps=debug_steps)
 
 
 def calculate_sector_angle(
@@ -378,14 +547,12 @@ def calculate_sector_angle(
     d = view_mask.shape[0]  # 获取图像尺寸 即小地图的直径
 
     # 第二步：坐标变换，将圆形区域展开为矩形（与calculate方法相同）
-    # 获取极坐标到直角坐标的映射矩阵
-    m1, m2 = generate_polar_remap_maps(d, angle_resolution=angle_resolution)
+    # 获取极坐标到直角坐标的映射矩阵 只包含半径范围内的部分，避免中心点和边缘的干扰
+    m1, m2 = generate_ring_remap_maps(d, angle_resolution=angle_resolution, radius_range=tuple(radius_range))
 
     # 使用remap将圆形图像按角度展开为矩形
-    # 展开后：行代表半径，列代表角度 remap.shape=(d, angle_resolution)
-    remap = cv2.remap(view_mask, m1, m2, cv2.INTER_LINEAR)
-    # 只取中间部分，避免中心点和边缘的干扰
-    remap = remap[int(d * radius_range[0]):int(d * radius_range[1])].astype(np.float32)
+    # 展开后：行代表半径，列代表角度
+    remap = cv2.remap(view_mask, m1, m2, cv2.INTER_LINEAR).astype(np.float32)
     # 根据scale参数放大图像，提高角度检测精度
     remap = cv2.resize(remap, None, fx=scale, fy=scale, interpolation=cv2.INTER_LINEAR)
 
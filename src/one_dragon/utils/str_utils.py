@@ -2,6 +2,7 @@ import difflib
 import re
 from typing import Optional, List, Tuple
 
+from one_dragon.utils import text_match_utils
 from one_dragon.utils.i18_utils import gt
 
 _WITH_CHINESE_PATTERN = re.compile(r'[\u4e00-\u9fff]+')
@@ -39,7 +40,8 @@ def find_by_lcs(source: str, target: str, percent: float = 0.3,
     source_usage = source.lower() if ignore_case else source
     target_usage = target.lower() if ignore_case else target
 
-    common_length = longest_common_subsequence_length(source_usage, target_usage)
+    # source 通常是固定的目标文本 和多个OCR结果比较 放在模式串的位置复用字符位图
+    common_length = text_match_utils.lcs_length(source_usage, target_usage)
 
     return common_length >= len(source) * percent
 
@@ -51,21 +53,8 @@ def longest_common_subsequence_length(str1: str, str2: str) -> int:
     :param str2:
     :return: 长度
     """
-    m = len(str1)
-    n = len(str2)
-
-    # 创建一个二维数组用于存储中间结果
-    dp = [[0] * (n + 1) for _ in range(m + 1)]
-
-    # 动态规划求解
-    for i in range(1, m + 1):
-        for j in range(1, n + 1):
-            if str1[i - 1] == str2[j - 1]:
-                dp[i][j] = dp[i - 1][j - 1] + 1
-            else:
-                dp[i][j] = max(dp[i - 1][j], dp[i][j - 1])
-
-    return dp[m][n]
+    # 位并行计算 str1 的字符位图会被缓存
+    return text_match_utils.lcs_length(str1, str2)
 
 
 def get_positive_digits(v: str, err: Optional[int] = None) -> Optional[int]:
@@ -113,21 +102,10 @@ def find_best_match_by_lcs(word: str, target_word_list: List[str],
     :param lcs_percent_threshold: 要求的LCS阈值
     :return: 最符合的目标词的下标
     """
-    target_idx: Optional[int] = None
-    target_lcs_percent: Optional[float] = None
-
-    for idx, target_word in enumerate(target_word_list):
-        lcs = longest_common_subsequence_length(word, target_word)
-        if lcs == 0:  # 至少要有一个匹配
-            continue
-        lcs_percent = lcs * 1.0 / len(target_word)
-        if lcs_percent_threshold is not None and lcs_percent < lcs_percent_threshold:
-            continue
-        if target_idx is None or lcs_percent > target_lcs_percent:
-            target_idx = idx
-            target_lcs_percent = lcs_percent
-
-    return target_idx
+    if len(target_word_list) == 0:
+        return None
+    target_dict = text_match_utils.get_target_dictionary(tuple(target_word_list))
+    return target_dict.find_best_by_lcs(word, lcs_percent_threshold=lcs_percent_threshold)
 
 
 def find_best_match_by_difflib(word: str, target_word_list: List[str], cutoff=0.6) -> Optional[int]:
@@ -189,23 +167,7 @@ def levenshtein_distance(s1: str, s2: str) -> int:
     """
     计算两个字符串之间的 Levenshtein 编辑距离
     """
-    if len(s1) < len(s2):
-        return levenshtein_distance(s2, s1)
-
-    if len(s2) == 0:
-        return len(s1)
-
-    previous_row = range(len(s2) + 1)
-    for i, c1 in enumerate(s1):
-        current_row = [i + 1]
-        for j, c2 in enumerate(s2):
-            insertions = previous_row[j + 1] + 1
-            deletions = current_row[j] + 1
-            substitutions = previous_row[j] + (c1 != c2)
-            current_row.append(min(insertions, deletions, substitutions))
-        previous_row = current_row
-
-    return previous_row[-1]
+    return text_match_utils.levenshtein_distance(s1, s2)
 
 
 def find_best_match_by_similarity(
@@ -223,27 +185,9 @@ def find_best_match_by_similarity(
     if not ocr_text or not target_texts:
         return None, 0.0
 
-    best_match = None
-    highest_score = -1.0
-
-    for target in target_texts:
-        if not target:
-            continue
-        distance = levenshtein_distance(ocr_text, target)
-        max_len = max(len(ocr_text), len(target))
-        if max_len == 0:
-            score = 1.0 if distance == 0 else 0.0
-        else:
-            score = 1.0 - (distance / max_len)
-
-        if score > highest_score:
-            highest_score = score
-            best_match = target
-
-    if highest_score >= threshold:
-        return best_match, highest_score
-    else:
-        return None, highest_score
+    target_dict = text_match_utils.get_target_dictionary(tuple(target_texts))
+    best_idx, highest_score = target_dict.find_best_by_similarity(ocr_text, threshold=threshold)
+    return (target_texts[best_idx] if best_idx is not None else None), highest_score
 
 
 def is_target_after_ocr_list(
@@ -0,0 +1,282 @@
+"""OCR文本模糊匹配的快速实现。
+
+- 最长公共子序列长度 使用位并行算法 (Hyyrö) 每个字符只需要几次整数运算;
+- 编辑距离 使用位并行算法 (Myers / Hyyrö);
+- 模式串的字符位图 (peq) 按字符串缓存 同一个目标和很多OCR结果比较时只需要计算一次;
+- ``TargetDictionary`` 预先编译一组目标 按字符建立倒排索引
+  一对多查找时 先排除不可能满足条件的目标 再进行位并行计算。
+
+Python 的整数没有长度限制 因此位并行算法对任意长度的字符串都适用。
+"""
+from __future__ import annotations
+
+from functools import lru_cache
+
+
+@lru_cache(maxsize=4096)
+def compile_pattern(pattern: str) -> dict[str, int]:
+    """
+    模式串中每个字符出现位置的位图 第i个字符对应第i位
+
+    Args:
+        pattern: 模式串
+
+    Returns:
+        dict[str, int]: 字符 -> 位图
+    """
+    peq: dict[str, int] = {}
+    for idx, c in enumerate(pattern):
+        peq[c] = peq.get(c, 0) | (1 << idx)
+    return peq
+
+
+def lcs_length(pattern: str, text: str) -> int:
+    """
+    最长公共子序列的长度 结果与参数顺序无关
+    模式串的位图会被缓存 一对多比较时 应该把固定的字符串放在 pattern
+
+    Args:
+        pattern: 模式串
+        text: 文本
+
+    Returns:
+        int: 长度
+    """
+    m = len(pattern)
+    if m == 0 or len(text) == 0:
+        return 0
+    peq = compile_pattern(pattern)
+    mask = (1 << m) - 1
+    v = mask  # 为0的位表示该位置的字符已经被匹配
+    for c in text:
+        u = v & peq.get(c, 0)
+        v = ((v + u) | (v - u)) & mask
+    return m - v.bit_count()
+
+
+def levenshtein_distance(pattern: str, text: str) -> int:
+    """
+    编辑距离 结果与参数顺序无关
+    模式串的位图会被缓存 一对多比较时 应该把固定的字符串放在 pattern
+
+    Args:
+        pattern: 模式串
+        text: 文本
+
+    Returns:
+        int: 距离
+    """
+    m = len(pattern)
+    if m == 0:
+        return len(text)
+    if len(text) == 0:
+        return m
+
+    peq = compile_pattern(pattern)
+    mask = (1 << m) - 1
+    high = 1 << (m - 1)
+    pv = mask  # 垂直方向 +1 的位置
+    mv = 0  # 垂直方向 -1 的位置
+    score = m
+    for c in text:
+        eq = peq.get(c, 0)
+        xv = eq | mv
+        xh = (((eq & pv) + pv) ^ pv) | eq
+        ph = mv | (~(xh | pv) & mask)
+        mh = pv & xh
+        if ph & high:
+            score += 1
+        elif mh & high:
+            score -= 1
+        # 全局编辑距离 第0行每列加1 因此移位后最低位补1
+        ph = ((ph << 1) | 1) & mask
+        mh = (mh << 1) & mask
+        pv = mh | (~(xv | ph) & mask)
+        mv = ph & xv
+    return score
+
+
+def similarity(pattern: str, text: str) -> float:
+    """
+    基于编辑距离的相似度 1 - 距离 / 较长的长度
+
+    Args:
+        pattern: 模式串
+        text: 文本
+
+    Returns:
+        float: 相似度 [0, 1]
+    """
+    max_len = max(len(pattern), len(text))
+    if max_len == 0:
+        return 1.0
+    return 1.0 - (levenshtein_distance(pattern, text) / max_len)
+
+
+class TargetDictionary:
+
+    def __init__(self, target_list: list[str], ignore_case: bool = False):
+        """
+        预先编译的一组目标 用于一个OCR结果和多个目标的比较
+        目标按字符建立倒排索引 没有任何相同字符的目标 最长公共子序列一定为0 可以直接跳过
+
+        Args:
+            target_list: 目标列表 下标与返回结果对应
+            ignore_case: 是否忽略大小写
+        """
+        self.target_list: list[str] = list(target_list)
+        self.ignore_case: bool = ignore_case
+
+        self._usage_list: list[str] = [
+            i.lower() if ignore_case and i is not None else i
+            for i in self.target_list
+        ]
+        self._char_index: dict[str, list[int]] = {}  # 字符 -> 包含该字符的目标下标 升序
+        for idx, target in enumerate(self._usage_list):
+            if not target:
+                continue
+            compile_pattern(target)
+            for c in set(target):
+                self._char_index.setdefault(c, []).append(idx)
+
+    def _get_word_usage(self, word: str) -> str:
+        return word.lower() if self.ignore_case else word
+
+    def get_candidate_list(self, word: str) -> list[int]:
+        """
+        和文本至少有一个相同字符的目标
+
+        Args:
+            word: 文本
+
+        Returns:
+            list[int]: 目标下标 升序
+        """
+        idx_set: set[int] = set()
+        for c in set(self._get_word_usage(word)):
+            idx_list = self._char_index.get(c)
+            if idx_list is not None:
+                idx_set.update(idx_list)
+        return sorted(idx_set)
+
+    def find_best_by_lcs(self, word: str, lcs_percent_threshold: float | None = None) -> int | None:
+        """
+        找出 最长公共子序列长度/目标长度 最大的目标 相同时取下标小的
+
+        Args:
+            word: 文本
+            lcs_percent_threshold: 要求的比例阈值
+
+        Returns:
+            int | None: 目标下标
+        """
+        if not word:
+            return None
+        word_usage = self._get_word_usage(word)
+        word_len = len(word_usage)
+
+        target_idx: int | None = None
+        target_lcs_percent: float = 0
+        for idx in self.get_candidate_list(word_usage):
+            target = self._usage_list[idx]
+            target_len = len(target)
+            # 最长公共子序列不会超过较短的长度 达不到要求时跳过
+            max_percent = min(word_len, target_len) * 1.0 / target_len
+            if lcs_percent_threshold is not None and max_percent < lcs_percent_threshold:
+                continue
+            if target_idx is not None and max_percent <= target_lcs_percent:
+                continue
+
+            lcs = lcs_length(target, word_usage)
+            if lcs == 0:  # 至少要有一个匹配
+                continue
+            lcs_percent = lcs * 1.0 / target_len
+            if lcs_percent_threshold is not None and lcs_percent < lcs_percent_threshold:
+                continue
+            if target_idx is None or lcs_percent > target_lcs_percent:
+                target_idx = idx
+                target_lcs_percent = lcs_percent
+
+        return target_idx
+
+    def find_all_by_lcs(self, word: str, percent: float = 0.3) -> list[int]:
+        """
+        找出所有包含在文本中的目标 即 最长公共子序列长度 >= 目标长度 * percent
+        与逐个调用 str_utils.find_by_lcs(目标, 文本, percent) 的结果一致
+
+        Args:
+            word: 文本
+            percent: 最长公共子序列长度 需要占 目标长度 的百分比
+
+        Returns:
+            list[int]: 目标下标 升序
+        """
+        if not word:
+            return []
+        word_usage = self._get_word_usage(word)
+        word_len = len(word_usage)
+
+        if percent <= 0:
+            # 不需要任何相同的字符
+            return [idx for idx, target in enumerate(self._usage_list) if target]
+
+        result_list: list[int] = []
+        for idx in self.get_candidate_list(word_usage):
+            target = self._usage_list[idx]
+            required = len(target) * percent
+            if min(word_len, len(target)) < required:
+                continue
+            if lcs_length(target, word_usage) >= required:
+                result_list.append(idx)
+        return result_list
+
+    def find_best_by_similarity(self, text: str, threshold: float = 0.5) -> tuple[int | None, float]:
+        """
+        根据编辑距离找出最相似的目标 相同时取下标小的
+
+        Args:
+            text: 文本
+            threshold: 相似度阈值，高于此值才被认为有效
+
+        Returns:
+            tuple[int | None, float]: 目标下标, 相似度
+        """
+        if not text:
+            return None, 0.0
+        text_usage = self._get_word_usage(text)
+        text_len = len(text_usage)
+
+        best_idx: int | None = None
+        highest_score: float = -1.0
+        for idx, target in enumerate(self._usage_list):
+            if not target:
+                continue
+            max_len = max(text_len, len(target))
+            # 编辑距离至少是长度差 达不到当前最高分时跳过
+            if 1.0 - (abs(text_len - len(target)) / max_len) <= highest_score:
+                continue
+
+            score = 1.0 - (levenshtein_distance(target, text_usage) / max_len)
+            if score > highest_score:
+                highest_score = score
+                best_idx = idx
+
+        if highest_score >= threshold:
+            return best_idx, highest_score
+        else:
+            return None, highest_score
+
+
+@lru_cache(maxsize=256)
+def get_target_dictionary(target_tuple: tuple[str, ...], ignore_case: bool = False) -> TargetDictionary:
+    """
+    获取共用的目标字典 相同的目标列表只编译一次
+
+    Args:
+        target_tuple: 目标列表
+        ignore_case: 是否忽略大小写
+
+    Returns:
+        TargetDictionary: 目标字典
+    """
+    return TargetDictionary(list(target_tuple), ignore_case=ignore_case)
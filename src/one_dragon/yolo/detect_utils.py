@@ -46,6 +46,9 @@ class DetectContext:
         self.scale_width: int = 0
         """缩放后的宽度"""
 
+        self.allow_upscale: bool = True
+        """预处理时是否允许放大图片 不允许时小图片按原尺寸推理"""
+
 
 class DetectClass:
 
@@ -145,19 +148,34 @@ def nms(boxes, scores, iou_threshold):
 
 
 def multiclass_nms(boxes, scores, class_ids, iou_threshold):
-
-    unique_class_ids = np.unique(class_ids)
-
-    keep_boxes = []
-    for class_id in unique_class_ids:
-        class_indices = np.where(class_ids == class_id)[0]
-        class_boxes = boxes[class_indices,:]
-        class_scores = scores[class_indices]
-
-        class_keep_boxes = nms(class_boxes, class_scores, iou_threshold)
-        keep_boxes.extend(class_indices[class_keep_boxes])
-
-    return keep_boxes
+    """
+    按类别分别进行NMS 使用 OpenCV 的批量实现 不再逐个类别循环
+    :param boxes: 目标框 xyxy
+    :param scores: 得分
+    :param class_ids: 类别
+    :param iou_threshold: IOU阈值
+    :return: 保留的下标 按类别升序、同类别内得分降序排列
+    """
+    if len(scores) == 0:
+        return []
+
+    boxes = np.asarray(boxes, dtype=np.float32)
+    xywh_boxes = np.empty_like(boxes)
+    xywh_boxes[:, :2] = boxes[:, :2]
+    xywh_boxes[:, 2:] = boxes[:, 2:] - boxes[:, :2]
+    scores = np.asarray(scores, dtype=np.float32)
+    class_ids = np.asarray(class_ids, dtype=np.int32)
+
+    keep_boxes = cv2.dnn.NMSBoxesBatched(
+        xywh_boxes, scores, class_ids,
+        score_threshold=float(np.min(scores)) - 1,  # 调用方已经按置信度过滤 这里不再过滤
+        nms_threshold=iou_threshold,
+    )
+    keep_boxes = np.asarray(keep_boxes, dtype=np.int64).reshape(-1)
+
+    # 与逐个类别处理时的顺序保持一致
+    order = np.lexsort((-scores[keep_boxes], class_ids[keep_boxes]))
+    return keep_boxes[order].tolist()
 
 
 def compute_iou(box, boxes):
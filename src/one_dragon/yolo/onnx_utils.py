@@ -1,23 +1,34 @@
-from typing import Tuple
+import threading
 
 import cv2
 import numpy as np
 from cv2.typing import MatLike
 
+LETTERBOX_PAD_VALUE: int = 114  # 填充部分的像素值
 
-def scale_input_image_u(image: MatLike, onnx_input_width: int, onnx_input_height: int) -> Tuple[np.ndarray, int, int]:
+
+def scale_input_image_u(image: MatLike, onnx_input_width: int, onnx_input_height: int,
+                        input_buffer: 'ScaleInputBuffer | None' = None,
+                        allow_upscale: bool = True) -> tuple[np.ndarray, int, int]:
     """
     按照 ultralytics 的方式，将图片缩放至模型使用的大小
     参考 https://github.com/orgs/ultralytics/discussions/6994?sort=new#discussioncomment-8382661
     :param image: 输入的图片 RBG通道
     :param onnx_input_width: 模型需要的图片宽度
     :param onnx_input_height: 模型需要的图片高度
+    :param input_buffer: 复用的输入缓冲区 传入时结果写入缓冲区 不再每次分配新的数组
+    :param allow_upscale: 是否允许放大 不允许时比模型输入小的图片保持原尺寸 只进行填充
     :return: 缩放后的图片 RGB通道
     """
+    if input_buffer is not None:
+        return input_buffer.scale(image, onnx_input_width, onnx_input_height, allow_upscale=allow_upscale)
+
     img_height, img_width = image.shape[:2]
 
     # 将图像缩放到模型的输入尺寸中较短的一边
     min_scale = min(onnx_input_height / img_height, onnx_input_width / img_width)
+    if not allow_upscale:
+        min_scale = min(min_scale, 1.0)
 
     # 未进行padding之前的尺寸
     scale_height = int(round(img_height * min_scale))
@@ -26,7 +37,7 @@ def scale_input_image_u(image: MatLike, onnx_input_width: int, onnx_input_height
     # 缩放到目标尺寸
     if onnx_input_height != img_height or onnx_input_width != img_width:  # 需要缩放
         input_img = np.full(shape=(onnx_input_height, onnx_input_width, 3),
-                            fill_value=114, dtype=np.uint8)
+                            fill_value=LETTERBOX_PAD_VALUE, dtype=np.uint8)
         scale_img = cv2.resize(image, (scale_width, scale_height), interpolation=cv2.INTER_LINEAR)
         input_img[0:scale_height, 0:scale_width, :] = scale_img
     else:
@@ -38,3 +49,85 @@ def scale_input_image_u(image: MatLike, onnx_input_width: int, onnx_input_height
     input_tensor = input_img[np.newaxis, :, :, :].astype(np.float32)
 
     return input_tensor, scale_height, scale_width
+
+
+class _ScaleInputTensor:
+
+    def __init__(self, onnx_input_width: int, onnx_input_height: int):
+        """
+        一个线程使用的输入张量
+        """
+        self.tensor: np.ndarray = np.empty((1, 3, onnx_input_height, onnx_input_width), dtype=np.float32)
+        self.scale_img: np.ndarray | None = None  # 缩放后的图片
+        self.channel_list: list[np.ndarray] = []  # 缩放后图片的各个通道
+        self.last_scale_shape: tuple[int, int] | None = None  # 上一次写入的区域大小 区域变化时需要重新填充
+
+    def prepare(self, scale_height: int, scale_width: int) -> None:
+        """
+        按缩放后的大小准备中间数组 并在区域变化时重新填充
+        """
+        if self.last_scale_shape == (scale_height, scale_width):
+            return
+        self.tensor.fill(LETTERBOX_PAD_VALUE / 255.0)
+        self.scale_img = np.empty((scale_height, scale_width, 3), dtype=np.uint8)
+        self.channel_list = [np.empty((scale_height, scale_width), dtype=np.uint8) for _ in range(3)]
+        self.last_scale_shape = (scale_height, scale_width)
+
+
+class ScaleInputBuffer:
+
+    def __init__(self):
+        """
+        模型输入的缓冲区 与 scale_input_image_u 的结果一致
+        缩放、填充、归一化、HWC转CHW 直接写入预先分配的张量 每帧不再分配新的数组
+        每个线程使用自己的张量 返回的张量在同一线程下一次调用前有效
+        """
+        self._local = threading.local()
+
+    def _get_tensor(self, onnx_input_width: int, onnx_input_height: int) -> _ScaleInputTensor:
+        tensor_map: dict[tuple[int, int], _ScaleInputTensor] | None = getattr(self._local, 'tensor_map', None)
+        if tensor_map is None:
+            tensor_map = {}
+            self._local.tensor_map = tensor_map
+        key = (onnx_input_width, onnx_input_height)
+        tensor = tensor_map.get(key)
+        if tensor is None:
+            tensor = _ScaleInputTensor(onnx_input_width, onnx_input_height)
+            tensor_map[key] = tensor
+        return tensor
+
+    def scale(self, image: MatLike, onnx_input_width: int, onnx_input_height: int,
+              allow_upscale: bool = True) -> tuple[np.ndarray, int, int]:
+        """
+        将图片缩放至模型使用的大小
+        :param image: 输入的图片 RBG通道
+        :param onnx_input_width: 模型需要的图片宽度
+        :param onnx_input_height: 模型需要的图片高度
+        :param allow_upscale: 是否允许放大 不允许时比模型输入小的图片保持原尺寸 只进行填充
+        :return: 模型的输入张量, 缩放后的高度, 缩放后的宽度
+        """
+        img_height, img_width = image.shape[:2]
+
+        min_scale = min(onnx_input_height / img_height, onnx_input_width / img_width)
+        if not allow_upscale:
+            min_scale = min(min_scale, 1.0)
+        scale_height = int(round(img_height * min_scale))
+        scale_width = int(round(img_width * min_scale))
+
+        buffer = self._get_tensor(onnx_input_width, onnx_input_height)
+        buffer.prepare(scale_height, scale_width)
+        if scale_height != img_height or scale_width != img_width:  # 需要缩放
+            cv2.resize(image, (scale_width, scale_height), dst=buffer.scale_img, interpolation=cv2.INTER_LINEAR)
+            scale_img = buffer.scale_img
+        else:
+            scale_img = image
+
+        # 拆分通道后 每个通道归一化并直接写入张量对应的平面 填充部分保持不变
+        channel_list = cv2.split(scale_img, buffer.channel_list)
+        for channel_idx, channel in enumerate(channel_list):
+            plane = buffer.tensor[0, channel_idx, :scale_height, :scale_width]
+            result = cv2.multiply(channel, 1 / 255.0, dst=plane, dtype=cv2.CV_32F)
+            if result is not plane and not np.shares_memory(result, plane):
+                plane[:] = result
+
+        return buffer.tensor, scale_height, scale_width
@@ -81,6 +81,7 @@ class Yolov8Classifier(OnnxModelLoader):
 
         self.keep_result_seconds: float = keep_result_seconds  # 保留识别结果的秒数
         self.run_result_history: List[ClassificationResult] = []  # 历史识别结果
+        self.input_buffer: onnx_utils.ScaleInputBuffer = onnx_utils.ScaleInputBuffer()  # 复用的模型输入
 
     def run(self, image: MatLike, conf: float = 0.9, run_time: Optional[float] = None) -> ClassificationResult:
         """
@@ -111,7 +112,10 @@ class Yolov8Classifier(OnnxModelLoader):
         """
         推理前的预处理
         """
-        input_tensor, scale_height, scale_width = onnx_utils.scale_input_image_u(context.img, self.onnx_input_width, self.onnx_input_height)
+        input_tensor, scale_height, scale_width = onnx_utils.scale_input_image_u(
+            context.img, self.onnx_input_width, self.onnx_input_height,
+            input_buffer=self.input_buffer,
+        )
         context.scale_height = scale_height
         context.scale_width = scale_width
         return input_tensor
@@ -1,14 +1,21 @@
+import csv
+import os
 import time
 
-import csv
 import numpy as np
-import os
 from cv2.typing import MatLike
-from typing import Optional, List
 
+from one_dragon.base.geometry.rectangle import Rect
+from one_dragon.base.screen.region_change_detector import RegionChangeDetector
 from one_dragon.yolo import onnx_utils
-from one_dragon.yolo.detect_utils import DetectFrameResult, DetectClass, DetectContext, DetectObjectResult, xywh2xyxy, \
-    multiclass_nms
+from one_dragon.yolo.detect_utils import (
+    DetectClass,
+    DetectContext,
+    DetectFrameResult,
+    DetectObjectResult,
+    multiclass_nms,
+    xywh2xyxy,
+)
 from one_dragon.yolo.onnx_model_loader import OnnxModelLoader
 
 
@@ -19,10 +26,10 @@ class Yolov8Detector(OnnxModelLoader):
                  model_parent_dir_path: str,
                  model_download_url: str,
                  gh_proxy: bool = True,
-                 gh_proxy_url: Optional[str] = None,
-                 personal_proxy: Optional[str] = None,
+                 gh_proxy_url: str | None = None,
+                 personal_proxy: str | None = None,
                  gpu: bool = False,
-                 backup_model_name: Optional[str] = None,
+                 backup_model_name: str | None = None,
                  keep_result_seconds: float = 2
                  ):
         """
@@ -47,12 +54,16 @@ class Yolov8Detector(OnnxModelLoader):
         )
 
         self.keep_result_seconds: float = keep_result_seconds  # 保留识别结果的秒数
-        self.run_result_history: List[DetectFrameResult] = []  # 历史识别结果
+        self.run_result_history: list[DetectFrameResult] = []  # 历史识别结果
         self.overlay_debug_bus = None
 
+        self.input_buffer: onnx_utils.ScaleInputBuffer = onnx_utils.ScaleInputBuffer()  # 复用的模型输入
+        # 区域识别结果的复用 整个画面时缩略图每格约15x8像素 小目标的变化也能检测到
+        self.roi_change_detector: RegionChangeDetector = RegionChangeDetector(thumbnail_size=128, diff_threshold=2)
+
         self.idx_2_class: dict[int, DetectClass] = {}  # 分类
         self.class_2_idx: dict[str, int] = {}
-        self.category_2_idx: dict[str, List[int]] = {}
+        self.category_2_idx: dict[str, list[int]] = {}
         self._load_detect_classes(self.model_dir_path)
 
     def run(
@@ -60,9 +71,9 @@ class Yolov8Detector(OnnxModelLoader):
         image: MatLike,
         conf: float = 0.6,
         iou: float = 0.5,
-        run_time: Optional[float] = None,
-        label_list: Optional[List[str]] = None,
-        category_list: Optional[List[str]] = None,
+        run_time: float | None = None,
+        label_list: list[str] | None = None,
+        category_list: list[str] | None = None,
     ) -> DetectFrameResult:
         """
         对图片进行识别
@@ -106,11 +117,108 @@ class Yolov8Detector(OnnxModelLoader):
         )
         return frame_result
 
+    def run_roi(
+        self,
+        image: MatLike,
+        roi: Rect | None = None,
+        conf: float = 0.6,
+        iou: float = 0.5,
+        run_time: float | None = None,
+        label_list: list[str] | None = None,
+        category_list: list[str] | None = None,
+        reuse_unchanged: bool = False,
+    ) -> DetectFrameResult:
+        """
+        只对画面的一个区域进行识别 结果坐标会转换回原画面
+
+        区域比模型输入小时 按原尺寸推理 不放大 小目标不会因为整个画面缩小而丢失。
+        区域比模型输入大时 整体缩小后推理。
+
+        Args:
+            image: 图片 [h, w, c] rgb通道
+            roi: 识别区域 为None时使用整个画面
+            conf: 置信度阈值
+            iou: iou阈值
+            run_time: 识别时间
+            label_list: 限定识别的标签
+            category_list: 限定识别的标签分类
+            reuse_unchanged: 区域画面与上一次实际识别时相同时 直接复用上一次的识别结果 只适合画面静止的场景
+
+        Returns:
+            DetectFrameResult: 识别结果 坐标为原画面的坐标
+        """
+        record_context = DetectContext(image, run_time)
+
+        img_height, img_width = image.shape[:2]
+        if roi is None:
+            roi_rect = Rect(0, 0, img_width, img_height)
+        else:
+            roi_rect = Rect(max(0, roi.x1), max(0, roi.y1), min(img_width, roi.x2), min(img_height, roi.y2))
+
+        results: list[DetectObjectResult] = []
+        if roi_rect.width <= 0 or roi_rect.height <= 0:
+            return self.record_result(record_context, results)
+
+        cache_key: str = str((
+            roi_rect.x1, roi_rect.y1, roi_rect.x2, roi_rect.y2, conf, iou,
+            None if label_list is None else tuple(label_list),
+            None if category_list is None else tuple(category_list),
+        ))
+        signature: np.ndarray | None = None
+        if reuse_unchanged:
+            signature = self.roi_change_detector.cal_signature(image, [roi_rect])
+            unchanged, last_results = self.roi_change_detector.get_unchanged_result(cache_key, signature)
+            if unchanged:
+                frame_result = self.record_result(record_context, list(last_results))
+                self._emit_overlay_vision(frame_result)
+                return frame_result
+
+        roi_image = image[roi_rect.y1:roi_rect.y2, roi_rect.x1:roi_rect.x2]
+        context = DetectContext(roi_image, record_context.run_time)
+        context.conf = conf
+        context.iou = iou
+        context.label_list = label_list
+        context.category_list = category_list
+        context.allow_upscale = False
+
+        t1 = time.time()
+        input_tensor = self.prepare_input(context)
+        t2 = time.time()
+        outputs = self.inference(input_tensor)
+        t3 = time.time()
+        roi_results = self.process_output(outputs, context)
+        t4 = time.time()
+
+        for result in roi_results:
+            # 转换回原画面的坐标
+            results.append(DetectObjectResult(
+                rect=[result.x1 + roi_rect.x1, result.y1 + roi_rect.y1, result.x2 + roi_rect.x1, result.y2 + roi_rect.y1],
+                score=result.score,
+                detect_class=result.detect_class,
+            ))
+
+        if signature is not None:
+            self.roi_change_detector.update(cache_key, signature, list(results))
+
+        frame_result = self.record_result(record_context, results)
+        self._emit_overlay_vision(frame_result)
+        self._emit_overlay_perf_and_timeline(
+            preprocess_ms=(t2 - t1) * 1000.0,
+            infer_ms=(t3 - t2) * 1000.0,
+            postprocess_ms=(t4 - t3) * 1000.0,
+            result_count=len(results),
+        )
+        return frame_result
+
     def prepare_input(self, context: DetectContext) -> np.ndarray:
         """
         推理前的预处理
         """
-        input_tensor, scale_height, scale_width = onnx_utils.scale_input_image_u(context.img, self.onnx_input_width, self.onnx_input_height)
+        input_tensor, scale_height, scale_width = onnx_utils.scale_input_image_u(
+            context.img, self.onnx_input_width, self.onnx_input_height,
+            input_buffer=self.input_buffer,
+            allow_upscale=context.allow_upscale,
+        )
         context.scale_height = scale_height
         context.scale_width = scale_width
         return input_tensor
@@ -124,45 +232,49 @@ class Yolov8Detector(OnnxModelLoader):
         outputs = self.run_session(self.output_names, {self.input_names[0]: input_tensor})
         return outputs
 
-    def process_output(self, output, context: DetectContext) -> List[DetectObjectResult]:
+    def process_output(self, output, context: DetectContext) -> list[DetectObjectResult]:
         """
         :param output: 推理结果
         :param context: 上下文
         :return: 最终得到的识别结果
         """
-        predictions = np.squeeze(output[0]).T
-
-        keep = np.ones(shape=(predictions.shape[1]), dtype=bool)
+        predictions = output[0][0]  # [4 + 类别数量, 候选框数量] 不转置 只在通过过滤后取出需要的候选框
+        class_scores = predictions[4:, :]
 
+        class_idx_list: np.ndarray | None = None  # 限定识别的类别
         if context.label_list is not None or context.category_list is not None:
-            keep[4:] = False  # 前4位是坐标 先把所有标签都设置为False
+            class_idx_set: set[int] = set()
             if context.label_list is not None:
                 for label in context.label_list:
                     idx = self.class_2_idx.get(label)
                     if idx is not None:
-                        keep[idx + 4] = True
+                        class_idx_set.add(idx)
 
             if context.category_list is not None:
                 for category in context.category_list:
-                    for idx in self.category_2_idx.get(category, []):
-                        keep[idx + 4] = True
+                    class_idx_set.update(self.category_2_idx.get(category, []))
 
-        predictions[:, keep == False] = 0
+            class_idx_list = np.array(sorted(class_idx_set), dtype=np.int64)
+            class_scores = class_scores[class_idx_list, :]
 
-        # 按置信度阈值进行基本的过滤
-        scores = np.max(predictions[:, 4:], axis=1)
-        predictions = predictions[scores > context.conf, :]
-        scores = scores[scores > context.conf]
+        results: list[DetectObjectResult] = []
+        if class_scores.shape[0] == 0:
+            return results
 
-        results: List[DetectObjectResult] = []
-        if len(scores) == 0:
+        # 按置信度阈值进行基本的过滤
+        scores = np.max(class_scores, axis=0)
+        candidate_idx = np.flatnonzero(scores > context.conf)
+        if len(candidate_idx) == 0:
             return results
+        scores = scores[candidate_idx]
 
         # 选择置信度最高的类别
-        class_ids = np.argmax(predictions[:, 4:], axis=1)
+        class_ids = np.argmax(class_scores[:, candidate_idx], axis=0)
+        if class_idx_list is not None:
+            class_ids = class_idx_list[class_ids]
 
         # 提取Bounding box
-        boxes = predictions[:, :4]  # 原始推理结果 xywh
+        boxes = predictions[:4, candidate_idx].T  # 原始推理结果 xywh
         scale_shape = np.array([context.scale_width, context.scale_height, context.scale_width, context.scale_height])  # 缩放后图片的大小
         boxes = np.divide(boxes, scale_shape, dtype=np.float32)  # 转化到 0~1
         boxes *= np.array([context.img_width, context.img_height, context.img_width, context.img_height])  # 恢复到原图的坐标
@@ -180,7 +292,7 @@ class Yolov8Detector(OnnxModelLoader):
 
         return results
 
-    def record_result(self, context: DetectContext, results: List[DetectObjectResult]) -> DetectFrameResult:
+    def record_result(self, context: DetectContext, results: list[DetectObjectResult]) -> DetectFrameResult:
         """
         记录本帧识别结果
         :param context: 识别上下文
@@ -269,7 +381,7 @@ class Yolov8Detector(OnnxModelLoader):
         )
 
     @property
-    def last_run_result(self) -> Optional[DetectFrameResult]:
+    def last_run_result(self) -> DetectFrameResult | None:
         if len(self.run_result_history) > 0:
             return self.run_result_history[len(self.run_result_history) - 1]
         else:
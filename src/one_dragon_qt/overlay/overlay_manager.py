@@ -176,7 +176,7 @@ class OverlayManager(QObject):
         self._state_timer.setInterval(self.config.state_poll_interval_ms)
 
     def _bind_context_events(self) -> None:
-        self.ctx.listen_event(OverlayEventEnum.OVERLAY_LOG.value, self._on_context_log_event)
+        self.ctx.listen_event(OverlayEventEnum.OVERLAY_LOG.value, self._on_context_log_event, inline=True)
 
     def _on_context_log_event(self, event: ContextEventItem) -> None:
         if event is None or event.data is None:
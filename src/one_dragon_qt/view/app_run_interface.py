@@ -41,10 +41,10 @@ class AppRunner(QThread):
         运行 最后发送结束信号
         :return:
         """
-        self.ctx.run_context.event_bus.listen_event(ApplicationRunContextStateEventEnum.START, self._on_state_changed)
-        self.ctx.run_context.event_bus.listen_event(ApplicationRunContextStateEventEnum.PAUSE, self._on_state_changed)
-        self.ctx.run_context.event_bus.listen_event(ApplicationRunContextStateEventEnum.STOP, self._on_state_changed)
-        self.ctx.run_context.event_bus.listen_event(ApplicationRunContextStateEventEnum.RESUME, self._on_state_changed)
+        self.ctx.run_context.event_bus.listen_event(ApplicationRunContextStateEventEnum.START, self._on_state_changed, inline=True)
+        self.ctx.run_context.event_bus.listen_event(ApplicationRunContextStateEventEnum.PAUSE, self._on_state_changed, inline=True)
+        self.ctx.run_context.event_bus.listen_event(ApplicationRunContextStateEventEnum.STOP, self._on_state_changed, inline=True)
+        self.ctx.run_context.event_bus.listen_event(ApplicationRunContextStateEventEnum.RESUME, self._on_state_changed, inline=True)
 
         self.run_result = self.ctx.run_context.run_application(
             app_id=self.app_id,
@@ -129,9 +129,9 @@ class OneDragonRunInterface(SplitAppRunInterface):
         self._refresh_app_config()
         self.notify_switch.init_with_adapter(self.ctx.notify_config.get_prop_adapter('enable_notify'))
 
-        self.ctx.listen_event(ApplicationEventId.APPLICATION_START.value, self._on_app_state_changed)
-        self.ctx.listen_event(ApplicationEventId.APPLICATION_STOP.value, self._on_app_state_changed)
-        self.ctx.listen_event(ContextInstanceEventEnum.instance_active.value, self._on_instance_event)
+        self.ctx.listen_event(ApplicationEventId.APPLICATION_START.value, self._on_app_state_changed, coalesce=True)
+        self.ctx.listen_event(ApplicationEventId.APPLICATION_STOP.value, self._on_app_state_changed, coalesce=True)
+        self.ctx.listen_event(ContextInstanceEventEnum.instance_active.value, self._on_instance_event, inline=True)
 
         self.instance_run_opt.blockSignals(True)
         self.instance_run_opt.setValue(self.ctx.one_dragon_config.instance_run)
@@ -13,6 +13,7 @@ from one_dragon_qt.widgets.download_card.onnx_model_download_card import (
 )
 from one_dragon_qt.widgets.log_display_card import LogDisplayCard
 from one_dragon_qt.widgets.setting_card.help_card import HelpCard
+from one_dragon_qt.widgets.setting_card.switch_setting_card import SwitchSettingCard
 from one_dragon_qt.widgets.vertical_scroll_interface import VerticalScrollInterface
 
 
@@ -61,6 +62,13 @@ class ResourceDownloadInterface(VerticalScrollInterface):
         self.ocr_opt.gpu_changed.connect(self.on_ocr_use_gpu_changed)
         group.addSettingCard(self.ocr_opt)
 
+        self.ocr_rec_batcher_opt = SwitchSettingCard(
+            icon=FluentIcon.SPEED_HIGH, title='OCR合批识别',
+            content='多个识别同时进行时，合并文本行一起推理，GPU模式下收益更明显'
+        )
+        self.ocr_rec_batcher_opt.value_changed.connect(self.on_ocr_use_rec_batcher_changed)
+        group.addSettingCard(self.ocr_rec_batcher_opt)
+
         self._add_model_cards(group)
 
         return group
@@ -81,6 +89,7 @@ class ResourceDownloadInterface(VerticalScrollInterface):
         self.ocr_opt.blockSignals(True)
         self.ocr_opt.gpu_opt.setChecked(self.ctx.model_config.ocr_use_gpu)
         self.ocr_opt.blockSignals(False)
+        self.ocr_rec_batcher_opt.init_with_adapter(self.ctx.model_config.get_prop_adapter('ocr_use_rec_batcher'))
 
     def on_ocr_changed(self, index: int, value: CommonDownloaderParam) -> None:
         self.ctx.model_config.ocr = value.save_file_name[:-4]
@@ -88,3 +97,6 @@ class ResourceDownloadInterface(VerticalScrollInterface):
     def on_ocr_use_gpu_changed(self, value: bool) -> None:
         self.ctx.model_config.ocr_use_gpu = value
         self.ctx.init_ocr()
+
+    def on_ocr_use_rec_batcher_changed(self, value: bool) -> None:
+        self.ctx.init_ocr()
@@ -68,6 +68,13 @@ class SettingEnvInterface(VerticalScrollInterface):
         self.screenshot_method_opt.value_changed.connect(lambda: self.ctx.init_controller())
         basic_group.addSettingCard(self.screenshot_method_opt)
 
+        self.background_screenshot_opt = SwitchSettingCard(
+            icon=FluentIcon.CAMERA, title='后台截图',
+            content='运行时在独立线程中持续截图，识别时直接使用最新画面，会增加CPU占用'
+        )
+        self.background_screenshot_opt.value_changed.connect(lambda: self.ctx.init_controller())
+        basic_group.addSettingCard(self.background_screenshot_opt)
+
         self.debug_opt = SwitchSettingCard(
             icon=FluentIcon.SEARCH, title='调试模式', content='正常无需开启'
         )
@@ -206,6 +213,7 @@ class SettingEnvInterface(VerticalScrollInterface):
         VerticalScrollInterface.on_interface_shown(self)
 
         self.screenshot_method_opt.init_with_adapter(self.ctx.env_config.get_prop_adapter('screenshot_method'))
+        self.background_screenshot_opt.init_with_adapter(self.ctx.env_config.get_prop_adapter('background_screenshot'))
         self.debug_opt.init_with_adapter(self.ctx.env_config.get_prop_adapter('is_debug'))
         self.copy_screenshot_opt.init_with_adapter(self.ctx.env_config.get_prop_adapter('copy_screenshot'))
 
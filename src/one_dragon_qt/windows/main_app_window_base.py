@@ -52,7 +52,7 @@ class MainAppWindowBase(AppWindowBase):
         )
 
         self.context_notify_signal.connect(self._show_context_notify)
-        self.ctx.listen_event(ContextNotifyEvent.EVENT_ID, self._emit_context_notify)
+        self.ctx.listen_event(ContextNotifyEvent.EVENT_ID, self._emit_context_notify, inline=True)
 
     def create_sub_interface(self) -> None:
         # 导航栏返回按钮（最上方，在子界面之前添加）
@@ -79,6 +79,7 @@ class ONNXPaddleOcr(TextSystem):
         det_limit_side_len: float = 960.0,
         ocr_model_size: str | None = None,
         ocr_model_name: str | None = None,
+        use_rec_batcher: bool = False,
     ) -> None:
         # 默认参数
         parser = init_args()
@@ -98,6 +99,7 @@ class ONNXPaddleOcr(TextSystem):
             "det_limit_side_len": det_limit_side_len,
             "ocr_model_size": ocr_model_size,
             "ocr_model_name": ocr_model_name,
+            "use_rec_batcher": use_rec_batcher,
         }
         # 过滤掉 None 值，避免覆盖默认行为
         filtered_kwargs = {k: v for k, v in kwargs.items() if v is not None}
@@ -166,7 +168,7 @@ class ONNXPaddleOcr(TextSystem):
                     img, cls_res_tmp = self.text_classifier(img)
                     if not rec:
                         cls_res.append(cls_res_tmp)
-                rec_res = self.text_recognizer(img)
+                rec_res = self.recognize(img)
                 ocr_res.append(rec_res)
 
                 if not rec:
@@ -184,6 +186,35 @@ class ONNXPaddleOcr(TextSystem):
             raise
 
 
+    def batch_ocr(
+        self,
+        img_list: list[MatLike],
+        cls: bool = True
+    ) -> list[list[Any]]:
+        """对多张图像分别进行文字检测，再将所有文字区域合并成批次统一识别。
+
+        相比逐张调用 ocr()，识别模型的推理次数由图像数量决定变为由文本行数量决定，
+        适合一次识别多个小区域的场景。
+
+        Args:
+            img_list: 待识别的图像列表。
+            cls: 是否进行方向角度分类校正。
+
+        Returns:
+            与 img_list 一一对应的结果列表，每个元素为 [[box, (text_result, score)], ...]
+        """
+        try:
+            result_list = self.batch_call(img_list, cls and self.use_angle_cls)
+            return [
+                [[box.tolist(), res] for box, res in zip(dt_boxes, rec_res, strict=True)]
+                for dt_boxes, rec_res in result_list
+            ]
+        except Exception:
+            from one_dragon.utils.log_utils import log as od_log
+            od_log.error('OCR批量推理出错', exc_info=True)
+            raise
+
+
 def sav2Img(org_img, result, name="draw_ocr.jpg"):
     # 显示结果
     from PIL import Image
@@ -299,30 +299,38 @@ class TextRecognizer(PredictBase):
 
         for beg_img_no in range(0, img_num, batch_num):
             end_img_no = min(img_num, beg_img_no + batch_num)
-            norm_img_batch = []
-            imgC, imgH, imgW = self.rec_image_shape[:3]
-            max_wh_ratio = imgW / imgH
-            # max_wh_ratio = 0
-            for ino in range(beg_img_no, end_img_no):
-                h, w = img_list[indices[ino]].shape[0:2]
-                wh_ratio = w * 1.0 / h
-                max_wh_ratio = max(max_wh_ratio, wh_ratio)
-            for ino in range(beg_img_no, end_img_no):
-                norm_img = self.resize_norm_img(img_list[indices[ino]], max_wh_ratio)
-                norm_img = norm_img[np.newaxis, :]
-                norm_img_batch.append(norm_img)
-
-            norm_img_batch = np.concatenate(norm_img_batch)
-            norm_img_batch = norm_img_batch.copy()
-            input_feed = self.get_input_feed(self.rec_input_name, norm_img_batch)
-            outputs = self.run_onnx_session(
-                self.rec_onnx_session, self.rec_output_name, input_feed=input_feed
-            )
-
-            preds = outputs[0]
-
-            rec_result = self.postprocess_op(preds)
+            rec_result = self.infer_batch([img_list[indices[ino]] for ino in range(beg_img_no, end_img_no)])
             for rno in range(len(rec_result)):
                 rec_res[indices[beg_img_no + rno]] = rec_result[rno]
 
         return rec_res
+
+    def infer_batch(self, img_list, max_wh_ratio=None):
+        """
+        一组文本行进行一次模型推理
+        :param img_list: 文本行图片
+        :param max_wh_ratio: 补齐后的宽高比 不传入时使用这组图片中最大的宽高比
+        :return: 每张图片的识别结果
+        """
+        imgC, imgH, imgW = self.rec_image_shape[:3]
+        if max_wh_ratio is None:
+            max_wh_ratio = imgW / imgH
+            for img in img_list:
+                h, w = img.shape[0:2]
+                max_wh_ratio = max(max_wh_ratio, w * 1.0 / h)
+
+        norm_img_batch = []
+        for img in img_list:
+            norm_img = self.resize_norm_img(img, max_wh_ratio)
+            norm_img = norm_img[np.newaxis, :]
+            norm_img_batch.append(norm_img)
+
+        norm_img_batch = np.concatenate(norm_img_batch)
+        norm_img_batch = norm_img_batch.copy()
+        input_feed = self.get_input_feed(self.rec_input_name, norm_img_batch)
+        outputs = self.run_onnx_session(
+            self.rec_onnx_session, self.rec_output_name, input_feed=input_feed
+        )
+
+        preds = outputs[0]
+        return self.postprocess_op(preds)
@@ -4,6 +4,7 @@ import cv2
 
 from onnxocr import predict_cls, predict_det, predict_rec
 from onnxocr.logger import get_logger
+from onnxocr.rec_batcher import TextRecognizeBatcher
 from onnxocr.utils import get_minarea_rect_crop, get_rotate_crop_image
 
 log = get_logger("predict_system")
@@ -13,6 +14,15 @@ class TextSystem:
     def __init__(self, args):
         self.text_detector = predict_det.TextDetector(args)
         self.text_recognizer = predict_rec.TextRecognizer(args)
+        # 多个线程同时识别时 文本行合并到一起推理 需要手动开启
+        self.rec_batcher: TextRecognizeBatcher | None = None
+        if args.use_rec_batcher:
+            self.rec_batcher = TextRecognizeBatcher(
+                self.text_recognizer,
+                max_latency_ms=args.rec_batcher_max_latency_ms,
+                max_batch_size=args.rec_batch_num,
+                bucket_width=args.rec_batcher_bucket_width,
+            )
         self.use_angle_cls = args.use_angle_cls
         self.drop_score = args.drop_score
         if self.use_angle_cls:
@@ -34,7 +44,25 @@ class TextSystem:
 
         self.crop_image_res_index += bbox_num
 
+    def recognize(self, img_crop_list):
+        """
+        识别文本行 启用合批时与其他线程的文本行一起推理
+        """
+        if self.rec_batcher is not None:
+            return self.rec_batcher(img_crop_list)
+        return self.text_recognizer(img_crop_list)
+
     def __call__(self, img, cls=True):
+        if self.rec_batcher is None:
+            return self._run(img, cls)
+        # 从文字检测开始登记 合批线程可以等待还在检测的识别
+        self.rec_batcher.add_caller()
+        try:
+            return self._run(img, cls)
+        finally:
+            self.rec_batcher.remove_caller()
+
+    def _run(self, img, cls=True):
         # 文字检测
         dt_boxes = self.text_detector(img)
 
@@ -59,7 +87,7 @@ class TextSystem:
             img_crop_list, angle_list = self.text_classifier(img_crop_list)
 
         # 图像识别
-        rec_res = self.text_recognizer(img_crop_list)
+        rec_res = self.recognize(img_crop_list)
 
         if self.args.save_crop_res:
             self.draw_crop_rec_res(self.args.crop_res_save_dir, img_crop_list, rec_res)
@@ -72,6 +100,64 @@ class TextSystem:
 
         return filter_boxes, filter_rec_res
 
+    def batch_call(self, img_list, cls=True):
+        """
+        多张图片分别检测 所有文本行合并后统一识别
+        识别器内部会按宽高比排序分批 宽度相近的文本行会在同一批次中推理
+        """
+        if self.rec_batcher is None:
+            return self._batch_run(img_list, cls)
+        self.rec_batcher.add_caller()
+        try:
+            return self._batch_run(img_list, cls)
+        finally:
+            self.rec_batcher.remove_caller()
+
+    def _batch_run(self, img_list, cls=True):
+        dt_boxes_list = []
+        crop_idx_list = []  # 每张图片的文本行在 img_crop_list 中的起始下标
+        img_crop_list = []
+
+        # 文字检测 + 图片裁剪
+        for img in img_list:
+            dt_boxes = self.text_detector(img)
+            if dt_boxes is None or len(dt_boxes) == 0:
+                dt_boxes = []
+            else:
+                dt_boxes = sorted_boxes(dt_boxes)
+            dt_boxes_list.append(dt_boxes)
+            crop_idx_list.append(len(img_crop_list))
+
+            for tmp_box in dt_boxes:
+                if self.args.det_box_type == "quad":
+                    img_crop = get_rotate_crop_image(img, tmp_box)
+                else:
+                    img_crop = get_minarea_rect_crop(img, tmp_box)
+                img_crop_list.append(img_crop)
+
+        if len(img_crop_list) == 0:
+            return [([], []) for _ in img_list]
+
+        # 方向分类
+        if self.use_angle_cls and cls:
+            img_crop_list, angle_list = self.text_classifier(img_crop_list)
+
+        # 图像识别 所有图片的文本行一起识别
+        rec_res = self.recognize(img_crop_list)
+
+        result_list = []
+        for dt_boxes, crop_idx in zip(dt_boxes_list, crop_idx_list, strict=True):
+            filter_boxes, filter_rec_res = [], []
+            for bno, box in enumerate(dt_boxes):
+                rec_result = rec_res[crop_idx + bno]
+                text, score = rec_result
+                if score >= self.drop_score:
+                    filter_boxes.append(box)
+                    filter_rec_res.append(rec_result)
+            result_list.append((filter_boxes, filter_rec_res))
+
+        return result_list
+
 
 def sorted_boxes(dt_boxes):
     """
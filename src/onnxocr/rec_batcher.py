@@ -0,0 +1,259 @@
+"""跨调用的文本识别合批。
+
+多个线程同时识别文本时 (例如战斗中的距离识别、战斗结束识别、画面判断) 各自只有少量文本行,
+分别推理会产生很多次小批量的模型调用。这里把所有线程提交的文本行在一个很短的时间窗口内收集起来,
+按补齐后的宽度分桶 每个桶进行一次推理 再通过 Future 把结果分发回各个调用方。
+
+宽度分桶后 同一个桶内的文本行补齐到相同宽度 模型输入的形状种类也会变少。
+
+调用方从文字检测开始就登记为进行中的识别 (add_caller / remove_caller):
+- 没有其它进行中的识别时 直接调用识别器 不经过合批线程 不会增加等待;
+- 否则提交到合批线程 合批线程在时间窗口内等待其它进行中的识别提交文本行,
+  所有进行中的识别都已提交 (或批次已满) 时马上开始推理。
+"""
+from __future__ import annotations
+
+import math
+import threading
+import time
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING
+
+import numpy as np
+
+from one_dragon.utils import gpu_executor
+from onnxocr.logger import get_logger
+
+if TYPE_CHECKING:
+    from onnxocr.predict_rec import TextRecognizer
+
+log = get_logger("rec_batcher")
+
+
+@dataclass
+class _RecRequest:
+    """一次识别请求"""
+
+    img_list: list  # 文本行图片
+    future: Future = field(default_factory=Future)
+
+
+class TextRecognizeBatcher:
+
+    def __init__(
+        self,
+        recognizer: TextRecognizer,
+        max_latency_ms: float = 2,
+        max_batch_size: int = 6,
+        bucket_width: int = 160,
+    ):
+        """
+        文本识别的合批前端
+        :param recognizer: 文本识别器
+        :param max_latency_ms: 收到第一个请求后 最多等待多久再开始推理
+        :param max_batch_size: 一次推理最多包含的文本行数量 收集到这么多文本行时不再等待 一般使用 rec_batch_num
+        :param bucket_width: 宽度分桶的步长 同一个桶内的文本行补齐到桶的宽度
+        """
+        self.recognizer: TextRecognizer = recognizer
+        self.max_latency: float = max(0.0, max_latency_ms) / 1000.0
+        self.max_batch_size: int = max(1, max_batch_size)
+        self.bucket_width: int = max(1, bucket_width)
+
+        self._condition = threading.Condition()
+        self._request_list: list[_RecRequest] = []
+        self._pending_img_cnt: int = 0
+        self._caller_cnt: int = 0  # 进行中的识别数量 包括还在文字检测的
+        self._direct_cnt: int = 0  # 直接调用识别器的数量
+        self._processing_cnt: int = 0  # 合批线程正在推理的请求数量
+        self._worker: threading.Thread | None = None
+        self._running: bool = False
+
+        # 统计 用于观察合批效果
+        self.request_cnt: int = 0  # 收到的请求数量
+        self.img_cnt: int = 0  # 识别的文本行数量
+        self.infer_cnt: int = 0  # 模型推理次数
+
+    def submit(self, img_list: list) -> Future:
+        """
+        提交一组文本行
+        :param img_list: 文本行图片
+        :return: 识别结果的 Future 结果与 TextRecognizer 的返回值格式相同
+        """
+        request = _RecRequest(img_list=list(img_list))
+        if len(request.img_list) == 0:
+            request.future.set_result([])
+            return request.future
+
+        with self._condition:
+            if not self._running:
+                self._start_worker()
+            self._request_list.append(request)
+            self._pending_img_cnt += len(request.img_list)
+            self.request_cnt += 1
+            self._condition.notify_all()
+
+        return request.future
+
+    def add_caller(self) -> None:
+        """
+        登记一个进行中的识别 在文字检测前调用 之后需要调用 remove_caller
+        """
+        with self._condition:
+            self._caller_cnt += 1
+
+    def remove_caller(self) -> None:
+        """
+        结束一个进行中的识别
+        """
+        with self._condition:
+            self._caller_cnt -= 1
+            self._condition.notify_all()
+
+    def __call__(self, img_list: list) -> list:
+        """
+        同步识别 与 TextRecognizer 的调用方式相同
+        :param img_list: 文本行图片
+        :return: 每张图片的识别结果
+        """
+        if gpu_executor.is_executor_thread():
+            # 在GPU线程中等待合批线程 而合批线程的推理又需要GPU线程 会死锁 因此直接识别
+            return self.recognizer(img_list)
+
+        with self._condition:
+            # 没有其它进行中的识别 也没有等待或正在推理的请求 合批没有收益 直接识别
+            alone = (self._caller_cnt <= 1
+                     and len(self._request_list) == 0
+                     and self._processing_cnt == 0)
+            if alone:
+                self._direct_cnt += 1
+        if not alone:
+            return self.submit(img_list).result()
+
+        try:
+            return self.recognizer(img_list)
+        finally:
+            with self._condition:
+                self._direct_cnt -= 1
+                self._condition.notify_all()
+
+    def stop(self) -> None:
+        """
+        停止合批线程 未处理的请求会在退出前处理完
+        """
+        with self._condition:
+            self._running = False
+            self._condition.notify_all()
+            worker = self._worker
+        if worker is not None and worker is not threading.current_thread():
+            worker.join()
+
+    def _start_worker(self) -> None:
+        """
+        启动合批线程 需要在持有锁时调用
+        """
+        self._running = True
+        self._worker = threading.Thread(target=self._run, name='onnxocr_rec_batcher', daemon=True)
+        self._worker.start()
+
+    def _take_request_list(self) -> list[_RecRequest] | None:
+        """
+        等待并取出一批请求
+        :return: 请求列表 合批线程需要退出时返回None
+        """
+        with self._condition:
+            while self._running and len(self._request_list) == 0:
+                self._condition.wait()
+            if len(self._request_list) == 0:
+                return None
+
+            # 从第一个请求开始 最多等待 max_latency 收集其它进行中的识别的请求
+            deadline = time.perf_counter() + self.max_latency
+            while (self._running
+                   and self._pending_img_cnt < self.max_batch_size
+                   and self._get_expected_caller_cnt() > 0):
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                self._condition.wait(remaining)
+
+            request_list = self._request_list
+            self._request_list = []
+            self._pending_img_cnt = 0
+            self._processing_cnt = len(request_list)
+            return request_list
+
+    def _get_expected_caller_cnt(self) -> int:
+        """
+        还可能提交请求的识别数量 需要在持有锁时调用
+        进行中的识别 减去已经提交的、正在推理的和直接识别的
+        """
+        return self._caller_cnt - len(self._request_list) - self._processing_cnt - self._direct_cnt
+
+    def _run(self) -> None:
+        while True:
+            request_list = self._take_request_list()
+            if request_list is None:
+                break
+            try:
+                self._process(request_list)
+            except Exception as e:
+                log.error("Batch recognition failed: {}", e)
+                for request in request_list:
+                    if not request.future.done():
+                        request.future.set_exception(e)
+            finally:
+                with self._condition:
+                    self._processing_cnt = 0
+
+    def _get_bucket_wh_ratio(self, img) -> float:
+        """
+        文本行所在宽度桶补齐后的宽高比
+        :param img: 文本行图片
+        :return:
+        """
+        _, img_h, img_w = self.recognizer.rec_image_shape[:3]
+        h, w = img.shape[0:2]
+        resized_w = max(img_w, math.ceil(img_h * w / float(h)))
+        bucket_w = math.ceil(resized_w / self.bucket_width) * self.bucket_width
+        return bucket_w / img_h
+
+    def _process(self, request_list: list[_RecRequest]) -> None:
+        """
+        对一批请求进行识别 并分发结果
+        :param request_list: 请求列表
+        """
+        img_list = []
+        for request in request_list:
+            img_list.extend(request.img_list)
+
+        ratio_list = [self._get_bucket_wh_ratio(img) for img in img_list]
+        # 按宽度排序后 相同宽度桶的文本行是连续的
+        indices = np.argsort(np.array(ratio_list), kind='stable')
+        rec_res = [["", 0.0]] * len(img_list)
+
+        beg = 0
+        while beg < len(indices):
+            bucket_ratio = ratio_list[indices[beg]]
+            end = beg + 1
+            while (end < len(indices)
+                   and end - beg < self.max_batch_size
+                   and ratio_list[indices[end]] == bucket_ratio):
+                end += 1
+
+            batch_indices = indices[beg:end]
+            rec_result = self.recognizer.infer_batch(
+                [img_list[i] for i in batch_indices],
+                max_wh_ratio=bucket_ratio,
+            )
+            for i, result in zip(batch_indices, rec_result, strict=True):
+                rec_res[i] = result
+            self.infer_cnt += 1
+            beg = end
+
+        self.img_cnt += len(img_list)
+
+        offset = 0
+        for request in request_list:
+            request.future.set_result(rec_res[offset:offset + len(request.img_list)])
+            offset += len(request.img_list)
@@ -315,6 +315,9 @@ def infer_args():
     parser.add_argument("--rec_image_inverse", type=str2bool, default=True)
     parser.add_argument("--rec_image_shape", type=str, default="3, 48, 320")
     parser.add_argument("--rec_batch_num", type=int, default=6)
+    parser.add_argument("--use_rec_batcher", type=str2bool, default=False)
+    parser.add_argument("--rec_batcher_max_latency_ms", type=float, default=2)
+    parser.add_argument("--rec_batcher_bucket_width", type=int, default=160)
     parser.add_argument("--max_text_length", type=int, default=25)
     parser.add_argument(
         "--rec_char_dict_path",
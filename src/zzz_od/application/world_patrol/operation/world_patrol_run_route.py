@@ -1,3 +1,4 @@
+import math
 import time
 
 from one_dragon.base.geometry.point import Point
@@ -75,6 +76,10 @@ class WorldPatrolRunRoute(ZOperation):
         self.current_idx: int = start_idx
         self.current_pos: Point = Point(0, 0)
 
+        # 运动预测 用于缩小坐标计算的搜索范围
+        self.last_pos_time: float = 0  # 上一次成功计算坐标的截图时间
+        self.move_velocity: tuple[float, float] | None = None  # 上一次估计的移动速度 (像素/秒)
+
         # 智能回溯状态变量
         self.backtrack_active: bool = False  # 是否正在回溯到上一个点位
         self.backtrack_target: Point | None = None  # 回溯目标点
@@ -103,6 +108,10 @@ class WorldPatrolRunRoute(ZOperation):
     # 距离判定阈值（用于到达/回溯成功/卡住判定的统一半径）
     REACH_DISTANCE: int = 10
 
+    # 运动预测的参数
+    PREDICT_MAX_SECONDS: float = 1  # 距离上一次坐标超过这个时间 不使用运动预测
+    PREDICT_BASE_ERROR: int = 20  # 预测坐标的基础误差(像素)
+
     @operation_node(name='初始回到大世界', is_start_node=True)
     def back_at_first(self) -> OperationRoundResult:
         """运行路线前：确保当前在大世界画面，再进行后续传送"""
@@ -134,6 +143,8 @@ class WorldPatrolRunRoute(ZOperation):
         auto_battle_utils.switch_to_best_agent_for_moving(self.ctx)
         self.current_pos = start_pos
         self.route_start_pos = start_pos  # 记录起点
+        self.last_pos_time = 0
+        self.move_velocity = None
         self.ctx.controller.turn_vertical_by_distance(300)
         return self.round_success(wait=1)
 
@@ -230,18 +241,32 @@ class WorldPatrolRunRoute(ZOperation):
             int(self.current_pos.y + move_distance + mini_map_d),
         )
 
-        # 尝试计算当前位置（在估算范围内匹配）
-        next_pos = self.ctx.world_patrol_service.cal_pos(
-            self.current_large_map,
-            mini_map,
-            possible_rect,
-        )
-        if next_pos is not None and not self._is_next_pos_valid(next_pos, move_distance):
-            next_pos = None
+        # 先在运动预测的小范围内匹配 失败再使用保守估算的范围
+        next_pos: Point | None = None
+        predict_rect = self._get_predict_rect(mini_map_d)
+        if predict_rect is not None:
+            next_pos = self.ctx.world_patrol_service.cal_pos(
+                self.current_large_map,
+                mini_map,
+                predict_rect,
+            )
+            if next_pos is not None and not self._is_next_pos_valid(next_pos, move_distance):
+                next_pos = None
+
+        if next_pos is None:
+            # 尝试计算当前位置（在估算范围内匹配）
+            next_pos = self.ctx.world_patrol_service.cal_pos(
+                self.current_large_map,
+                mini_map,
+                possible_rect,
+            )
+            if next_pos is not None and not self._is_next_pos_valid(next_pos, move_distance):
+                next_pos = None
 
         if next_pos is None:
             # 处理无法计算坐标的情况
             no_pos_seconds = 0 if self.no_pos_start_time == 0 else self.last_screenshot_time - self.no_pos_start_time
+            self.move_velocity = None  # 坐标中断后 之前的速度不再可信
             if self.no_pos_start_time == 0:
                 # 首次进入无坐标态，记录起始时间
                 self.no_pos_start_time = self.last_screenshot_time
@@ -267,9 +292,49 @@ class WorldPatrolRunRoute(ZOperation):
             if self._process_stuck_with_pos(next_pos):
                 return self.round_fail(status='有坐标但卡住，重启当前路线')
 
+            self._update_move_velocity(next_pos)
             self.current_pos = next_pos
             return None
 
+    def _get_predict_rect(self, mini_map_d: int) -> Rect | None:
+        """
+        根据上一次的坐标和移动速度 预测本次坐标 返回预测坐标附近的搜索范围
+        :param mini_map_d: 小地图直径
+        :return: 搜索范围 没有可用的速度时返回None
+        """
+        if self.move_velocity is None or self.last_pos_time == 0:
+            return None
+        past_seconds = self.last_screenshot_time - self.last_pos_time
+        if past_seconds <= 0 or past_seconds > self.PREDICT_MAX_SECONDS:
+            return None
+
+        vx, vy = self.move_velocity
+        predict_x = self.current_pos.x + vx * past_seconds
+        predict_y = self.current_pos.y + vy * past_seconds
+        # 预测误差随移动距离增加
+        radius = mini_map_d + self.PREDICT_BASE_ERROR + math.hypot(vx, vy) * past_seconds * 0.5
+        return Rect(
+            int(predict_x - radius),
+            int(predict_y - radius),
+            int(predict_x + radius),
+            int(predict_y + radius),
+        )
+
+    def _update_move_velocity(self, next_pos: Point) -> None:
+        """
+        成功计算坐标后 更新移动速度的估计
+        :param next_pos: 本次计算的坐标
+        """
+        past_seconds = self.last_screenshot_time - self.last_pos_time
+        if self.last_pos_time == 0 or past_seconds <= 0 or past_seconds > self.PREDICT_MAX_SECONDS:
+            self.move_velocity = None
+        else:
+            self.move_velocity = (
+                (next_pos.x - self.current_pos.x) / past_seconds,
+                (next_pos.y - self.current_pos.y) / past_seconds,
+            )
+        self.last_pos_time = self.last_screenshot_time
+
     def _is_next_pos_valid(self, next_pos: Point, move_distance: float) -> bool:
         """
         判断匹配的下一个坐标是否合法
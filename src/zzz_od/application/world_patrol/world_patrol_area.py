@@ -1,6 +1,7 @@
 import os
 from functools import cached_property
 
+import cv2
 from cv2.typing import MatLike
 
 from one_dragon.base.geometry.point import Point
@@ -81,6 +82,39 @@ class WorldPatrolLargeMap:
         self.road_mask: MatLike = road_mask
         self.icon_list: list[WorldPatrolLargeMapIcon] = icon_list
 
+        # 道路掩码的金字塔 下标i为缩小 2^(i+1) 倍的图
+        self._road_mask_pyramid: list[MatLike] = []
+        self._road_mask_pyramid_source: MatLike | None = None
+
+    def get_road_mask_pyramid(self, level: int) -> MatLike:
+        """
+        获取缩小后的道路掩码 用于粗匹配
+        道路掩码被替换后会重新计算
+
+        Args:
+            level: 金字塔层级 缩小 2^level 倍 0为原图
+
+        Returns:
+            MatLike: 缩小后的道路掩码
+        """
+        if level <= 0:
+            return self.road_mask
+
+        if self._road_mask_pyramid_source is not self.road_mask:
+            self._road_mask_pyramid = []
+            self._road_mask_pyramid_source = self.road_mask
+
+        while len(self._road_mask_pyramid) < level:
+            last = self.road_mask if len(self._road_mask_pyramid) == 0 else self._road_mask_pyramid[-1]
+            # INTER_AREA 保留道路的覆盖比例 比直接取点更适合匹配
+            self._road_mask_pyramid.append(cv2.resize(
+                last,
+                (max(1, last.shape[1] // 2), max(1, last.shape[0] // 2)),
+                interpolation=cv2.INTER_AREA,
+            ))
+
+        return self._road_mask_pyramid[level - 1]
+
     def to_dict(self) -> dict:
         return {
             'area_full_id': self.area_full_id,
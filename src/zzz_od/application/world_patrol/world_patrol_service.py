@@ -56,6 +56,12 @@ class WorldPatrolService:
         self._mini_map_rect: Rect | None = None
         self._mini_map_screen_name: str | None = None
 
+        # 道路掩码金字塔匹配的参数
+        self.road_pyramid_max_level: int = 2  # 最多缩小 2^level 倍
+        self.road_pyramid_min_template_size: int = 32  # 缩小后小地图的最小边长
+        self.road_pyramid_min_search_size: int = 64 * 64  # 搜索位置数量超过这个值时才使用金字塔
+        self.road_pyramid_candidate_cnt: int = 3  # 粗匹配保留的候选位置数量
+
     def cut_mini_map(self, screen: MatLike) -> MiniMapWrapper:
         return self.cut_mini_map_with_dynamic_rect(screen)[0]
 
@@ -175,6 +181,8 @@ class WorldPatrolService:
                 ))
 
             lm = WorldPatrolLargeMap(area.full_id, road_mask, icon_list)
+            # 加载时就计算好金字塔 避免第一次定位时卡顿
+            lm.get_road_mask_pyramid(self.road_pyramid_max_level)
             self.large_map_list.append(lm)
 
     def get_area_list_by_entry(self, entry: WorldPatrolEntry) -> list[WorldPatrolArea]:
@@ -507,24 +515,18 @@ class WorldPatrolService:
 
         # 找到小地图能匹配哪些图标
         mm_icon_list: list[tuple[str, Point]] = []
-        for icon_template_id in lm_icon_set:
-            template = self.ctx.template_loader.get_template('map', icon_template_id)
-            if template is None:
-                break
-
-            mrl = cv2_utils.match_template(
-                source=mini_map.rgb,
-                template=template.raw,
-                mask=template.mask,
-                threshold=0.7,
-                only_best=False,
-                ignore_inf=True
-            )
+        icon_template_id_list: list[str] = list(lm_icon_set)
+        mrl_list = self.ctx.tm.match_many(
+            mini_map.rgb,
+            [('map', icon_template_id) for icon_template_id in icon_template_id_list],
+            threshold=0.7,
+            only_best=False,
+            ignore_inf=True,
+        )
+        for icon_template_id, mrl in zip(icon_template_id_list, mrl_list, strict=True):
             for mr in mrl:
                 # 计算图标中心点坐标
-                center_x = mr.left_top.x + template.raw.shape[1] // 2
-                center_y = mr.left_top.y + template.raw.shape[0] // 2
-                mm_icon_list.append((template.template_id, Point(center_x, center_y)))
+                mm_icon_list.append((icon_template_id, mr.center))
 
         # 使用小坐标来匹配
         match_list: list[MatchResult] = []
@@ -596,6 +598,11 @@ class WorldPatrolService:
         source, rect = cv2_utils.crop_image(large_map.road_mask, lm_rect)
         template = mini_map.road_mask
 
+        level = 0 if rect is None else self._get_road_pyramid_level(source, template)
+        if level > 0:
+            mr = self._match_road_by_pyramid(large_map, template, rect, level)
+            return None if mr is None else mr.center
+
         mrl = cv2_utils.match_template(
             source=source,
             template=template,
@@ -607,3 +614,97 @@ class WorldPatrolService:
             mrl.add_offset(rect.left_top)
 
         return None if mrl.max is None else mrl.max.center
+
+    def _get_road_pyramid_level(self, source: MatLike, template: MatLike) -> int:
+        """
+        根据搜索范围和小地图大小 选择粗匹配使用的金字塔层级
+        搜索范围较小时 直接在原图匹配更快
+
+        Args:
+            source: 大地图上的搜索范围
+            template: 小地图道路掩码
+
+        Returns:
+            int: 金字塔层级 0代表不使用金字塔
+        """
+        sh, sw = source.shape[:2]
+        th, tw = template.shape[:2]
+        if sh < th or sw < tw:
+            return 0
+        if (sh - th + 1) * (sw - tw + 1) < self.road_pyramid_min_search_size:
+            return 0
+
+        level = 0
+        while (
+                level < self.road_pyramid_max_level
+                and min(th, tw) // (2 ** (level + 1)) >= self.road_pyramid_min_template_size
+        ):
+            level += 1
+        return level
+
+    def _match_road_by_pyramid(
+            self,
+            large_map: WorldPatrolLargeMap,
+            template: MatLike,
+            rect: Rect,
+            level: int,
+    ) -> MatchResult | None:
+        """
+        道路掩码的金字塔匹配
+        先在缩小的大地图上找出几个候选位置 再在原图的小窗口内精匹配
+
+        Args:
+            large_map: 大地图
+            template: 小地图道路掩码
+            rect: 大地图上的搜索范围 需在大地图范围内
+            level: 金字塔层级
+
+        Returns:
+            MatchResult | None: 匹配结果 坐标为大地图坐标
+        """
+        scale = 2 ** level
+        small_map = large_map.get_road_mask_pyramid(level)
+        small_source = small_map[
+                       rect.y1 // scale:rect.y2 // scale,
+                       rect.x1 // scale:rect.x2 // scale
+                       ]
+        th, tw = template.shape[:2]
+        small_template = cv2.resize(template, (tw // scale, th // scale), interpolation=cv2.INTER_AREA)
+        if small_source.shape[0] < small_template.shape[0] or small_source.shape[1] < small_template.shape[1]:
+            return None
+
+        coarse = cv2.matchTemplate(small_source, small_template, cv2.TM_CCOEFF_NORMED)
+        coarse[~np.isfinite(coarse)] = -1
+
+        # 道路形状相似的位置可能有多个 保留几个峰值分别精匹配
+        suppress_w = max(1, small_template.shape[1] // 4)
+        suppress_h = max(1, small_template.shape[0] // 4)
+        best_mr: MatchResult | None = None
+        for _ in range(self.road_pyramid_candidate_cnt):
+            _, coarse_max, _, coarse_loc = cv2.minMaxLoc(coarse)
+            if coarse_max < 0:
+                break
+            cx, cy = coarse_loc
+            coarse[max(0, cy - suppress_h):cy + suppress_h + 1, max(0, cx - suppress_w):cx + suppress_w + 1] = -1
+
+            # 粗匹配位置映射回原图 窗口向外多扩展一个缩放倍数
+            pad = scale * 2
+            x1 = max(rect.x1, (rect.x1 // scale + cx) * scale - pad)
+            y1 = max(rect.y1, (rect.y1 // scale + cy) * scale - pad)
+            x2 = min(rect.x2, x1 + tw + pad * 2)
+            y2 = min(rect.y2, y1 + th + pad * 2)
+            window = large_map.road_mask[y1:y2, x1:x2]
+            mrl = cv2_utils.match_template(
+                source=window,
+                template=template,
+                threshold=0.1,
+                ignore_inf=True,
+            )
+            mr = mrl.max
+            if mr is None:
+                continue
+            mr.add_offset(Point(x1, y1))
+            if best_mr is None or mr.confidence > best_mr.confidence:
+                best_mr = mr
+
+        return best_mr
@@ -498,11 +498,14 @@ class AutoBattleAgentContext:
                 else:
                     priority_list[1].append((agent, t_id))
 
-        # 按优先级进行匹配
+        # 按优先级进行匹配 同一优先级的模板都要比较匹配度 一起匹配 共用缩小后原图的粗匹配排除
         for agent_template_list in priority_list:
-            for agent, template_id in agent_template_list:
-                template_name = prefix + template_id
-                mrl = self.ctx.tm.match_template(img, "battle", template_name, threshold=0.8)
+            mrl_list = self.ctx.tm.match_many(
+                img,
+                [("battle", prefix + template_id) for _, template_id in agent_template_list],
+                threshold=0.8,
+            )
+            for (agent, template_id), mrl in zip(agent_template_list, mrl_list, strict=True):
                 if mrl.max is None:
                     continue
                 if mrl.max.confidence < best_confidence:
@@ -12,6 +12,7 @@ from cv2.typing import MatLike
 from one_dragon.base.conditional_operation.state_recorder import StateRecord
 from one_dragon.base.matcher.match_result import MatchResult
 from one_dragon.base.screen import screen_utils
+from one_dragon.base.screen.region_change_detector import RegionChangeDetector
 from one_dragon.base.screen.screen_area import ScreenArea
 from one_dragon.base.screen.screen_utils import FindAreaResultEnum
 from one_dragon.utils import cal_utils, cv2_utils, gpu_executor, str_utils, thread_utils
@@ -81,6 +82,11 @@ class AutoBattleContext:
         self.without_distance_times: int = 0  # 没有显示距离的次数
         self.with_distance_times: int = 0  # 有显示距离的次数
 
+        # 识别区域没有变化时 跳过识别 复用上一次的状态记录
+        self.region_change_detector: RegionChangeDetector = RegionChangeDetector()
+        # 距离显示区域很大 距离文本只占其中一小部分 需要更精细的签名才能发现数字的变化
+        self.distance_change_detector: RegionChangeDetector = RegionChangeDetector(thumbnail_size=128, diff_threshold=2)
+
         # 自动释放终结技开关
         self.auto_ultimate_enabled: bool = True  # 是否在终结技可用时自动释放
 
@@ -203,6 +209,8 @@ class AutoBattleContext:
         self.without_distance_times: int = 0  # 没有显示距离的次数
         self.with_distance_times: int = 0  # 有显示距离的次数
         self.last_check_distance = -1
+        self.region_change_detector.clear()
+        self.distance_change_detector.clear()
 
     def init_screen_area(self) -> None:
         """
@@ -551,59 +559,65 @@ class AutoBattleContext:
         """
         in_battle = self.is_normal_attack_btn_available(screen)
         self.last_check_in_battle = in_battle
-        if in_battle:
-            self.state_record_service.update_state(
-                StateRecord(BattleStateEnum.STATUS_NORMAL_ATTACK_READY.value, screenshot_time))
-        else:
-            # 离开战斗(普攻按钮消失):立即清状态,不依赖默认时间窗口在战后自然失效,
-            # 避免战后残留的"按键可用"让 速切模板-通用 兜底继续发普攻(#2157)
-            self.state_record_service.update_state(
-                StateRecord(BattleStateEnum.STATUS_NORMAL_ATTACK_READY.value, is_clear=True))
 
+        # 同一帧的状态合并后统一更新 操作器只需要处理一次
+        # 识别较慢的OCR (距离、战斗结束) 不加入 避免拖慢其它状态
+        # 闪避最需要及时响应 也不加入 识别到后马上更新 不等待这一帧其它较慢的识别
+        frame = self.state_record_service.begin_frame(screenshot_time)
         future_list: list[Future] = []
-
-        # 统一提交检测任务
-        if in_battle:
-            # 闪避相关
-            audio_future = _battle_state_check_executor.submit(self.dodge_context.check_dodge_audio, screenshot_time)
-            future_list.append(audio_future)
-            if self.ctx.model_config.flash_classifier_gpu:
-                future_list.append(gpu_executor.submit(self.dodge_context.check_dodge_flash, screen, screenshot_time, audio_future))
+        try:
+            if in_battle:
+                frame.add_records([StateRecord(BattleStateEnum.STATUS_NORMAL_ATTACK_READY.value, screenshot_time)])
             else:
-                future_list.append(_battle_state_check_executor.submit(self.dodge_context.check_dodge_flash, screen, screenshot_time, audio_future))
+                # 离开战斗(普攻按钮消失):立即清状态,不依赖默认时间窗口在战后自然失效,
+                # 避免战后残留的"按键可用"让 速切模板-通用 兜底继续发普攻(#2157)
+                frame.add_records([StateRecord(BattleStateEnum.STATUS_NORMAL_ATTACK_READY.value, is_clear=True)])
+
+            # 统一提交检测任务
+            if in_battle:
+                # 闪避相关
+                audio_future = _battle_state_check_executor.submit(self.dodge_context.check_dodge_audio, screenshot_time)
+                future_list.append(audio_future)
+                if self.ctx.model_config.flash_classifier_gpu:
+                    future_list.append(gpu_executor.submit(self.dodge_context.check_dodge_flash, screen, screenshot_time, audio_future))
+                else:
+                    future_list.append(_battle_state_check_executor.submit(self.dodge_context.check_dodge_flash, screen, screenshot_time, audio_future))
 
-            # 角色状态
-            future_list.append(_battle_state_check_executor.submit(self.agent_context.check_agent_related, screen, screenshot_time))
+                # 角色状态
+                future_list.append(frame.submit(_battle_state_check_executor, self.agent_context.check_agent_related, screen, screenshot_time))
 
-            # 目标状态
-            future_list.append(_battle_state_check_executor.submit(self.target_context.run_all_checks, screen, screenshot_time))
+                # 目标状态
+                # 不做区域变化检测: 识别区域由各个检测任务的 pipeline 决定 并且任务各自有间隔 会按结果动态调整间隔
+                future_list.append(frame.submit(_battle_state_check_executor, self.target_context.run_all_checks, screen, screenshot_time))
 
-            # 快速支援
-            future_list.append(_battle_state_check_executor.submit(self.check_quick_assist, screen, screenshot_time))
-            future_list.append(_battle_state_check_executor.submit(self.check_switch_backup, screen, screenshot_time))
+                # 快速支援
+                future_list.append(frame.submit(_battle_state_check_executor, self.check_quick_assist, screen, screenshot_time))
+                future_list.append(frame.submit(_battle_state_check_executor, self.check_switch_backup, screen, screenshot_time))
 
-            # 距离
-            if check_distance:
-                if self.ctx.model_config.ocr_use_gpu:
-                    future_list.append(gpu_executor.submit(self._check_distance_with_lock, screen, screenshot_time))
-                else:
-                    future_list.append(_battle_state_check_executor.submit(self._check_distance_with_lock, screen, screenshot_time))
-        else:
-            # 连携
-            future_list.append(_battle_state_check_executor.submit(self.check_chain_attack, screen, screenshot_time))
-
-            # 战斗结束
-            check_battle_end = check_battle_end_normal_result or check_battle_end_hollow_result or check_battle_end_defense_result
-            if check_battle_end:
-                if self.ctx.model_config.ocr_use_gpu:
-                    executor = gpu_executor
-                else:
-                    executor = _battle_state_check_executor
-                future_list.append(executor.submit(
-                    self._check_battle_end,
-                    screen, screenshot_time,
-                    check_battle_end_normal_result, check_battle_end_hollow_result, check_battle_end_defense_result
-                ))
+                # 距离
+                if check_distance:
+                    if self.ctx.model_config.ocr_use_gpu:
+                        future_list.append(gpu_executor.submit(self._check_distance_with_lock, screen, screenshot_time))
+                    else:
+                        future_list.append(_battle_state_check_executor.submit(self._check_distance_with_lock, screen, screenshot_time))
+            else:
+                # 连携
+                future_list.append(frame.submit(_battle_state_check_executor, self.check_chain_attack, screen, screenshot_time))
+
+                # 战斗结束
+                check_battle_end = check_battle_end_normal_result or check_battle_end_hollow_result or check_battle_end_defense_result
+                if check_battle_end:
+                    if self.ctx.model_config.ocr_use_gpu:
+                        executor = gpu_executor
+                    else:
+                        executor = _battle_state_check_executor
+                    future_list.append(executor.submit(
+                        self._check_battle_end,
+                        screen, screenshot_time,
+                        check_battle_end_normal_result, check_battle_end_hollow_result, check_battle_end_defense_result
+                    ))
+        finally:
+            frame.close()
 
         # 统一处理结果
         for future in future_list:
@@ -775,19 +789,27 @@ class AutoBattleContext:
                 return
             self._last_check_quick_time = screenshot_time
 
-            part = cv2_utils.crop_image_only(screen, self.area_btn_switch.rect)
-
             possible_agents = self.agent_context.get_possible_agent_list()
 
+            # 可能的角色不同时 同一画面的识别结果也可能不同 需要作为检测键的一部分
+            region_key = '快速支援-' + ','.join(f'{agent.agent_name}:{template_id}' for agent, template_id in possible_agents)
+            region_signature = self.region_change_detector.cal_signature(screen, [self.area_btn_switch.rect])
+            if self._reuse_unchanged_region_records(region_key, region_signature, screenshot_time):
+                return
+
+            part = cv2_utils.crop_image_only(screen, self.area_btn_switch.rect)
+
             agent = self._match_quick_assist_agent_in(part, possible_agents)
 
+            state_records: list[StateRecord] = []
             if agent is not None:
-                state_records: list[StateRecord] = [
+                state_records = [
                     StateRecord(f'快速支援-{agent.agent_name}', screenshot_time),
                     StateRecord(f'快速支援-{agent.agent_type.value}', screenshot_time),
                     StateRecord(BattleStateEnum.STATUS_QUICK_ASSIST_READY.value, screenshot_time),
                 ]
                 self.state_record_service.batch_update_states(state_records)
+            self.region_change_detector.update(region_key, region_signature, state_records)
         except Exception:
             log.error('识别快速支援失败', exc_info=True)
         finally:
@@ -806,15 +828,46 @@ class AutoBattleContext:
                 return
             self._last_check_switch_backup_time = screenshot_time
 
+            region_signature = self.region_change_detector.cal_signature(
+                screen,
+                [self.area_btn_switch_backup_mark.rect, self.area_btn_switch_backup_gray.rect],
+            )
+            if self._reuse_unchanged_region_records('切换后援', region_signature, screenshot_time):
+                return
+
+            state_records: list[StateRecord] = []
             if self._is_switch_backup_ready(screen):
-                self.state_record_service.update_state(
-                    StateRecord(BattleStateEnum.STATUS_SWITCH_BACKUP_READY.value, screenshot_time)
-                )
+                state_records = [StateRecord(BattleStateEnum.STATUS_SWITCH_BACKUP_READY.value, screenshot_time)]
+                self.state_record_service.batch_update_states(state_records)
+            self.region_change_detector.update('切换后援', region_signature, state_records)
         except Exception:
             log.error('识别切换后援失败', exc_info=True)
         finally:
             self._check_switch_backup_lock.release()
 
+    def _reuse_unchanged_region_records(self, key: str, region_signature: np.ndarray, screenshot_time: float) -> bool:
+        """
+        识别区域与上一次实际识别时没有变化的话 直接使用上一次的状态记录 并更新为本次截图时间
+
+        Args:
+            key: 识别名称
+            region_signature: 本次截图的区域签名
+            screenshot_time: 截图时间
+
+        Returns:
+            bool: 是否复用了上一次的结果 是的话无需再识别
+        """
+        unchanged, last_state_records = self.region_change_detector.get_unchanged_result(key, region_signature)
+        if not unchanged:
+            return False
+
+        if len(last_state_records) > 0:
+            self.state_record_service.batch_update_states([
+                StateRecord(i.state_name, screenshot_time, value=i.value)
+                for i in last_state_records
+            ])
+        return True
+
     def _is_switch_backup_ready(self, screen: MatLike) -> bool:
         """
         通过后援按钮标记与灰度区域的颜色特征，判断当前是否可切换后援。
@@ -966,7 +1019,15 @@ class AutoBattleContext:
 
             self._last_check_distance_time = screenshot_time
 
-            self.check_battle_distance(screen)
+            region_signature = self.distance_change_detector.cal_signature(screen, [self._check_distance_area.rect])
+            unchanged, last_result = self.distance_change_detector.get_unchanged_result('距离', region_signature)
+            if unchanged:
+                # 区域没有变化 OCR结果必然相同 只需要更新识别次数等记录
+                self._update_distance_result(*last_result)
+                return
+
+            mr = self.check_battle_distance(screen)
+            self.distance_change_detector.update('距离', region_signature, (mr, self.last_check_distance))
         except Exception:
             log.error('识别距离失败', exc_info=True)
         finally:
@@ -1018,6 +1079,17 @@ class AutoBattleContext:
                 # 选离中间最近的
                 mr = tmp_mr
 
+        self._update_distance_result(mr, distance)
+
+        return mr
+
+    def _update_distance_result(self, mr: MatchResult | None, distance: float | None) -> None:
+        """
+        根据距离的识别结果 更新识别次数和识别间隔
+        :param mr: 识别到的距离
+        :param distance: 最后一次识别的距离
+        :return:
+        """
         if mr is not None:
             self.without_distance_times = 0
             self.with_distance_times += 1
@@ -1029,8 +1101,6 @@ class AutoBattleContext:
             self.last_check_distance = -1
             self._check_distance_interval = 5
 
-        return mr
-
     def is_normal_attack_btn_available(self, screen: MatLike) -> bool:
         """
         识别普通攻击按钮是否存在 用了粗略判断是否在战斗画面 2~3ms
@@ -10,8 +10,8 @@ from typing import TYPE_CHECKING
 import librosa
 import numpy as np
 from cv2.typing import MatLike
-from scipy.signal import butter, correlate, filtfilt
-from sklearn.preprocessing import scale
+from scipy import fft as sp_fft
+from scipy.signal import butter, sosfilt
 
 from one_dragon.base.conditional_operation.state_recorder import StateRecord
 from one_dragon.base.operation.context_notify_event import ContextNotifyEvent
@@ -31,6 +31,8 @@ _dodge_check_executor = ThreadPoolExecutor(thread_name_prefix='od_dodge_check',
 class AudioRecorder:
     """
     音频录制类，用于录制和处理音频数据。
+
+    录制到的音频块逐块经过高通滤波后 写入固定长度的环形缓冲区 不再整体移动数组。
     """
 
     def __init__(self, error_callback: Callable[[RuntimeError], None] | None = None):
@@ -42,23 +44,36 @@ class AudioRecorder:
         self._used_channel = 2  # 使用的音频通道数
         self._sample_len = 0.01  # 每次采样的长度（秒）
         self._chunk_size = int(self._sample_rate * self._sample_len)  # 每个音频块的大小
+        self.window_size: int = int(self._sample_rate // 2)  # 保留最近0.5秒的音频
 
         self.trigger_threshold = 0.1  # 触发阈值
 
         self._filter_degree = 4  # 四阶bathworth多项式, 越大阻带区域滤波程度越大
         self._cut_off = 1000  # Hz,截止频率,对该频率一下的声音进行滤波,若需要识别人声可适当降低
 
-        # Butterworth高通滤波
-        self.filter_b, self.filter_a = butter(
+        # Butterworth高通滤波 串联两次 幅频响应与原来的 filtfilt 相同 但可以逐块滤波
+        sos = butter(
             self._filter_degree,
             self._cut_off,
             btype='highpass',
-            output='ba',
+            output='sos',
             fs=self._sample_rate
         )
+        self.filter_sos: np.ndarray = np.vstack([sos, sos])
+        self._filter_zi: np.ndarray = np.zeros((self.filter_sos.shape[0], 2))  # 滤波器状态 跨音频块保留
 
-        self.latest_audio = np.empty(shape=(0,), dtype=np.float64)  # 存储最新的音频数据
         self._update_audio_lock = threading.Lock()
+        self._buffer: np.ndarray = np.zeros(self.window_size, dtype=np.float64)  # 滤波后音频的环形缓冲区
+        self.total_cnt: int = 0  # 累计写入的采样数 第i个采样位于缓冲区的 i % window_size
+
+    @property
+    def latest_audio(self) -> np.ndarray:
+        """
+        最近0.5秒滤波后的音频 按时间顺序排列 会复制数据
+        """
+        with self._update_audio_lock:
+            idx = self.total_cnt % self.window_size
+            return np.concatenate([self._buffer[idx:], self._buffer[:idx]])
 
     def start_running_async(self) -> None:
         """
@@ -70,7 +85,9 @@ class AudioRecorder:
 
             self.running = True
 
-        self.latest_audio = np.zeros(int(self._sample_rate // 2))  # 初始化音频数据缓冲区，长度为0.5秒
+        with self._update_audio_lock:
+            self._filter_zi = np.zeros((self.filter_sos.shape[0], 2))
+        self.clear_audio()
         future = _dodge_check_executor.submit(self._record_loop)
         future.add_done_callback(thread_utils.handle_future_result)
 
@@ -97,10 +114,7 @@ class AudioRecorder:
                     else:
                         stream_data = stream_data.T
 
-                    with self._update_audio_lock:
-                        # 更新 latest_audio
-                        self.latest_audio[:-len(stream_data)] = self.latest_audio[len(stream_data):]
-                        self.latest_audio[-len(stream_data):] = stream_data
+                    self.write_audio(stream_data)
         except RuntimeError as e:
             log.warning('音频录制异常，已停止声音闪避识别', exc_info=True)
             if self._error_callback is not None:
@@ -108,6 +122,28 @@ class AudioRecorder:
         finally:
             self.running = False
 
+    def write_audio(self, stream_data: np.ndarray) -> None:
+        """
+        滤波后写入一个音频块
+        :param stream_data: 单声道音频块
+        """
+        stream_data = np.ravel(stream_data)
+        if stream_data.size == 0:
+            return
+
+        with self._update_audio_lock:
+            filtered, self._filter_zi = sosfilt(self.filter_sos, stream_data, zi=self._filter_zi)
+            self.total_cnt += len(filtered)
+            if len(filtered) > self.window_size:
+                filtered = filtered[-self.window_size:]
+
+            # 写入位置跨过缓冲区末尾时 分两段写入
+            idx = (self.total_cnt - len(filtered)) % self.window_size
+            first_len = min(len(filtered), self.window_size - idx)
+            self._buffer[idx:idx + first_len] = filtered[:first_len]
+            if first_len < len(filtered):
+                self._buffer[:len(filtered) - first_len] = filtered[first_len:]
+
     def stop_running(self) -> None:
         """
         停止音频录制。
@@ -119,7 +155,68 @@ class AudioRecorder:
         清楚当前录音
         """
         with self._update_audio_lock:
-            self.latest_audio = np.zeros(int(self._sample_rate // 2))
+            self._buffer[:] = 0
+
+
+class AudioStreamMatcher:
+    """
+    音频模板与最近0.5秒录音的匹配。
+
+    结果与原来的 correlate(..., mode='same', method='fft') 一致:
+    - 模板比录音长时 以模板为基准取 'same' 的范围 结果除以模板长度;
+    - 否则以录音为基准取 'same' 的范围 结果除以录音长度。
+    使用完整的模板 标准化后的模板频谱预先计算 每次匹配只需要对录音做一次FFT。
+    """
+
+    def __init__(self, template: np.ndarray, window_size: int):
+        """
+        :param template: 已滤波的音频模板
+        :param window_size: 录音缓冲区的长度
+        """
+        self.window_size: int = window_size
+
+        # 标准化 与原来的 sklearn scale(with_mean=False) 一致
+        std = float(np.std(template))
+        self.template: np.ndarray = template / (std if std > 0 else 1)
+        self.template_len: int = len(self.template)
+
+        # 完整互相关的长度 下标i对应模板起点对齐录音的第 i - (template_len - 1) 个采样
+        self._full_len: int = self.template_len + window_size - 1
+        self._fft_size: int = sp_fft.next_fast_len(self._full_len, real=True)
+        self._template_fft: np.ndarray = np.conj(sp_fft.rfft(self.template, self._fft_size))
+
+        # 'same' 模式保留的范围 长度与较长的一方相同 在完整结果中居中
+        if self.template_len > window_size:
+            same_len = self.template_len
+            # 以模板为基准时 完整结果的方向相反
+            same_begin = self._full_len - (self._full_len - same_len) // 2 - same_len
+        else:
+            same_len = window_size
+            same_begin = (self._full_len - same_len) // 2
+        self._same_begin: int = same_begin
+        self._same_end: int = same_begin + same_len
+        self._norm: int = same_len
+
+    def match(self, recorder: AudioRecorder) -> float:
+        """
+        计算模板与最近0.5秒音频的最大相关性
+        :param recorder: 音频录制器
+        :return: 最大相关性系数
+        """
+        return self.match_audio(recorder.latest_audio)
+
+    def match_audio(self, audio: np.ndarray) -> float:
+        """
+        计算模板与一段已滤波音频的最大相关性
+        :param audio: 已滤波的音频 长度为录音缓冲区的长度
+        :return: 最大相关性系数
+        """
+        std = float(np.std(audio))
+        circular = sp_fft.irfft(sp_fft.rfft(audio, self._fft_size) * self._template_fft, self._fft_size)
+        # 循环互相关 负的对齐位置在末尾 拼接为完整互相关
+        full = np.concatenate([circular[self._fft_size - self.template_len + 1:], circular[:self.window_size]])
+        max_score = float(np.max(full[self._same_begin:self._same_end]))
+        return max_score / ((std if std > 0 else 1) * self._norm)
 
 
 class YoloStateEventEnum(Enum):
@@ -142,6 +239,7 @@ class AutoBattleDodgeContext:
         self._flash_model: FlashClassifier | None = None  # 闪避分类器
         self._audio_recorder: AudioRecorder = AudioRecorder(self._on_audio_record_error)  # 音频录制器
         self._audio_template: np.ndarray | None = None  # 音频模板
+        self._audio_matcher: AudioStreamMatcher | None = None  # 音频模板的流式匹配
 
         # 识别锁，保证每种类型只有一个实例在进行识别
         self._check_dodge_flash_lock = threading.Lock()
@@ -217,6 +315,7 @@ class AutoBattleDodgeContext:
         ), sr=32000)
 
         self._audio_template = self._get_filter_wave(self._audio_template)  # 滤波
+        self._audio_matcher = AudioStreamMatcher(self._audio_template, self._audio_recorder.window_size)
 
         log.info('加载声音模板完成')
 
@@ -273,14 +372,14 @@ class AutoBattleDodgeContext:
             if screenshot_time - self._last_check_audio_time < cal_utils.random_in_range(self._check_audio_interval):
                 # 还没有达到识别间隔
                 return False
-            if self._audio_template is None:
+            if self._audio_matcher is None:
                 return False
             self._last_check_audio_time = screenshot_time
 
-            if self._audio_recorder.latest_audio.size == 0:
+            if self._audio_recorder.total_cnt == 0:
                 return False
 
-            corr = self.get_max_corr(self._audio_template, self._audio_recorder.latest_audio)
+            corr = self._audio_matcher.match(self._audio_recorder)
             # log.debug('声音相似度 %.2f' % corr)
 
             # 事件去重逻辑
@@ -296,38 +395,13 @@ class AutoBattleDodgeContext:
         finally:
             self._check_audio_lock.release()
 
-    def get_max_corr(self, x: np.ndarray, y: np.ndarray):
-        """
-        计算两个音频信号的最大相关性。
-        :param x: 音频信号x
-        :param y: 音频信号y
-        :return: 最大相关性系数
-        """
-        y = self._get_filter_wave(y)  # 滤波
-
-        # 标准化
-        wx = scale(x, with_mean=False)
-        wy = scale(y, with_mean=False)
-
-        # 计算NCC
-        if wx.shape[0] > wy.shape[0]:
-            correlation = correlate(wx, wy, mode='same', method='fft') / wx.shape[0]
-        else:
-            correlation = correlate(wy, wx, mode='same', method='fft') / wy.shape[0]
-
-        max_corr = np.max(correlation)
-
-        return max_corr
-
     def _get_filter_wave(self, x: np.ndarray):
         """
-        音频滤波。
+        音频滤波。与录音使用相同的滤波器 保证相位一致
         :param x: 音频信号x
         :return: 滤波后波形
         """
-        wx = filtfilt(self._audio_recorder.filter_b,
-                      self._audio_recorder.filter_a,
-                      x)
+        wx = sosfilt(self._audio_recorder.filter_sos, x)
         return wx
 
     def start_context_async(self) -> None:
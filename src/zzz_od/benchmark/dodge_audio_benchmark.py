@@ -0,0 +1,132 @@
+"""声音闪避匹配的一致性检查和耗时基准。
+
+使用随包的声音模板 合成一段 噪音 + 模板 + 噪音 的录音 按10毫秒一块写入录音器,
+每次匹配时 比较 ``AudioStreamMatcher`` 与原来的 ``correlate(..., mode='same')`` 计算的结果,
+并输出原来整段 ``filtfilt`` 滤波方式的最大相关性作为参考。
+
+用法::
+
+    uv run python src/zzz_od/benchmark/dodge_audio_benchmark.py
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import sys
+import time
+
+import librosa
+import numpy as np
+from scipy.signal import butter, correlate, filtfilt, sosfilt
+
+from one_dragon.utils import os_utils
+from one_dragon.utils.log_utils import log
+from zzz_od.auto_battle.auto_battle_dodge_context import (
+    AudioRecorder,
+    AudioStreamMatcher,
+)
+
+
+def _scale(x: np.ndarray) -> np.ndarray:
+    """与 sklearn scale(with_mean=False) 一致"""
+    std = float(np.std(x))
+    return x / (std if std > 0 else 1)
+
+
+def reference_max_corr(template: np.ndarray, audio: np.ndarray) -> float:
+    """
+    原来的最大相关性计算方式
+    :param template: 已滤波的音频模板
+    :param audio: 已滤波的录音
+    :return: 最大相关性系数
+    """
+    wx = _scale(template)
+    wy = _scale(audio)
+    if wx.shape[0] > wy.shape[0]:
+        correlation = correlate(wx, wy, mode='same', method='fft') / wx.shape[0]
+    else:
+        correlation = correlate(wy, wx, mode='same', method='fft') / wy.shape[0]
+    return float(np.max(correlation))
+
+
+def run_check(noise_level: float = 0.005, seed: int = 0, check_interval: int = 2) -> float:
+    """
+    检查流式匹配与原来的计算方式是否一致
+    :param noise_level: 噪音的标准差
+    :param seed: 随机种子
+    :param check_interval: 每写入多少个音频块匹配一次 与识别间隔20毫秒对应
+    :return: 两种方式的最大差异
+    """
+    recorder = AudioRecorder()
+    sample_rate = recorder._sample_rate
+    chunk_size = recorder._chunk_size
+
+    template_path = os.path.join(
+        os_utils.get_path_under_work_dir('assets', 'template', 'dodge_audio'),
+        'template_1.wav'
+    )
+    template, _ = librosa.load(template_path, sr=sample_rate)
+    filtered_template = sosfilt(recorder.filter_sos, template)  # 与 AutoBattleDodgeContext 加载模板时一致
+    matcher = AudioStreamMatcher(filtered_template, recorder.window_size)
+    log.info(f'模板长度 {len(template)} 录音窗口 {recorder.window_size}')
+
+    rng = np.random.default_rng(seed)
+    stream = np.concatenate([
+        rng.normal(size=sample_rate) * noise_level,
+        template + rng.normal(size=len(template)) * noise_level,
+        rng.normal(size=sample_rate) * noise_level,
+    ])
+
+    # 原来的方式 模板和每次的录音都使用 filtfilt
+    filter_b, filter_a = butter(4, 1000, btype='highpass', output='ba', fs=sample_rate)
+    origin_template = filtfilt(filter_b, filter_a, template)
+
+    max_diff: float = 0
+    stream_peak: float = 0
+    origin_peak: float = 0
+    stream_cost: float = 0
+    origin_cost: float = 0
+    match_cnt: int = 0
+    for chunk_idx, begin in enumerate(range(0, len(stream), chunk_size)):
+        recorder.write_audio(stream[begin:begin + chunk_size])
+        if chunk_idx % check_interval != check_interval - 1:
+            continue
+
+        t1 = time.perf_counter()
+        score = matcher.match(recorder)
+        t2 = time.perf_counter()
+
+        reference = reference_max_corr(filtered_template, recorder.latest_audio)
+        max_diff = max(max_diff, abs(score - reference))
+        stream_peak = max(stream_peak, score)
+
+        end = begin + chunk_size
+        raw = stream[max(0, end - recorder.window_size):end]
+        raw = np.concatenate([np.zeros(recorder.window_size - len(raw)), raw])
+        t3 = time.perf_counter()
+        origin_peak = max(origin_peak, reference_max_corr(origin_template, filtfilt(filter_b, filter_a, raw)))
+        t4 = time.perf_counter()
+
+        stream_cost += t2 - t1
+        origin_cost += t4 - t3
+        match_cnt += 1
+
+    log.info(f'匹配次数 {match_cnt} 与原计算方式的最大差异 {max_diff:.3e}')
+    log.info(f'最大相关性 当前 {stream_peak:.4f} 原滤波方式 {origin_peak:.4f} 触发阈值 {recorder.trigger_threshold}')
+    log.info(f'平均耗时 当前 {stream_cost / match_cnt * 1000:.3f}ms 原方式 {origin_cost / match_cnt * 1000:.3f}ms')
+    return max_diff
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='声音闪避匹配的一致性检查')
+    parser.add_argument('--noise', type=float, default=0.005, help='噪音的标准差')
+    parser.add_argument('--seed', type=int, default=0, help='随机种子')
+    parser.add_argument('--tolerance', type=float, default=1e-9, help='允许的最大差异')
+    args = parser.parse_args()
+
+    max_diff = run_check(noise_level=args.noise, seed=args.seed)
+    sys.exit(0 if max_diff <= args.tolerance else 1)
+
+
+if __name__ == '__main__':
+    main()
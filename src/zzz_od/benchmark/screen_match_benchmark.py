@@ -0,0 +1,154 @@
+"""画面识别耗时基准。
+
+对录制好的截图目录(例如 ``.debug/images``)逐帧识别画面,
+分别使用逐个画面判断(旧方式)和画面识别索引(新方式),输出每帧识别耗时对比。
+
+用法::
+
+    uv run python src/zzz_od/benchmark/screen_match_benchmark.py --image-dir .debug/images
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import time
+from dataclasses import dataclass, field
+
+from cv2.typing import MatLike
+
+from one_dragon.base.screen import screen_utils
+from one_dragon.utils import cv2_utils
+from one_dragon.utils.log_utils import log
+from zzz_od.context.zzz_context import ZContext
+
+IMAGE_SUFFIX_LIST: list[str] = ['.png', '.jpg', '.jpeg', '.webp']
+
+
+@dataclass
+class LatencyStats:
+    """耗时统计 单位毫秒"""
+
+    name: str
+    cost_list: list[float] = field(default_factory=list)
+
+    def add(self, cost_ms: float) -> None:
+        self.cost_list.append(cost_ms)
+
+    def percentile(self, p: float) -> float:
+        if len(self.cost_list) == 0:
+            return 0
+        sorted_list = sorted(self.cost_list)
+        idx = min(len(sorted_list) - 1, int(round(p / 100 * (len(sorted_list) - 1))))
+        return sorted_list[idx]
+
+    @property
+    def mean(self) -> float:
+        return sum(self.cost_list) / len(self.cost_list) if len(self.cost_list) > 0 else 0
+
+    def __str__(self) -> str:
+        return (f'{self.name}: 帧数={len(self.cost_list)} 平均={self.mean:.2f}ms '
+                f'P50={self.percentile(50):.2f}ms P95={self.percentile(95):.2f}ms '
+                f'最大={self.percentile(100):.2f}ms')
+
+
+def load_image_list(image_dir: str) -> list[tuple[str, MatLike]]:
+    """
+    读取目录下的所有截图
+
+    Args:
+        image_dir: 截图目录
+
+    Returns:
+        list[tuple[str, MatLike]]: (文件名, RGB图片)
+    """
+    image_list: list[tuple[str, MatLike]] = []
+    for file_name in sorted(os.listdir(image_dir)):
+        if os.path.splitext(file_name)[1].lower() not in IMAGE_SUFFIX_LIST:
+            continue
+        image = cv2_utils.read_image(os.path.join(image_dir, file_name))
+        if image is None:
+            continue
+        image_list.append((file_name, image))
+    return image_list
+
+
+def identify_screen(ctx: ZContext, screen: MatLike, use_index: bool) -> tuple[str | None, float]:
+    """
+    识别一帧画面 每次识别前清空OCR缓存 保证两种方式的耗时可比
+
+    Args:
+        ctx: 上下文
+        screen: 截图
+        use_index: 是否使用画面识别索引
+
+    Returns:
+        tuple[str | None, float]: 画面名称, 耗时(毫秒)
+    """
+    ctx.screen_loader.use_screen_match_index = use_index
+    ctx.ocr_service.clear_cache()
+    # 每帧都使用新的图片对象 避免命中上一轮的同帧结果
+    screen = screen.copy()
+
+    start_time = time.perf_counter()
+    screen_name = screen_utils.get_match_screen_name(ctx, screen)
+    return screen_name, (time.perf_counter() - start_time) * 1000
+
+
+def run_benchmark(ctx: ZContext, image_dir: str, rounds: int = 1) -> None:
+    """
+    运行画面识别基准
+
+    Args:
+        ctx: 已完成 OCR 和画面加载的上下文
+        image_dir: 截图目录
+        rounds: 重复轮数
+    """
+    image_list = load_image_list(image_dir)
+    if len(image_list) == 0:
+        log.error('截图目录为空 %s', image_dir)
+        return
+
+    # 全量识别 不从上一个画面开始搜索
+    ctx.screen_loader.current_screen_name = None
+    ctx.screen_loader.last_screen_name = None
+
+    linear_stats = LatencyStats('逐个画面判断')
+    index_stats = LatencyStats('画面识别索引')
+    diff_list: list[tuple[str, str | None, str | None]] = []
+
+    # 预热 避免模型懒加载影响第一帧
+    identify_screen(ctx, image_list[0][1], use_index=True)
+
+    for _ in range(rounds):
+        for file_name, image in image_list:
+            linear_name, linear_cost = identify_screen(ctx, image, use_index=False)
+            index_name, index_cost = identify_screen(ctx, image, use_index=True)
+            linear_stats.add(linear_cost)
+            index_stats.add(index_cost)
+            if linear_name != index_name:
+                diff_list.append((file_name, linear_name, index_name))
+
+    ctx.screen_loader.use_screen_match_index = True
+
+    log.info(str(linear_stats))
+    log.info(str(index_stats))
+    if index_stats.mean > 0:
+        log.info('平均加速 %.2fx', linear_stats.mean / index_stats.mean)
+    for file_name, linear_name, index_name in diff_list:
+        log.warning('识别结果不一致 %s 逐个判断=%s 索引=%s', file_name, linear_name, index_name)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='画面识别耗时基准')
+    parser.add_argument('--image-dir', required=True, help='截图目录')
+    parser.add_argument('--rounds', type=int, default=1, help='重复轮数')
+    args = parser.parse_args()
+
+    ctx = ZContext()
+    ctx.init_ocr()
+    ctx.screen_loader.reload()
+    run_benchmark(ctx, args.image_dir, rounds=args.rounds)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,516 @@
+"""识别热点路径的回放基准。
+
+将录制好的截图目录(例如 ``debug_utils.save_debug_image`` 保存的 ``.debug/images``)
+逐帧回放给各个识别入口, 不需要打开游戏:
+
+- ``ocr``: ``OcrService.get_ocr_result_list`` 全图OCR (每帧前清空OCR缓存);
+- ``template``: ``TemplateMatcher.match_template`` 模板匹配;
+- ``yolo``: 迷失之地 ``Yolov8Detector.run`` 目标检测;
+- ``battle_state``: ``AutoBattleContext.check_battle_state`` 战斗状态识别;
+- ``world_patrol_pos``: ``WorldPatrolService.cal_pos`` 小地图定位。
+
+控制器替换为 ``ReplayController`` 截图返回当前回放的帧 所有操作只计数不执行。
+每个入口输出 P50/P95/P99 耗时、吞吐量(帧/秒) 以及内存(RSS增长和Python分配峰值),
+可以保存为基线文件 之后与基线比较 超过容忍度时以非0退出码结束, 用于判断版本是否变慢。
+
+用法::
+
+    uv run python src/zzz_od/benchmark/vision_benchmark.py --image-dir .debug/images --save-baseline .debug/vision_baseline.json
+    uv run python src/zzz_od/benchmark/vision_benchmark.py --image-dir .debug/images --baseline .debug/vision_baseline.json --tolerance 0.2
+"""
+from __future__ import annotations
+
+import argparse
+import gc
+import json
+import os
+import platform
+import re
+import sys
+import time
+import tracemalloc
+from collections.abc import Callable
+from dataclasses import dataclass
+from typing import Any
+
+import psutil
+from cv2.typing import MatLike
+
+from one_dragon.base.controller.controller_base import ControllerBase
+from one_dragon.base.geometry.point import Point
+from one_dragon.base.geometry.rectangle import Rect
+from one_dragon.utils.log_utils import log
+from zzz_od.benchmark.screen_match_benchmark import LatencyStats, load_image_list
+from zzz_od.context.zzz_context import ZContext
+
+BASELINE_VERSION: int = 1
+DEFAULT_FRAME_INTERVAL: float = 0.05  # 截图文件名中没有时间时 按20帧/秒回放
+_FRAME_TIME_PATTERN = re.compile(r'_(\d{13})$')  # save_debug_image 默认文件名末尾的毫秒时间戳
+
+
+class ReplayController(ControllerBase):
+
+    def __init__(self, frame_list: list[tuple[float, MatLike]]):
+        """
+        回放录制截图的控制器
+        截图返回当前回放的帧 点击、按键等操作只计数 不做任何事情
+        :param frame_list: (截图时间, RGB图片) 的列表
+        """
+        ControllerBase.__init__(self)
+        self.frame_list: list[tuple[float, MatLike]] = frame_list
+        self.frame_idx: int = 0
+        self.game_win = None
+        self.action_cnt: dict[str, int] = {}
+
+    def set_frame(self, frame_idx: int) -> None:
+        self.frame_idx = frame_idx % len(self.frame_list)
+
+    @property
+    def is_game_window_ready(self) -> bool:
+        return True
+
+    def screenshot(self, independent: bool = False) -> tuple[float, MatLike | None]:
+        """
+        返回当前帧 截图时间使用录制时的时间
+        """
+        screenshot_time, screen = self.frame_list[self.frame_idx]
+        return screenshot_time, screen
+
+    def get_screenshot(self, independent: bool = False) -> MatLike:
+        return self.frame_list[self.frame_idx][1]
+
+    def record_action(self, action: str) -> None:
+        self.action_cnt[action] = self.action_cnt.get(action, 0) + 1
+
+    def click(self, pos: Point = None, press_time: float = 0, pc_alt: bool = False, gamepad_key: str | None = None) -> bool:
+        self.record_action('click')
+        return True
+
+    def scroll(self, down: int, pos: Point | None = None):
+        self.record_action('scroll')
+
+    def drag_to(self, end: Point, start: Point | None = None, duration: float = 0.5):
+        self.record_action('drag_to')
+
+    def input_str(self, to_input: str, interval: float = 0.1):
+        self.record_action('input_str')
+
+    def __getattr__(self, name: str) -> Callable[..., None]:
+        """
+        具体游戏控制器上的操作 (闪避、普攻、切人等) 都当作空操作
+        """
+        if name.startswith('_'):
+            raise AttributeError(name)
+
+        def _action(*args, **kwargs) -> None:
+            self.record_action(name)
+
+        return _action
+
+
+@dataclass
+class BenchmarkCase:
+    """一个识别入口"""
+
+    name: str
+    run: Callable[[ZContext, MatLike, float], Any]  # (上下文, 截图, 截图时间)
+    prepare: Callable[[ZContext], None] | None = None  # 计时前的初始化 例如加载模型
+    before_frame: Callable[[ZContext], None] | None = None  # 每帧计时前的操作 例如清空缓存
+
+
+@dataclass
+class CaseResult:
+    """一个识别入口的基准结果"""
+
+    name: str
+    stats: LatencyStats
+    total_seconds: float = 0  # 所有帧的识别总耗时
+    rss_growth_mb: float = 0  # 运行期间进程RSS的最大增长
+    alloc_peak_mb: float = 0  # 单帧的Python(含numpy)分配峰值
+    error_cnt: int = 0
+
+    @property
+    def fps(self) -> float:
+        return len(self.stats.cost_list) / self.total_seconds if self.total_seconds > 0 else 0
+
+    def to_dict(self) -> dict[str, float]:
+        return {
+            'frame_cnt': len(self.stats.cost_list),
+            'mean_ms': self.stats.mean,
+            'p50_ms': self.stats.percentile(50),
+            'p95_ms': self.stats.percentile(95),
+            'p99_ms': self.stats.percentile(99),
+            'fps': self.fps,
+            'rss_growth_mb': self.rss_growth_mb,
+            'alloc_peak_mb': self.alloc_peak_mb,
+            'error_cnt': self.error_cnt,
+        }
+
+    def __str__(self) -> str:
+        return (f'{self.stats.name}: 帧数={len(self.stats.cost_list)} 平均={self.stats.mean:.2f}ms '
+                f'P50={self.stats.percentile(50):.2f}ms P95={self.stats.percentile(95):.2f}ms '
+                f'P99={self.stats.percentile(99):.2f}ms 吞吐={self.fps:.1f}帧/秒 '
+                f'RSS增长={self.rss_growth_mb:.1f}MB 分配峰值={self.alloc_peak_mb:.1f}MB 失败={self.error_cnt}')
+
+
+def parse_frame_time_list(file_name_list: list[str], frame_interval: float = DEFAULT_FRAME_INTERVAL) -> list[float]:
+    """
+    计算每帧的截图时间
+    文件名都带有 save_debug_image 的毫秒时间戳时使用录制时的时间间隔 否则按固定间隔
+
+    Args:
+        file_name_list: 截图文件名
+        frame_interval: 固定间隔 秒
+
+    Returns:
+        list[float]: 截图时间 第一帧为0
+    """
+    ms_list: list[int] = []
+    for file_name in file_name_list:
+        match = _FRAME_TIME_PATTERN.search(os.path.splitext(file_name)[0])
+        if match is None:
+            break
+        ms_list.append(int(match.group(1)))
+
+    if len(ms_list) == len(file_name_list) and ms_list == sorted(ms_list):
+        return [(i - ms_list[0]) / 1000.0 for i in ms_list]
+    return [i * frame_interval for i in range(len(file_name_list))]
+
+
+def _run_ocr(ctx: ZContext, screen: MatLike, screenshot_time: float) -> Any:
+    return ctx.ocr_service.get_ocr_result_list(screen)
+
+
+def _clear_ocr_cache(ctx: ZContext) -> None:
+    ctx.ocr_service.clear_cache()
+
+
+def _prepare_yolo(ctx: ZContext) -> None:
+    ctx.lost_void.init_lost_void_det_model()
+
+
+def _run_yolo(ctx: ZContext, screen: MatLike, screenshot_time: float) -> Any:
+    return ctx.lost_void.detector.run(screen, run_time=screenshot_time)
+
+
+def _run_battle_state(ctx: ZContext, screen: MatLike, screenshot_time: float) -> Any:
+    return ctx.auto_battle_context.check_battle_state(screen, screenshot_time, sync=True)
+
+
+def create_case_list(
+        case_name_list: list[str],
+        template: str = 'battle/btn_normal_attack',
+        auto_op: str | None = None,
+        large_map: str | None = None,
+) -> list[BenchmarkCase]:
+    """
+    创建需要运行的识别入口
+
+    Args:
+        case_name_list: 入口名称
+        template: 模板匹配使用的模板 格式为 子目录/模板id
+        auto_op: 战斗状态识别使用的自动战斗配置 默认使用战斗助手的配置
+        large_map: 小地图定位使用的大地图区域 默认使用第一个大地图
+
+    Returns:
+        list[BenchmarkCase]: 识别入口
+    """
+    template_sub_dir, template_id = template.split('/', 1)
+
+    def run_template(ctx_: ZContext, screen: MatLike, screenshot_time: float) -> Any:
+        return ctx_.tm.match_template(screen, template_sub_dir, template_id, threshold=0.7)
+
+    def prepare_battle_state(ctx_: ZContext) -> None:
+        ctx_.auto_battle_context.init_screen_area()
+        op_name = auto_op if auto_op is not None else ctx_.battle_assistant_config.auto_battle_config
+        ctx_.auto_battle_context.init_auto_op(op_name)
+        ctx_.auto_battle_context.init_battle_context()
+
+    world_patrol_map: dict[str, Any] = {}
+
+    def prepare_world_patrol(ctx_: ZContext) -> None:
+        service = ctx_.world_patrol_service
+        service.load_data()
+        if len(service.large_map_list) == 0:
+            raise Exception('没有可用的大地图')
+        lm = service.large_map_list[0] if large_map is None else service.get_large_map_by_area_full_id(large_map)
+        if lm is None:
+            raise Exception(f'找不到大地图 {large_map}')
+        world_patrol_map['large_map'] = lm
+        # 不知道当前位置 在整张大地图上搜索
+        world_patrol_map['lm_rect'] = Rect(0, 0, lm.road_mask.shape[1], lm.road_mask.shape[0])
+
+    def run_world_patrol(ctx_: ZContext, screen: MatLike, screenshot_time: float) -> Any:
+        mini_map = ctx_.world_patrol_service.cut_mini_map(screen)
+        return ctx_.world_patrol_service.cal_pos(world_patrol_map['large_map'], mini_map, world_patrol_map['lm_rect'])
+
+    all_case_map: dict[str, BenchmarkCase] = {
+        'ocr': BenchmarkCase('ocr', _run_ocr, before_frame=_clear_ocr_cache),
+        'template': BenchmarkCase('template', run_template),
+        'yolo': BenchmarkCase('yolo', _run_yolo, prepare=_prepare_yolo),
+        'battle_state': BenchmarkCase('battle_state', _run_battle_state, prepare=prepare_battle_state),
+        'world_patrol_pos': BenchmarkCase('world_patrol_pos', run_world_patrol, prepare=prepare_world_patrol),
+    }
+
+    case_list: list[BenchmarkCase] = []
+    for case_name in case_name_list:
+        if case_name not in all_case_map:
+            raise ValueError(f'未知的识别入口 {case_name} 可选 {list(all_case_map.keys())}')
+        case_list.append(all_case_map[case_name])
+    return case_list
+
+
+def _get_rss_mb(process: psutil.Process) -> float:
+    return process.memory_info().rss / 1024 / 1024
+
+
+def run_case(
+        ctx: ZContext,
+        controller: ReplayController,
+        case: BenchmarkCase,
+        rounds: int = 1,
+        warmup: int = 3,
+        trace_memory: bool = True,
+) -> CaseResult:
+    """
+    回放所有截图 运行一个识别入口
+
+    Args:
+        ctx: 上下文
+        controller: 回放控制器
+        case: 识别入口
+        rounds: 重复轮数
+        warmup: 预热帧数 不计入统计 避免模型懒加载影响结果
+        trace_memory: 是否额外回放一轮 统计Python分配峰值 这一轮不计入耗时
+
+    Returns:
+        CaseResult: 基准结果
+    """
+    result = CaseResult(name=case.name, stats=LatencyStats(case.name))
+    frame_cnt = len(controller.frame_list)
+    # 每轮的截图时间继续增加 保证按时间间隔识别的逻辑和实际运行一致
+    round_seconds = controller.frame_list[-1][0] + DEFAULT_FRAME_INTERVAL
+
+    def run_frame(round_idx: int, frame_idx: int) -> float | None:
+        controller.set_frame(frame_idx)
+        screenshot_time, screen = controller.screenshot()
+        screenshot_time += round_idx * round_seconds
+        # 每帧都使用新的图片对象 和实际截图一样 不命中同一帧的缓存
+        screen = screen.copy()
+        if case.before_frame is not None:
+            case.before_frame(ctx)
+
+        start_time = time.perf_counter()
+        try:
+            case.run(ctx, screen, screenshot_time)
+        except Exception:
+            result.error_cnt += 1
+            log.debug(f'识别失败 {case.name} 第{frame_idx}帧', exc_info=True)
+            return None
+        return (time.perf_counter() - start_time) * 1000
+
+    if case.prepare is not None:
+        case.prepare(ctx)
+
+    for i in range(min(warmup, frame_cnt)):
+        run_frame(0, i)
+    result.error_cnt = 0
+
+    gc.collect()
+    process = psutil.Process()
+    rss_before = _get_rss_mb(process)
+    rss_max = rss_before
+    for round_idx in range(rounds):
+        for frame_idx in range(frame_cnt):
+            cost = run_frame(round_idx + 1, frame_idx)
+            if cost is not None:
+                result.stats.add(cost)
+                result.total_seconds += cost / 1000
+            rss_max = max(rss_max, _get_rss_mb(process))
+    result.rss_growth_mb = rss_max - rss_before
+
+    if trace_memory:
+        tracemalloc.start()
+        alloc_peak: int = 0
+        for frame_idx in range(frame_cnt):
+            tracemalloc.reset_peak()
+            base, _ = tracemalloc.get_traced_memory()
+            run_frame(rounds + 1, frame_idx)
+            alloc_peak = max(alloc_peak, tracemalloc.get_traced_memory()[1] - base)
+        tracemalloc.stop()
+        result.alloc_peak_mb = alloc_peak / 1024 / 1024
+
+    return result
+
+
+def get_machine_info() -> dict[str, Any]:
+    """
+    运行机器的信息 与基线不同机器时 比较结果没有意义
+    """
+    return {
+        'platform': platform.platform(),
+        'processor': platform.processor(),
+        'cpu_count': os.cpu_count(),
+        'python': platform.python_version(),
+    }
+
+
+def save_baseline(file_path: str, image_dir: str, result_list: list[CaseResult]) -> None:
+    """
+    保存基线文件
+
+    Args:
+        file_path: 基线文件路径
+        image_dir: 截图目录
+        result_list: 基准结果
+    """
+    data = {
+        'version': BASELINE_VERSION,
+        'create_time': time.strftime('%Y-%m-%d %H:%M:%S'),
+        'image_dir': image_dir,
+        'machine': get_machine_info(),
+        'cases': {i.name: i.to_dict() for i in result_list},
+    }
+    dir_path = os.path.dirname(os.path.abspath(file_path))
+    os.makedirs(dir_path, exist_ok=True)
+    with open(file_path, 'w', encoding='utf-8') as file:
+        json.dump(data, file, ensure_ascii=False, indent=2)
+    log.info(f'保存基线 {file_path}')
+
+
+def compare_baseline(file_path: str, result_list: list[CaseResult], tolerance: float = 0.2) -> list[str]:
+    """
+    与基线比较 耗时和内存比基线多出容忍度以上、吞吐量比基线少出容忍度以上时 视为退化
+
+    Args:
+        file_path: 基线文件路径
+        result_list: 基准结果
+        tolerance: 容忍度 0.2 即允许比基线差20%
+
+    Returns:
+        list[str]: 退化的描述 为空时没有退化
+    """
+    with open(file_path, encoding='utf-8') as file:
+        data = json.load(file)
+
+    if data.get('version') != BASELINE_VERSION:
+        return [f'基线文件版本不一致 {data.get("version")} != {BASELINE_VERSION}']
+    if data.get('machine') != get_machine_info():
+        log.warning(f'基线来自不同的机器 比较结果仅供参考 基线={data.get("machine")}')
+
+    regression_list: list[str] = []
+    baseline_case_map: dict[str, dict] = data.get('cases', {})
+    for result in result_list:
+        baseline = baseline_case_map.get(result.name)
+        if baseline is None:
+            log.info(f'基线中没有 {result.name} 跳过比较')
+            continue
+
+        current = result.to_dict()
+        for key in ['mean_ms', 'p50_ms', 'p95_ms', 'p99_ms', 'alloc_peak_mb']:
+            if current[key] > baseline[key] * (1 + tolerance):
+                regression_list.append(f'{result.name} {key} {baseline[key]:.2f} -> {current[key]:.2f}')
+        if current['fps'] * (1 + tolerance) < baseline['fps']:
+            regression_list.append(f'{result.name} fps {baseline["fps"]:.1f} -> {current["fps"]:.1f}')
+        if current['error_cnt'] > baseline['error_cnt']:
+            regression_list.append(f'{result.name} error_cnt {baseline["error_cnt"]} -> {current["error_cnt"]}')
+
+    return regression_list
+
+
+def run_benchmark(
+        ctx: ZContext,
+        image_dir: str,
+        case_list: list[BenchmarkCase],
+        rounds: int = 1,
+        warmup: int = 3,
+        trace_memory: bool = True,
+) -> list[CaseResult]:
+    """
+    运行所有识别入口的回放基准
+
+    Args:
+        ctx: 已完成 OCR 和画面加载的上下文
+        image_dir: 截图目录
+        case_list: 识别入口
+        rounds: 重复轮数
+        warmup: 预热帧数
+        trace_memory: 是否统计Python分配峰值
+
+    Returns:
+        list[CaseResult]: 基准结果
+    """
+    image_list = load_image_list(image_dir)
+    if len(image_list) == 0:
+        log.error('截图目录为空 %s', image_dir)
+        return []
+
+    frame_time_list = parse_frame_time_list([i[0] for i in image_list])
+    controller = ReplayController([(frame_time_list[i], image_list[i][1]) for i in range(len(image_list))])
+    ctx.controller = controller
+
+    result_list: list[CaseResult] = []
+    for case in case_list:
+        try:
+            result = run_case(ctx, controller, case, rounds=rounds, warmup=warmup, trace_memory=trace_memory)
+        except Exception:
+            log.error(f'识别入口初始化失败 {case.name}', exc_info=True)
+            continue
+        log.info(str(result))
+        result_list.append(result)
+
+    if len(controller.action_cnt) > 0:
+        log.info(f'回放期间的控制器操作 {controller.action_cnt}')
+    return result_list
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='识别热点路径的回放基准')
+    parser.add_argument('--image-dir', required=True, help='截图目录')
+    parser.add_argument('--cases', default='ocr,template,yolo,battle_state,world_patrol_pos', help='识别入口 逗号分隔')
+    parser.add_argument('--rounds', type=int, default=1, help='重复轮数')
+    parser.add_argument('--warmup', type=int, default=3, help='预热帧数')
+    parser.add_argument('--no-trace-memory', action='store_true', help='不统计Python分配峰值')
+    parser.add_argument('--template', default='battle/btn_normal_attack', help='模板匹配使用的模板 子目录/模板id')
+    parser.add_argument('--auto-op', default=None, help='战斗状态识别使用的自动战斗配置')
+    parser.add_argument('--large-map', default=None, help='小地图定位使用的大地图区域')
+    parser.add_argument('--baseline', default=None, help='与这个基线文件比较')
+    parser.add_argument('--save-baseline', default=None, help='将结果保存为基线文件')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='与基线比较的容忍度')
+    args = parser.parse_args()
+
+    ctx = ZContext()
+    ctx.init_ocr()
+    ctx.screen_loader.reload()
+
+    case_list = create_case_list(
+        [i.strip() for i in args.cases.split(',') if len(i.strip()) > 0],
+        template=args.template,
+        auto_op=args.auto_op,
+        large_map=args.large_map,
+    )
+    result_list = run_benchmark(
+        ctx, args.image_dir, case_list,
+        rounds=args.rounds,
+        warmup=args.warmup,
+        trace_memory=not args.no_trace_memory,
+    )
+    ctx.after_app_shutdown()
+
+    if len(result_list) == 0:
+        sys.exit(1)
+
+    if args.save_baseline is not None:
+        save_baseline(args.save_baseline, args.image_dir, result_list)
+
+    if args.baseline is not None:
+        regression_list = compare_baseline(args.baseline, result_list, tolerance=args.tolerance)
+        for regression in regression_list:
+            log.error(f'性能退化 {regression}')
+        if len(regression_list) > 0:
+            sys.exit(2)
+        log.info('与基线相比没有退化')
+
+
+if __name__ == '__main__':
+    main()
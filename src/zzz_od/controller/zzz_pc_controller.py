@@ -17,12 +17,14 @@ class ZPcController(PcControllerBase):
             game_config: GameConfig,
             screenshot_method: str,
             standard_width: int = 1920,
-            standard_height: int = 1080
+            standard_height: int = 1080,
+            background_screenshot: bool = False,
     ):
         PcControllerBase.__init__(self,
                                   screenshot_method=screenshot_method,
                                   standard_width=standard_width,
-                                  standard_height=standard_height)
+                                  standard_height=standard_height,
+                                  background_screenshot=background_screenshot)
 
         self.game_config: GameConfig = game_config
         self.action_keys = self.game_config.get_action_keys('keyboard')
@@ -223,6 +225,7 @@ class ZPcController(PcControllerBase):
         else:
             self._ensure_mouse_mode()
             ctypes.windll.user32.mouse_event(0x0001, int(dx), int(dy))
+        self.record_action_time()
 
     def _gamepad_turn(self, dx: float, dy: float) -> None:
         """
@@ -42,7 +42,8 @@ class HollowZeroMapService:
         """
         if self.event_model is None:
             return None
-        result = self.event_model.run(screen, run_time=screenshot_time)
+        # 空洞地图在每次移动之间基本静止 画面没有变化时复用上一次的识别结果
+        result = self.event_model.run_roi(screen, run_time=screenshot_time, reuse_unchanged=True)
         # from zzz_od.yolo import detect_utils
         # cv2_utils.show_image(detect_utils.draw_detections(result), wait=0)
         if result is None: